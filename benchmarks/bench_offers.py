@@ -0,0 +1,61 @@
+# benchmarks/bench_offers.py
+"""Resident memory and GC cost of FlightOffer vs CompactFlightOffer.
+
+Run with: python -m benchmarks.bench_offers [count]
+"""
+import gc
+import sys
+import time
+import tracemalloc
+from datetime import date, timedelta
+from decimal import Decimal
+
+from src.models import CompactFlightOffer, FlightOffer
+
+AIRPORTS = ["XMN", "SIN", "PEK", "PVG", "CAN", "NRT", "ICN", "BKK"]
+AIRLINES = ["MF", "SQ", "CA", "MU", "CZ", "NH"]
+
+
+def make_offers(count: int):
+    # Build fresh strings per offer, as JSON decoding does
+    return [
+        FlightOffer(
+            origin="".join(AIRPORTS[i % 8]),
+            destination="".join(AIRPORTS[(i + 3) % 8]),
+            departure_date=date(2026, 2, 1) + timedelta(days=i % 28),
+            price=Decimal(str(500 + i % 1000)) + Decimal("0.50"),
+            currency="".join("CNY"),
+            airline="".join(AIRLINES[i % 6]),
+            flight_number=f"{AIRLINES[i % 6]}{100 + i % 900}",
+            stops=i % 2,
+            source="".join("amadeus"),
+        )
+        for i in range(count)
+    ]
+
+
+def measure(label: str, build):
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    objects = build()
+    elapsed = time.perf_counter() - started
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    gc_started = time.perf_counter()
+    gc.collect()
+    gc_elapsed = time.perf_counter() - gc_started
+    print(f"{label:<22} {current / len(objects):8.1f} B/offer  "
+          f"build {elapsed * 1000:7.1f} ms  full GC {gc_elapsed * 1000:6.1f} ms")
+    return objects
+
+
+def main(count: int = 100_000):
+    print(f"{count} offers")
+    offers = measure("FlightOffer", lambda: make_offers(count))
+    measure("CompactFlightOffer", lambda: [CompactFlightOffer.from_offer(o) for o in offers])
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
@@ -1,6 +1,9 @@
--- Price records table
+-- Price records, range-partitioned by month of fetched_at. Monthly
+-- partitions are created ahead of time and dropped after the retention
+-- period by the app (see src/partitions.py); the default partition only
+-- catches rows outside every monthly partition.
 CREATE TABLE IF NOT EXISTS price_records (
-    id SERIAL PRIMARY KEY,
+    id BIGINT GENERATED BY DEFAULT AS IDENTITY,
     origin CHAR(3) NOT NULL,
     destination CHAR(3) NOT NULL,
     departure_date DATE NOT NULL,
@@ -10,12 +13,48 @@ CREATE TABLE IF NOT EXISTS price_records (
     currency CHAR(3) DEFAULT 'CNY',
     flight_number VARCHAR(20),
     stops INT DEFAULT 0,
-    fetched_at TIMESTAMP DEFAULT NOW()
-);
+    fetched_at TIMESTAMP NOT NULL DEFAULT NOW(),
+    available BOOLEAN NOT NULL DEFAULT TRUE,
+    PRIMARY KEY (id, fetched_at)
+) PARTITION BY RANGE (fetched_at);
+
+CREATE TABLE IF NOT EXISTS price_records_default PARTITION OF price_records DEFAULT;
 
 CREATE INDEX IF NOT EXISTS idx_route_date ON price_records(origin, destination, departure_date);
 CREATE INDEX IF NOT EXISTS idx_fetched_at ON price_records(fetched_at);
 
+-- Partitions for the current and next three months
+DO $$
+DECLARE
+    month DATE;
+BEGIN
+    FOR i IN 0..3 LOOP
+        month := date_trunc('month', now())::date + make_interval(months => i);
+        EXECUTE format(
+            'CREATE TABLE IF NOT EXISTS %I PARTITION OF price_records FOR VALUES FROM (%L) TO (%L)',
+            'price_records_' || to_char(month, 'YYYY_MM'), month, (month + interval '1 month')::date
+        );
+    END LOOP;
+END $$;
+
+-- Daily rollup of price_records per departure date and fetch day,
+-- upserted together with every batch of raw records
+CREATE TABLE IF NOT EXISTS price_daily (
+    origin CHAR(3) NOT NULL,
+    destination CHAR(3) NOT NULL,
+    departure_date DATE NOT NULL,
+    fetch_day DATE NOT NULL,
+    min_price DECIMAL(10,2) NOT NULL,
+    max_price DECIMAL(10,2) NOT NULL,
+    sum_price DECIMAL(14,2) NOT NULL,
+    count INT NOT NULL,
+    last_price DECIMAL(10,2) NOT NULL,
+    last_fetched_at TIMESTAMP NOT NULL,
+    PRIMARY KEY (origin, destination, departure_date, fetch_day)
+);
+
+CREATE INDEX IF NOT EXISTS idx_daily_route_day ON price_daily(origin, destination, fetch_day);
+
 -- Alert logs table
 CREATE TABLE IF NOT EXISTS alert_logs (
     id SERIAL PRIMARY KEY,
@@ -29,3 +68,25 @@ CREATE TABLE IF NOT EXISTS alert_logs (
     notified_via TEXT[],
     created_at TIMESTAMP DEFAULT NOW()
 );
+
+-- API quota usage, persisted across restarts
+CREATE TABLE IF NOT EXISTS api_quota_usage (
+    source VARCHAR(20) PRIMARY KEY,
+    day DATE NOT NULL,
+    day_used INT NOT NULL DEFAULT 0,
+    month CHAR(7) NOT NULL,
+    month_used INT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT NOW()
+);
+
+-- Pair jobs shared by the workers of a distributed deployment; workers
+-- claim due rows with FOR UPDATE SKIP LOCKED and hold them by heartbeat
+CREATE TABLE IF NOT EXISTS route_leases (
+    job_id VARCHAR(100) PRIMARY KEY,
+    due_at TIMESTAMPTZ NOT NULL,
+    lease_owner VARCHAR(100),
+    lease_expires_at TIMESTAMPTZ,
+    last_run_at TIMESTAMPTZ
+);
+
+CREATE INDEX IF NOT EXISTS idx_leases_due ON route_leases(due_at);
@@ -1,5 +1,7 @@
 # src/analyzers/__init__.py
 from src.analyzers.alert_rules import BaseAlertRule, ThresholdRule, DropPercentRule, HistoricalLowRule
 from src.analyzers.engine import AlertEngine
+from src.analyzers.history import PriceHistoryCache, RouteHistory
 
-__all__ = ["BaseAlertRule", "ThresholdRule", "DropPercentRule", "HistoricalLowRule", "AlertEngine"]
+__all__ = ["BaseAlertRule", "ThresholdRule", "DropPercentRule", "HistoricalLowRule", "AlertEngine",
+           "PriceHistoryCache", "RouteHistory"]
@@ -42,16 +42,21 @@ class ThresholdRule(BaseAlertRule):
 class DropPercentRule(BaseAlertRule):
     """Triggers when price drops by more than X% from last check."""
 
-    def __init__(self, percent: float, last_price: Optional[Decimal] = None):
+    def __init__(self, percent: float, last_price: Optional[Decimal] = None, history: Any = None):
         self.percent = percent
-        self.last_price = last_price  # Injected or fetched from DB
+        self.last_price = last_price  # Injected, or read from the route's history
+        self.history = history
 
     @property
     def rule_type(self) -> str:
         return "drop_percent"
 
     async def evaluate(self, offer: FlightOffer, db_session: Any) -> AlertResult:
-        if self.last_price is None:
+        last_price = self.last_price
+        if last_price is None and self.history is not None:
+            last_price = self.history.last_price(offer.departure_date)
+
+        if not last_price:
             return AlertResult(
                 triggered=False,
                 rule_type=self.rule_type,
@@ -59,31 +64,36 @@ class DropPercentRule(BaseAlertRule):
                 current_price=offer.price
             )
 
-        drop = (self.last_price - offer.price) / self.last_price * 100
+        drop = (last_price - offer.price) / last_price * 100
         triggered = drop >= self.percent
 
         return AlertResult(
             triggered=triggered,
             rule_type=self.rule_type,
-            message=f"降价 {drop:.1f}%（{self.last_price} → {offer.price}）",
+            message=f"降价 {drop:.1f}%（{last_price} → {offer.price}）",
             current_price=offer.price,
-            threshold_value=self.last_price * (1 - Decimal(str(self.percent)) / 100)
+            threshold_value=last_price * (1 - Decimal(str(self.percent)) / 100)
         )
 
 
 class HistoricalLowRule(BaseAlertRule):
     """Triggers when price is lower than historical low in lookback period."""
 
-    def __init__(self, lookback_days: int = 7, historical_low: Optional[Decimal] = None):
+    def __init__(self, lookback_days: int = 7, historical_low: Optional[Decimal] = None, history: Any = None):
         self.lookback_days = lookback_days
-        self.historical_low = historical_low  # Injected or fetched from DB
+        self.historical_low = historical_low  # Injected, or read from the route's history
+        self.history = history
 
     @property
     def rule_type(self) -> str:
         return "historical_low"
 
     async def evaluate(self, offer: FlightOffer, db_session: Any) -> AlertResult:
-        if self.historical_low is None:
+        historical_low = self.historical_low
+        if historical_low is None and self.history is not None:
+            historical_low = self.history.low(offer.departure_date, self.lookback_days)
+
+        if historical_low is None:
             return AlertResult(
                 triggered=False,
                 rule_type=self.rule_type,
@@ -91,12 +101,12 @@ class HistoricalLowRule(BaseAlertRule):
                 current_price=offer.price
             )
 
-        triggered = offer.price < self.historical_low
+        triggered = offer.price < historical_low
 
         return AlertResult(
             triggered=triggered,
             rule_type=self.rule_type,
-            message=f"{'新低价！' if triggered else ''}当前 {offer.price} {'<' if triggered else '>='} 历史最低 {self.historical_low}",
+            message=f"{'新低价！' if triggered else ''}当前 {offer.price} {'<' if triggered else '>='} 历史最低 {historical_low}",
             current_price=offer.price,
-            threshold_value=self.historical_low
+            threshold_value=historical_low
         )
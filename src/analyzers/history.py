@@ -0,0 +1,203 @@
+# src/analyzers/history.py
+import logging
+from collections import deque
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import select, tuple_
+from src.database import PriceDaily
+from src.models import FlightOffer
+
+logger = logging.getLogger(__name__)
+
+HistoryKey = Tuple[str, str, date]
+
+# Weight of the latest check in a route's volatility average
+VOLATILITY_ALPHA = 0.3
+
+
+class PriceHistoryCache:
+    """Recent prices per (origin, destination, departure date), kept in memory.
+
+    Holds the last observed price and a monotonic deque of (time, price)
+    whose prices increase from front to back, so the lowest price over any
+    lookback up to `lookback_days` is the first entry inside the window.
+    Recording is amortized O(1). Per route, it also keeps an exponential
+    average of how much prices moved between consecutive checks.
+    """
+
+    def __init__(self, lookback_days: int = 30, clock: Callable[[], datetime] = datetime.utcnow):
+        self.lookback = timedelta(days=lookback_days)
+        self.clock = clock
+        self._last: Dict[HistoryKey, Decimal] = {}
+        self._lows: Dict[HistoryKey, deque] = {}
+        self._volatility: Dict[Tuple[str, str], float] = {}
+        self._pruned_on: Optional[date] = None
+
+    def __len__(self) -> int:
+        return len(self._last)
+
+    def record(self, origin: str, destination: str, departure_date: date, price: Decimal, at: Optional[datetime] = None):
+        at = at or self.clock()
+        key = (origin, destination, departure_date)
+        self._last[key] = price
+
+        lows = self._lows.setdefault(key, deque())
+        while lows and lows[-1][1] >= price:
+            lows.pop()
+        lows.append((at, price))
+        cutoff = at - self.lookback
+        while lows[0][0] < cutoff:
+            lows.popleft()
+
+    def record_many(self, origin: str, destination: str, prices: Dict[date, Decimal], at: Optional[datetime] = None):
+        at = at or self.clock()
+        for departure_date, price in prices.items():
+            self.record(origin, destination, departure_date, price, at)
+
+    def record_offers(self, origin: str, destination: str, offers: List[FlightOffer], at: Optional[datetime] = None):
+        """Record one check: the cheapest priced offer per departure date."""
+        prices: Dict[date, Decimal] = {}
+        for offer in offers:
+            if offer.price <= 0:
+                continue  # Sources without fares report 0
+            current = prices.get(offer.departure_date)
+            if current is None or offer.price < current:
+                prices[offer.departure_date] = offer.price
+        at = at or self.clock()
+        if self._pruned_on != at.date():
+            self.prune(at.date())
+        self._update_volatility(origin, destination, prices)
+        self.record_many(origin, destination, prices, at)
+
+    def _update_volatility(self, origin: str, destination: str, prices: Dict[date, Decimal]):
+        moves = []
+        for departure_date, price in prices.items():
+            last = self._last.get((origin, destination, departure_date))
+            if last:
+                moves.append(float(abs(price - last) / last))
+        if not moves:
+            return
+        move = sum(moves) / len(moves)
+        current = self._volatility.get((origin, destination))
+        self._volatility[(origin, destination)] = (
+            move if current is None else VOLATILITY_ALPHA * move + (1 - VOLATILITY_ALPHA) * current
+        )
+
+    def volatility(self, origin: str, destination: str) -> Optional[float]:
+        """Average relative price move per check, or None before two checks."""
+        return self._volatility.get((origin, destination))
+
+    def last_price(self, origin: str, destination: str, departure_date: date) -> Optional[Decimal]:
+        return self._last.get((origin, destination, departure_date))
+
+    def low(self, origin: str, destination: str, departure_date: date, lookback_days: Optional[int] = None) -> Optional[Decimal]:
+        """Lowest price seen within the lookback, or None without history."""
+        lows = self._lows.get((origin, destination, departure_date))
+        if not lows:
+            return None
+        lookback = self.lookback if lookback_days is None else min(self.lookback, timedelta(days=lookback_days))
+        cutoff = self.clock() - lookback
+        for at, price in lows:
+            if at >= cutoff:
+                return price
+        return None
+
+    def prune(self, today: Optional[date] = None):
+        """Forget departure dates that have already passed."""
+        today = today or self.clock().date()
+        self._pruned_on = today
+        for key in [k for k in self._last if k[2] < today]:
+            del self._last[key]
+            self._lows.pop(key, None)
+
+    def for_route(self, origin: str, destination: str) -> 'RouteHistory':
+        return RouteHistory(self, origin, destination)
+
+    async def warm(self, session_factory, pairs: Optional[Iterable[Tuple[str, str]]] = None):
+        """Load the lookback window from the price_daily rollup in one query.
+
+        Each fetch day contributes its low (at the start of the day) and its
+        last price, so lows are precise to the day.
+        """
+        rows = await self._rollups(session_factory, pairs)
+        self._apply(rows)
+        logger.info(f"Price history warmed with {len(rows)} daily rollups for {len(self)} departure dates")
+
+    async def refresh(self, session_factory, origin: str, destination: str):
+        """Replace what is held for one pair with its price_daily rollups.
+
+        Used when checks of a pair may run on other processes, whose prices
+        only reach this one through the database. Prices recorded here after
+        the newest rollup, which may still be waiting in the write-behind
+        queue, are kept.
+        """
+        rows = await self._rollups(session_factory, [(origin, destination)])
+        stored: Dict[HistoryKey, datetime] = {}
+        for row_origin, row_destination, departure_date, _, _, last_at, _ in rows:
+            key = (row_origin.strip(), row_destination.strip(), departure_date)
+            stored[key] = max(stored.get(key, last_at), last_at)
+        unflushed = [
+            (key, at, price)
+            for key, lows in self._lows.items() if key[:2] == (origin, destination)
+            for at, price in lows if key not in stored or at > stored[key]
+        ]
+
+        self.forget(origin, destination)
+        self._apply(rows)
+        # The deque holds each key's latest price last, so replaying keeps it last
+        for key, at, price in unflushed:
+            self.record(*key, price, at)
+
+    def forget(self, origin: str, destination: str):
+        for key in [k for k in self._last if k[:2] == (origin, destination)]:
+            del self._last[key]
+            self._lows.pop(key, None)
+
+    async def _rollups(self, session_factory, pairs: Optional[Iterable[Tuple[str, str]]]) -> list:
+        now = self.clock()
+        stmt = (
+            select(
+                PriceDaily.origin, PriceDaily.destination, PriceDaily.departure_date,
+                PriceDaily.fetch_day, PriceDaily.min_price,
+                PriceDaily.last_fetched_at, PriceDaily.last_price
+            )
+            .where(
+                PriceDaily.fetch_day >= (now - self.lookback).date(),
+                PriceDaily.departure_date >= now.date()
+            )
+            .order_by(PriceDaily.fetch_day)
+        )
+        pairs = list(pairs or [])
+        if pairs:
+            stmt = stmt.where(tuple_(PriceDaily.origin, PriceDaily.destination).in_(pairs))
+
+        async with session_factory() as session:
+            return (await session.execute(stmt)).all()
+
+    def _apply(self, rows: list):
+        """Record rollup rows, which must be ordered by fetch day."""
+        now = self.clock()
+        for origin, destination, departure_date, fetch_day, low, last_at, last in rows:
+            origin, destination = origin.strip(), destination.strip()
+            day_start = datetime.combine(fetch_day, time.min)
+            self.record(origin, destination, departure_date, low, max(day_start, now - self.lookback))
+            self.record(origin, destination, departure_date, last, last_at)
+
+
+class RouteHistory:
+    """View of a PriceHistoryCache for one route, as read by the alert rules."""
+
+    def __init__(self, cache: PriceHistoryCache, origin: str, destination: str):
+        self.cache = cache
+        self.origin = origin
+        self.destination = destination
+
+    def last_price(self, departure_date: date) -> Optional[Decimal]:
+        return self.cache.last_price(self.origin, self.destination, departure_date)
+
+    def low(self, departure_date: date, lookback_days: Optional[int] = None) -> Optional[Decimal]:
+        return self.cache.low(self.origin, self.destination, departure_date, lookback_days)
+
+    def volatility(self) -> Optional[float]:
+        return self.cache.volatility(self.origin, self.destination)
@@ -17,10 +17,17 @@ def cli():
 
 @cli.command()
 @click.option('--config', '-c', default='config.yaml', help='Config file path')
-def start(config):
+@click.option('--workers', '-w', default=1, show_default=True, type=click.IntRange(min=1),
+              help='Worker processes to shard routes over')
+def start(config, workers):
     """Start the monitoring service."""
-    from src.main import main
     click.echo(f"Starting flight monitor with config: {config}")
+    if workers > 1:
+        from src.workers import Supervisor
+        Supervisor(config, workers).run()
+        return
+
+    from src.main import main
     asyncio.run(main(config))
 
 @cli.command('list-routes')
@@ -53,5 +60,31 @@ def check(origin, destination, config):
     click.echo(f"Checking {origin} -> {destination}...")
     asyncio.run(check_route_once(origin, destination, config))
 
+@cli.command()
+@click.option('--config', '-c', default='config.yaml', help='Config file path')
+def quota(config):
+    """Show remaining API quota per source."""
+    from src.main import show_quota
+    asyncio.run(show_quota(config))
+
+@cli.command()
+@click.argument('origin')
+@click.argument('destination')
+@click.option('--days', '-d', default=30, show_default=True, help='Days of history to show')
+@click.option('--departure', type=click.DateTime(formats=['%Y-%m-%d']), help='Show per-flight price changes for one departure date')
+@click.option('--config', '-c', default='config.yaml', help='Config file path')
+def history(origin, destination, days, departure, config):
+    """Show daily price history of a route."""
+    from src.main import show_history
+    asyncio.run(show_history(origin, destination, days, config, departure.date() if departure else None))
+
+@cli.command()
+@click.option('--migrate', is_flag=True, help='Convert an unpartitioned price_records table first')
+@click.option('--config', '-c', default='config.yaml', help='Config file path')
+def partitions(migrate, config):
+    """Create upcoming price_records partitions and drop expired ones."""
+    from src.main import maintain_partitions
+    asyncio.run(maintain_partitions(migrate, config))
+
 if __name__ == '__main__':
     cli()
@@ -2,7 +2,7 @@
 from datetime import date, datetime
 from decimal import Decimal
 from typing import List, Optional
-from sqlalchemy import Column, Integer, String, Numeric, DateTime, Date, create_engine
+from sqlalchemy import Boolean, Column, BigInteger, Integer, String, Numeric, DateTime, Date, create_engine
 from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import declarative_base, sessionmaker
@@ -10,9 +10,10 @@ from sqlalchemy.orm import declarative_base, sessionmaker
 Base = declarative_base()
 
 class PriceRecord(Base):
+    """Raw offer history, partitioned by month of fetched_at (see init.sql)."""
     __tablename__ = 'price_records'
 
-    id = Column(Integer, primary_key=True)
+    id = Column(BigInteger, primary_key=True)
     origin = Column(String(3), nullable=False)
     destination = Column(String(3), nullable=False)
     departure_date = Column(Date, nullable=False)
@@ -22,7 +23,9 @@ class PriceRecord(Base):
     currency = Column(String(3), default='CNY')
     flight_number = Column(String(20))
     stops = Column(Integer, default=0)
-    fetched_at = Column(DateTime, default=datetime.utcnow)
+    fetched_at = Column(DateTime, primary_key=True, default=datetime.utcnow)
+    # False on rows recording that a flight stopped being offered
+    available = Column(Boolean, nullable=False, default=True)
 
 class AlertLog(Base):
     __tablename__ = 'alert_logs'
@@ -38,6 +41,45 @@ class AlertLog(Base):
     notified_via = Column(ARRAY(String))
     created_at = Column(DateTime, default=datetime.utcnow)
 
+class PriceDaily(Base):
+    """Per fetch-day rollup of price_records, maintained on every write batch."""
+    __tablename__ = 'price_daily'
+
+    origin = Column(String(3), primary_key=True)
+    destination = Column(String(3), primary_key=True)
+    departure_date = Column(Date, primary_key=True)
+    fetch_day = Column(Date, primary_key=True)
+    min_price = Column(Numeric(10, 2), nullable=False)
+    max_price = Column(Numeric(10, 2), nullable=False)
+    sum_price = Column(Numeric(14, 2), nullable=False)
+    count = Column(Integer, nullable=False)
+    last_price = Column(Numeric(10, 2), nullable=False)
+    last_fetched_at = Column(DateTime, nullable=False)
+
+    @property
+    def avg_price(self) -> Decimal:
+        return self.sum_price / self.count
+
+class ApiQuotaUsage(Base):
+    __tablename__ = 'api_quota_usage'
+
+    source = Column(String(20), primary_key=True)
+    day = Column(Date, nullable=False)
+    day_used = Column(Integer, nullable=False, default=0)
+    month = Column(String(7), nullable=False)
+    month_used = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+class RouteLease(Base):
+    """Next due time of a pair job and the process currently running it."""
+    __tablename__ = 'route_leases'
+
+    job_id = Column(String(100), primary_key=True)
+    due_at = Column(DateTime(timezone=True), nullable=False)
+    lease_owner = Column(String(100))
+    lease_expires_at = Column(DateTime(timezone=True))
+    last_run_at = Column(DateTime(timezone=True))
+
 def get_database_url(config: dict, async_mode: bool = True) -> str:
     """Build database URL from config."""
     db = config['database']
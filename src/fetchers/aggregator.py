@@ -1,47 +1,223 @@
 # src/fetchers/aggregator.py
 import asyncio
 import logging
-from datetime import date
-from typing import List, Optional
+import time
+from datetime import date, timedelta
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple, Union
 from src.fetchers.base import BaseFetcher
-from src.models import FlightOffer
+from src.metrics import Metrics, metrics as default_metrics
+from src.models import FlightOffer, SourceResult
+from src.offer_batch import OfferBatch
 
 logger = logging.getLogger(__name__)
 
+DateRange = Tuple[date, date]
+
+
+def subtract_ranges(window: DateRange, covered: List[DateRange]) -> List[DateRange]:
+    """Return the parts of `window` not covered by any of the given ranges."""
+    remaining = [window]
+    for cov_start, cov_end in covered:
+        pieces = []
+        for start, end in remaining:
+            if cov_end < start or cov_start > end:
+                pieces.append((start, end))
+                continue
+            if start < cov_start:
+                pieces.append((start, cov_start - timedelta(days=1)))
+            if end > cov_end:
+                pieces.append((cov_end + timedelta(days=1), end))
+        remaining = pieces
+    return remaining
+
+
 class PriceAggregator:
-    """Aggregates results from multiple flight data sources."""
+    """Aggregates results from multiple flight data sources.
+
+    Concurrent requests for the same source and city pair are coalesced: a
+    caller whose date window overlaps one already in flight awaits that fetch
+    and only requests the dates it does not cover.
+
+    Results can be streamed per source as they arrive. With a deadline, any
+    source still running when it passes is reported as late and the check
+    continues with partial results; the late fetch keeps running in the
+    background so its offers still reach the cache.
+    """
 
-    def __init__(self, fetchers: List[BaseFetcher]):
+    def __init__(
+        self,
+        fetchers: List[BaseFetcher],
+        metrics: Optional[Metrics] = None,
+        deadline: Optional[float] = None
+    ):
         self.fetchers = [f for f in fetchers if f.is_available()]
+        self.metrics = metrics or default_metrics
+        self.deadline = deadline
+        self._inflight: Dict[Tuple[str, str, str], List[Tuple[date, date, asyncio.Future]]] = {}
         logger.info(f"Aggregator initialized with {len(self.fetchers)} active fetchers")
 
+    @property
+    def coalescing_hit_rate(self) -> float:
+        """Share of source fetches that reused an in-flight request."""
+        return self.metrics.ratio('aggregator.coalesced', 'aggregator.source_requests')
+
     async def fetch_all(
         self,
         origin: str,
         destination: str,
         date_start: date,
+        date_end: date,
+        on_result: Optional[Callable[[SourceResult], Awaitable[None]]] = None,
+        deadline: Optional[float] = None
+    ) -> List[FlightOffer]:
+        """Fetch from all sources concurrently and combine results.
+
+        `on_result` is awaited with each source's result as soon as it arrives.
+        """
+        all_offers = []
+        async for result in self.fetch_iter(origin, destination, date_start, date_end, deadline):
+            all_offers.extend(result.offers)
+            if on_result is not None:
+                await on_result(result)
+
+        return all_offers
+
+    async def fetch_iter(
+        self,
+        origin: str,
+        destination: str,
+        date_start: date,
+        date_end: date,
+        deadline: Optional[float] = None
+    ) -> AsyncIterator[SourceResult]:
+        """Yield each source's result in completion order.
+
+        `deadline` is in seconds from now and defaults to the aggregator's.
+        """
+        if deadline is None:
+            deadline = self.deadline
+        started = time.monotonic()
+
+        fetchers = []
+        for fetcher in self.fetchers:
+            if fetcher.is_healthy():
+                fetchers.append(fetcher)
+            else:
+                # Open circuit: skip instead of waiting on a failing upstream
+                logger.info(f"{fetcher.source_name}: circuit open, skipped")
+                self.metrics.inc(f'aggregator.skipped.{fetcher.source_name}')
+
+        tasks = {
+            asyncio.ensure_future(self._fetch_source(f, origin, destination, date_start, date_end)): f
+            for f in fetchers
+        }
+        pending = set(tasks)
+
+        try:
+            while pending:
+                timeout = None if deadline is None else max(0.0, deadline - (time.monotonic() - started))
+                done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                elapsed = time.monotonic() - started
+
+                if not done:
+                    for task in pending:
+                        source = tasks[task].source_name
+                        logger.warning(f"{source}: no result within {deadline}s deadline")
+                        self.metrics.inc(f'aggregator.late.{source}')
+                        yield SourceResult(source=source, offers=[], late=True, elapsed=elapsed)
+                    break
+
+                for task in done:
+                    source = tasks[task].source_name
+                    self.metrics.observe(f'aggregator.source_latency.{source}', elapsed)
+                    error = task.exception()
+                    if error is not None:
+                        logger.error(f"{source} error: {error}")
+                        yield SourceResult(source=source, offers=[], error=error, elapsed=elapsed)
+                    else:
+                        offers = task.result()
+                        logger.info(f"{source}: {len(offers)} offers")
+                        yield SourceResult(source=source, offers=offers, elapsed=elapsed)
+        finally:
+            # Underlying fetches are shielded and keep running for the cache
+            for task in pending:
+                task.cancel()
+
+    async def _fetch_source(
+        self,
+        fetcher: BaseFetcher,
+        origin: str,
+        destination: str,
+        date_start: date,
         date_end: date
     ) -> List[FlightOffer]:
-        """Fetch from all sources concurrently and combine results."""
-        tasks = [
-            f.fetch(origin, destination, date_start, date_end)
-            for f in self.fetchers
+        """Fetch one source, sharing overlapping requests that are in flight."""
+        key = (fetcher.source_name, origin, destination)
+        inflight = self._inflight.setdefault(key, [])
+        shared = [
+            future for start, end, future in inflight
+            if start <= date_end and end >= date_start
+        ]
+        covered = [
+            (start, end) for start, end, _ in inflight
+            if start <= date_end and end >= date_start
         ]
+        missing = subtract_ranges((date_start, date_end), covered)
 
-        results = await asyncio.gather(*tasks, return_exceptions=True)
+        self.metrics.inc('aggregator.source_requests')
+        if shared:
+            self.metrics.inc('aggregator.coalesced')
+            if missing:
+                self.metrics.inc('aggregator.coalesced_partial')
+            logger.debug(f"{fetcher.source_name}: joined {len(shared)} in-flight request(s) for {origin}-{destination}")
 
-        all_offers = []
-        for fetcher, result in zip(self.fetchers, results):
-            if isinstance(result, Exception):
-                logger.error(f"{fetcher.source_name} error: {result}")
-            else:
-                all_offers.extend(result)
-                logger.info(f"{fetcher.source_name}: {len(result)} offers")
+        own = [
+            self._start_fetch(key, fetcher, origin, destination, start, end)
+            for start, end in missing
+        ]
 
-        return all_offers
+        # Shield so that one cancelled caller does not abort a shared fetch
+        shared_results = await asyncio.gather(*[asyncio.shield(f) for f in shared])
+        own_results = await asyncio.gather(*[asyncio.shield(f) for f in own])
+
+        offers = [
+            offer for result in shared_results for offer in result
+            if date_start <= offer.departure_date <= date_end
+        ]
+        for result in own_results:
+            offers.extend(result)
+        return offers
+
+    def _start_fetch(
+        self,
+        key: Tuple[str, str, str],
+        fetcher: BaseFetcher,
+        origin: str,
+        destination: str,
+        date_start: date,
+        date_end: date
+    ) -> asyncio.Future:
+        future = asyncio.ensure_future(fetcher.fetch(origin, destination, date_start, date_end))
+        entry = (date_start, date_end, future)
+        self._inflight[key].append(entry)
+
+        def forget(_):
+            entries = self._inflight.get(key)
+            if entries is not None:
+                entries.remove(entry)
+                if not entries:
+                    del self._inflight[key]
+            # Retrieve the exception so unawaited failures are not reported twice
+            if not future.cancelled():
+                future.exception()
+
+        future.add_done_callback(forget)
+        return future
 
-    def get_best_price(self, offers: List[FlightOffer]) -> Optional[FlightOffer]:
+    def get_best_price(self, offers: Union[List[FlightOffer], OfferBatch]) -> Optional[FlightOffer]:
         """Return the offer with lowest price."""
+        if isinstance(offers, OfferBatch):
+            return offers.best()
         if not offers:
             return None
         return min(offers, key=lambda x: x.price)
@@ -1,11 +1,17 @@
 # src/fetchers/amadeus.py
+import asyncio
 import httpx
 import logging
 from datetime import date, datetime, timedelta
 from decimal import Decimal
-from typing import List, Optional
-from src.fetchers.base import BaseFetcher
+from typing import Iterator, List, Optional
+from src.fetchers.base import BaseFetcher, is_upstream_failure
+from src.fetchers.decode import JsonDecoder, default_decoder
+from src.fetchers.quota import acquire_extra_calls
+from src.fetchers.rate_limit import TokenBucket, parse_retry_after
+from src.http_pool import borrow_client
 from src.models import FlightOffer
+from src.offer_batch import OfferBatchBuilder
 
 logger = logging.getLogger(__name__)
 
@@ -15,12 +21,45 @@ class AmadeusFetcher(BaseFetcher):
 
     AUTH_URL = "https://test.api.amadeus.com/v1/security/oauth2/token"
     SEARCH_URL = "https://test.api.amadeus.com/v2/shopping/flight-offers"
+    DATES_URL = "https://test.api.amadeus.com/v1/shopping/flight-dates"
 
-    def __init__(self, client_id: str, client_secret: str):
+    # Refresh the token this long before it expires (at most half its
+    # lifetime), and retry a failed background refresh after this many seconds.
+    TOKEN_REFRESH_MARGIN = timedelta(minutes=5)
+    TOKEN_RETRY_DELAY = 30.0
+
+    def __init__(
+        self,
+        client_id: str,
+        client_secret: str,
+        client: Optional[httpx.AsyncClient] = None,
+        max_concurrency: int = 5,
+        rate_limit: float = 10.0,
+        max_retries: int = 3,
+        retry_backoff: float = 1.0,
+        calendar: bool = False,
+        calendar_top_n: int = 3,
+        decoder: Optional[JsonDecoder] = None
+    ):
         self.client_id = client_id
         self.client_secret = client_secret
+        self.client = client
+        self.decoder = decoder or default_decoder
+        # Amadeus allows 10 transactions per second on the test environment;
+        # the cap and bucket are shared by every route using this fetcher.
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        # Calendar mode: one cheapest-date lookup over the whole window, then
+        # full offer searches on only the cheapest `calendar_top_n` days.
+        self.calendar = calendar
+        self.calendar_top_n = calendar_top_n
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._rate_limiter = TokenBucket(rate_limit)
         self._access_token: Optional[str] = None
         self._token_expires: Optional[datetime] = None
+        self._token_lifetime = timedelta(0)
+        self._token_request: Optional[asyncio.Future] = None
+        self._refresh_task: Optional[asyncio.Task] = None
 
     @property
     def source_name(self) -> str:
@@ -29,13 +68,30 @@ class AmadeusFetcher(BaseFetcher):
     def is_available(self) -> bool:
         return bool(self.client_id and self.client_secret)
 
+    def _token_is_valid(self) -> bool:
+        if self._access_token and self._token_expires:
+            return datetime.now() < self._token_expires - timedelta(minutes=1)
+        return False
+
     async def _get_access_token(self, client: httpx.AsyncClient) -> Optional[str]:
-        """Get OAuth2 access token from Amadeus."""
+        """Get OAuth2 access token from Amadeus.
+
+        Concurrent callers share a single in-flight token request instead of
+        each POSTing to AUTH_URL.
+        """
         # Return cached token if still valid
-        if self._access_token and self._token_expires:
-            if datetime.now() < self._token_expires - timedelta(minutes=1):
-                return self._access_token
+        if self._token_is_valid():
+            return self._access_token
+
+        return await self._request_token_once(client)
+
+    async def _request_token_once(self, client: httpx.AsyncClient) -> Optional[str]:
+        if self._token_request is None or self._token_request.done():
+            self._token_request = asyncio.ensure_future(self._request_token(client))
+        # Shield so that a cancelled caller does not abort the shared request
+        return await asyncio.shield(self._token_request)
 
+    async def _request_token(self, client: httpx.AsyncClient) -> Optional[str]:
         try:
             response = await client.post(
                 self.AUTH_URL,
@@ -52,15 +108,48 @@ class AmadeusFetcher(BaseFetcher):
 
             self._access_token = data.get("access_token")
             expires_in = data.get("expires_in", 1799)
-            self._token_expires = datetime.now() + timedelta(seconds=expires_in)
+            self._token_lifetime = timedelta(seconds=expires_in)
+            self._token_expires = datetime.now() + self._token_lifetime
 
             logger.debug("Amadeus access token obtained")
+            self._schedule_token_refresh()
             return self._access_token
 
         except Exception as e:
             logger.error(f"Amadeus auth error: {e}")
             return None
 
+    def _schedule_token_refresh(self):
+        """Start the background refresher once a shared client is available."""
+        # A throwaway client is closed after each fetch, so only refresh
+        # proactively when the fetcher owns a long-lived one.
+        if self.client is None:
+            return
+        if self._refresh_task is not None and not self._refresh_task.done():
+            return
+        self._refresh_task = asyncio.ensure_future(self._refresh_token_loop())
+
+    async def _refresh_token_loop(self):
+        """Renew the token ahead of expiry so searches never wait on auth."""
+        while True:
+            # Short-lived tokens would otherwise be due again as soon as issued
+            margin = min(self.TOKEN_REFRESH_MARGIN, self._token_lifetime / 2)
+            wait = (self._token_expires - margin - datetime.now()).total_seconds()
+            await asyncio.sleep(wait if wait > 0 else self.TOKEN_RETRY_DELAY)
+
+            token = await self._request_token_once(self.client)
+            if token is None:
+                await asyncio.sleep(self.TOKEN_RETRY_DELAY)
+
+    async def close(self):
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except asyncio.CancelledError:
+                pass
+            self._refresh_task = None
+
     async def fetch(
         self,
         origin: str,
@@ -73,51 +162,165 @@ class AmadeusFetcher(BaseFetcher):
 
         offers = []
 
-        async with httpx.AsyncClient() as client:
+        async with borrow_client(self.client) as client:
             token = await self._get_access_token(client)
             if not token:
                 return []
 
             headers = {"Authorization": f"Bearer {token}"}
 
-            # Amadeus requires specific departure date, so we search day by day
-            # But to reduce API calls, we search a few sample dates
-            sample_dates = self._get_sample_dates(date_start, date_end)
-
-            for dep_date in sample_dates:
-                try:
-                    params = {
-                        "originLocationCode": origin,
-                        "destinationLocationCode": destination,
-                        "departureDate": dep_date.isoformat(),
-                        "adults": 1,
-                        "currencyCode": "CNY",
-                        "max": 10,
-                    }
-
-                    response = await client.get(
-                        self.SEARCH_URL,
-                        params=params,
-                        headers=headers,
-                        timeout=30.0
-                    )
-
-                    if response.status_code == 200:
-                        data = response.json()
-                        day_offers = self._parse_response(data, dep_date)
-                        offers.extend(day_offers)
-                        logger.info(f"Amadeus found {len(day_offers)} offers for {dep_date}")
-                    else:
-                        error_data = response.json() if response.content else {}
-                        error_msg = error_data.get("error_description", response.status_code)
-                        logger.warning(f"Amadeus API error for {dep_date}: {error_msg}")
-
-                except Exception as e:
-                    logger.error(f"Amadeus fetch error for {dep_date}: {e}")
+            search_dates = None
+            if self.calendar:
+                search_dates = await self._get_cheapest_dates(client, headers, origin, destination, date_start, date_end)
+
+            if search_dates is None:
+                # Amadeus requires specific departure date, so we search day by day
+                # But to reduce API calls, we search a few sample dates
+                search_dates = self._get_sample_dates(date_start, date_end)
+                if self.calendar:
+                    # Only the calendar's top dates were charged up front
+                    charged = self.estimate_calls(date_start, date_end) - 1
+                    extra = len(search_dates) - charged
+                    if extra > 0 and not await acquire_extra_calls(extra):
+                        logger.warning(
+                            f"Amadeus: quota exhausted, sampling {charged} of "
+                            f"{len(search_dates)} dates for {origin}->{destination}"
+                        )
+                        search_dates = search_dates[:charged]
+
+            results = await asyncio.gather(*[
+                self._search_date(client, headers, origin, destination, dep_date)
+                for dep_date in search_dates
+            ], return_exceptions=True)
+            for day_offers in results:
+                # An unreachable source fails the whole fetch rather than
+                # passing off its dates as having no flights
+                if isinstance(day_offers, BaseException):
+                    raise day_offers
+                offers.extend(day_offers)
 
         logger.info(f"Amadeus total: {len(offers)} offers from {origin} to {destination}")
         return offers
 
+    async def _search_date(
+        self,
+        client: httpx.AsyncClient,
+        headers: dict,
+        origin: str,
+        destination: str,
+        dep_date: date
+    ) -> List[FlightOffer]:
+        """Search a single departure date, retrying it alone on HTTP 429."""
+        params = {
+            "originLocationCode": origin,
+            "destinationLocationCode": destination,
+            "departureDate": dep_date.isoformat(),
+            "adults": 1,
+            "currencyCode": "CNY",
+            "max": 10,
+        }
+
+        try:
+            response = await self._get(client, self.SEARCH_URL, params, headers, dep_date)
+
+            if response.status_code == 200:
+                day_offers = await self.decoder.parse(
+                    response.content, lambda data: self._parse_response(data, dep_date)
+                )
+                logger.info(f"Amadeus found {len(day_offers)} offers for {dep_date}")
+                return day_offers
+            if response.status_code >= 500:
+                response.raise_for_status()
+
+            error_data = response.json() if response.content else {}
+            error_msg = error_data.get("error_description", response.status_code)
+            logger.warning(f"Amadeus API error for {dep_date}: {error_msg}")
+            return []
+
+        except Exception as e:
+            if is_upstream_failure(e):
+                raise
+            logger.error(f"Amadeus fetch error for {dep_date}: {e}")
+            return []
+
+    async def _get(
+        self,
+        client: httpx.AsyncClient,
+        url: str,
+        params: dict,
+        headers: dict,
+        label
+    ) -> httpx.Response:
+        """Rate-limited GET that backs off and retries on HTTP 429."""
+        for attempt in range(self.max_retries + 1):
+            await self._rate_limiter.acquire()
+            async with self._semaphore:
+                response = await client.get(url, params=params, headers=headers, timeout=30.0)
+
+            if response.status_code != 429 or attempt == self.max_retries:
+                return response
+
+            delay = parse_retry_after(response.headers.get("Retry-After"))
+            if delay is None:
+                delay = self.retry_backoff * (2 ** attempt)
+            logger.warning(f"Amadeus rate limited for {label}, retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+    async def _get_cheapest_dates(
+        self,
+        client: httpx.AsyncClient,
+        headers: dict,
+        origin: str,
+        destination: str,
+        date_start: date,
+        date_end: date
+    ) -> Optional[List[date]]:
+        """Return the cheapest departure days in the window, or None on failure."""
+        params = {
+            "origin": origin,
+            "destination": destination,
+            "departureDate": f"{date_start.isoformat()},{date_end.isoformat()}",
+            "oneWay": "true",
+        }
+
+        try:
+            response = await self._get(client, self.DATES_URL, params, headers, "calendar")
+            if response.status_code != 200:
+                logger.warning(f"Amadeus calendar unavailable ({response.status_code}), sampling dates instead")
+                return None
+            days = self._parse_calendar(response.json(), date_start, date_end)
+        except Exception as e:
+            logger.warning(f"Amadeus calendar error, sampling dates instead: {e}")
+            return None
+
+        if not days:
+            return None
+        logger.info(f"Amadeus calendar: cheapest of {len(days)} days are {days[:self.calendar_top_n]}")
+        return days[:self.calendar_top_n]
+
+    def _parse_calendar(self, data: dict, date_start: date, date_end: date) -> List[date]:
+        """Departure days in the window, cheapest first."""
+        quotes = {}
+        for item in data.get("data", []):
+            try:
+                day = date.fromisoformat(item["departureDate"])
+                price = Decimal(str(item.get("price", {}).get("total")))
+            except Exception:
+                continue
+            if date_start <= day <= date_end and (day not in quotes or price < quotes[day]):
+                quotes[day] = price
+        return sorted(quotes, key=lambda day: (quotes[day], day))
+
+    def estimate_calls(self, date_start: date, date_end: date) -> int:
+        if self.calendar:
+            days = (date_end - date_start).days + 1
+            return 1 + min(self.calendar_top_n, days)
+        return len(self._get_sample_dates(date_start, date_end))
+
+    def searched_dates(self, date_start: date, date_end: date) -> Optional[List[date]]:
+        # Calendar mode picks its days from the cheapest-date lookup
+        return None if self.calendar else self._get_sample_dates(date_start, date_end)
+
     def _get_sample_dates(self, date_start: date, date_end: date) -> List[date]:
         """Get sample dates to search (to reduce API calls)."""
         dates = []
@@ -129,8 +332,19 @@ class AmadeusFetcher(BaseFetcher):
         return dates[:10]  # Max 10 dates to avoid rate limits
 
     def _parse_response(self, data: dict, departure_date: date) -> List[FlightOffer]:
-        offers = []
+        return [FlightOffer(*row) for row in self._iter_rows(data, departure_date)]
 
+    def _parse_batch(self, data: dict, departure_date: date, batch: OfferBatchBuilder) -> OfferBatchBuilder:
+        """Append the response's offers to a columnar batch."""
+        for row in self._iter_rows(data, departure_date):
+            try:
+                batch.append(*row)
+            except ValueError as e:
+                logger.warning(f"Skipping Amadeus offer: {e}")
+        return batch
+
+    def _iter_rows(self, data: dict, departure_date: date) -> Iterator[tuple]:
+        """Yield each offer's fields in FlightOffer order."""
         for item in data.get("data", []):
             try:
                 price_info = item.get("price", {})
@@ -157,20 +371,20 @@ class AmadeusFetcher(BaseFetcher):
                 carrier = first_segment.get("carrierCode", "")
                 flight_num = first_segment.get("number", "")
 
-                offer = FlightOffer(
-                    origin=first_segment.get("departure", {}).get("iataCode", ""),
-                    destination=last_segment.get("arrival", {}).get("iataCode", ""),
-                    departure_date=dep_date,
-                    price=price,
-                    currency=currency,
-                    airline=carrier,
-                    flight_number=f"{carrier}{flight_num}",
-                    stops=len(segments) - 1,
-                    source=self.source_name
+                row = (
+                    first_segment.get("departure", {}).get("iataCode", ""),
+                    last_segment.get("arrival", {}).get("iataCode", ""),
+                    dep_date,
+                    price,
+                    currency,
+                    carrier,
+                    f"{carrier}{flight_num}",
+                    len(segments) - 1,
+                    self.source_name
                 )
-                offers.append(offer)
 
             except Exception as e:
                 logger.warning(f"Failed to parse Amadeus offer: {e}")
+                continue
 
-        return offers
+            yield row
@@ -1,11 +1,16 @@
 # src/fetchers/aviationstack.py
+import asyncio
 import httpx
 import logging
 from datetime import date
 from decimal import Decimal
-from typing import List
-from src.fetchers.base import BaseFetcher
+from typing import Iterator, List, Optional, Tuple
+from src.fetchers.base import BaseFetcher, is_upstream_failure
+from src.fetchers.decode import JsonDecoder, default_decoder
+from src.fetchers.quota import acquire_extra_calls
+from src.http_pool import borrow_client
 from src.models import FlightOffer
+from src.offer_batch import OfferBatchBuilder
 
 logger = logging.getLogger(__name__)
 
@@ -19,9 +24,24 @@ class AviationStackFetcher(BaseFetcher):
     """
 
     BASE_URL = "http://api.aviationstack.com/v1/flights"
+    PAGE_SIZE = 100
 
-    def __init__(self, api_key: str):
+    def __init__(
+        self,
+        api_key: str,
+        client: Optional[httpx.AsyncClient] = None,
+        max_pages: int = 10,
+        max_concurrency: int = 4,
+        server_date_filter: bool = False,
+        decoder: Optional[JsonDecoder] = None
+    ):
         self.api_key = api_key
+        self.client = client
+        self.decoder = decoder or default_decoder
+        self.max_pages = max(1, max_pages)
+        self.max_concurrency = max(1, max_concurrency)
+        # `flight_date` is only honoured on paid plans
+        self.server_date_filter = server_date_filter
 
     @property
     def source_name(self) -> str:
@@ -42,24 +62,20 @@ class AviationStackFetcher(BaseFetcher):
 
         offers = []
 
-        async with httpx.AsyncClient() as client:
+        # AviationStack uses IATA codes for departure/arrival airports
+        params = {
+            "access_key": self.api_key,
+            "dep_iata": origin,
+            "arr_iata": destination,
+            "flight_status": "scheduled",
+            "limit": self.PAGE_SIZE,
+        }
+        if self.server_date_filter and date_start == date_end:
+            params["flight_date"] = date_start.isoformat()
+
+        async with borrow_client(self.client) as client:
             try:
-                # AviationStack uses IATA codes for departure/arrival airports
-                params = {
-                    "access_key": self.api_key,
-                    "dep_iata": origin,
-                    "arr_iata": destination,
-                    "flight_status": "scheduled",
-                    "limit": 100,
-                }
-
-                response = await client.get(
-                    self.BASE_URL,
-                    params=params,
-                    timeout=30.0
-                )
-                response.raise_for_status()
-                data = response.json()
+                data, offers = await self._get_page(client, params, 0, date_start, date_end)
 
                 # Check for API errors
                 if "error" in data:
@@ -68,24 +84,123 @@ class AviationStackFetcher(BaseFetcher):
                     logger.error(f"AviationStack API error: {error_msg}")
                     return []
 
-                offers = self._parse_response(data, date_start, date_end)
+                offers.extend(await self._fetch_remaining_pages(client, params, data, date_start, date_end))
                 logger.info(f"AviationStack found {len(offers)} flights from {origin} to {destination}")
 
             except httpx.HTTPStatusError as e:
+                if is_upstream_failure(e):
+                    raise
                 logger.error(f"AviationStack HTTP error: {e.response.status_code}")
             except Exception as e:
+                if is_upstream_failure(e):
+                    raise
                 logger.error(f"AviationStack API error: {e}")
 
         return offers
 
+    async def _get_page(
+        self,
+        client: httpx.AsyncClient,
+        params: dict,
+        offset: int,
+        date_start: date,
+        date_end: date
+    ) -> Tuple[dict, List[FlightOffer]]:
+        """Fetch one page and return it with its parsed flights."""
+        response = await client.get(
+            self.BASE_URL,
+            params={**params, "offset": offset},
+            timeout=30.0
+        )
+        response.raise_for_status()
+
+        def parse(data: dict) -> Tuple[dict, List[FlightOffer]]:
+            if "error" in data:
+                return data, []
+            return data, self._parse_response(data, date_start, date_end)
+
+        return await self.decoder.parse(response.content, parse)
+
+    async def _fetch_remaining_pages(
+        self,
+        client: httpx.AsyncClient,
+        params: dict,
+        first_page: dict,
+        date_start: date,
+        date_end: date
+    ) -> List[FlightOffer]:
+        """Fetch the pages after the first concurrently, parsing each as it lands.
+
+        Each extra page is charged to the quota before it is requested; pages
+        the quota refuses are not read.
+        """
+        pagination = first_page.get("pagination") or {}
+        limit = int(pagination.get("limit") or self.PAGE_SIZE)
+        total = int(pagination.get("total") or 0)
+        last = min(total, limit * self.max_pages)
+        if total > last:
+            logger.warning(f"AviationStack: {total} flights available, reading only the first {last}")
+
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def get_page(offset: int) -> Optional[Tuple[dict, List[FlightOffer]]]:
+            async with semaphore:
+                if not await acquire_extra_calls(1):
+                    return None
+                return await self._get_page(client, params, offset, date_start, date_end)
+
+        offers = []
+        skipped = 0
+        tasks = [asyncio.ensure_future(get_page(offset)) for offset in range(limit, last, limit)]
+        try:
+            for page in asyncio.as_completed(tasks):
+                try:
+                    result = await page
+                except Exception as e:
+                    if is_upstream_failure(e):
+                        raise
+                    logger.error(f"AviationStack page error: {e}")
+                    continue
+                if result is None:
+                    skipped += 1
+                    continue
+                data, page_offers = result
+                if "error" in data:
+                    logger.error(f"AviationStack page error: {data['error'].get('message', 'Unknown error')}")
+                    continue
+                offers.extend(page_offers)
+        finally:
+            for task in tasks:
+                task.cancel()
+        if skipped:
+            logger.warning(f"AviationStack: quota exhausted, skipped {skipped} of {len(tasks)} extra pages")
+        return offers
+
     def _parse_response(
         self,
         data: dict,
         date_start: date,
         date_end: date
     ) -> List[FlightOffer]:
-        offers = []
+        return [FlightOffer(*row) for row in self._iter_rows(data, date_start, date_end)]
 
+    def _parse_batch(
+        self,
+        data: dict,
+        date_start: date,
+        date_end: date,
+        batch: OfferBatchBuilder
+    ) -> OfferBatchBuilder:
+        """Append the response's flights to a columnar batch."""
+        for row in self._iter_rows(data, date_start, date_end):
+            try:
+                batch.append(*row)
+            except ValueError as e:
+                logger.warning(f"Skipping AviationStack offer: {e}")
+        return batch
+
+    def _iter_rows(self, data: dict, date_start: date, date_end: date) -> Iterator[tuple]:
+        """Yield each flight's fields in FlightOffer order."""
         for item in data.get("data", []):
             try:
                 # Extract departure date
@@ -110,20 +225,20 @@ class AviationStackFetcher(BaseFetcher):
 
                 # AviationStack doesn't provide pricing, so we set price to 0
                 # to indicate "price not available from this source"
-                offer = FlightOffer(
-                    origin=departure_info.get("iata", ""),
-                    destination=arrival_info.get("iata", ""),
-                    departure_date=dep_date,
-                    price=Decimal("0"),  # Price not available from AviationStack
-                    currency="CNY",
-                    airline=airline_info.get("name", airline_info.get("iata", "")),
-                    flight_number=flight_info.get("number", flight_info.get("iata", "")),
-                    stops=0,  # AviationStack shows direct flights in this endpoint
-                    source=self.source_name
+                row = (
+                    departure_info.get("iata", ""),
+                    arrival_info.get("iata", ""),
+                    dep_date,
+                    Decimal("0"),  # Price not available from AviationStack
+                    "CNY",
+                    airline_info.get("name", airline_info.get("iata", "")),
+                    flight_info.get("number", flight_info.get("iata", "")),
+                    0,  # AviationStack shows direct flights in this endpoint
+                    self.source_name
                 )
-                offers.append(offer)
 
             except Exception as e:
                 logger.warning(f"Failed to parse AviationStack offer: {e}")
+                continue
 
-        return offers
+            yield row
@@ -1,9 +1,22 @@
 # src/fetchers/base.py
+import httpx
 from abc import ABC, abstractmethod
-from datetime import date
-from typing import List
+from datetime import date, timedelta
+from typing import List, Optional
 from src.models import FlightOffer
 
+
+def is_upstream_failure(error: BaseException) -> bool:
+    """Whether an error means the source itself is failing.
+
+    Connection problems, timeouts and 5xx responses are raised from fetch so
+    the circuit breaker can count them; client errors and malformed payloads
+    are handled inside the fetcher.
+    """
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code >= 500
+    return isinstance(error, httpx.TransportError)
+
 class BaseFetcher(ABC):
     """Base class for flight data source adapters."""
 
@@ -28,3 +41,66 @@ class BaseFetcher(ABC):
     def is_available(self) -> bool:
         """Check if this fetcher is properly configured and available."""
         pass
+
+    def estimate_calls(self, date_start: date, date_end: date) -> int:
+        """Estimate how many upstream API calls one fetch of this window costs."""
+        return 1
+
+    def searched_dates(self, date_start: date, date_end: date) -> Optional[List[date]]:
+        """Departure dates one fetch of this window searches in full.
+
+        An empty result for these dates means there are no flights. None
+        means coverage is only known from the offers returned, e.g. for
+        sources that cap their results.
+        """
+        return [date_start + timedelta(days=i) for i in range((date_end - date_start).days + 1)]
+
+    def is_healthy(self) -> bool:
+        """Whether the source should be queried right now."""
+        return True
+
+    async def close(self):
+        """Release background tasks or other resources held by this fetcher."""
+        pass
+
+
+class FetcherWrapper(BaseFetcher):
+    """Base class for fetchers that add behaviour around another fetcher."""
+
+    def __init__(self, fetcher: BaseFetcher):
+        self.fetcher = fetcher
+
+    @property
+    def source_name(self) -> str:
+        return self.fetcher.source_name
+
+    async def fetch(
+        self,
+        origin: str,
+        destination: str,
+        date_start: date,
+        date_end: date
+    ) -> List[FlightOffer]:
+        return await self.fetcher.fetch(origin, destination, date_start, date_end)
+
+    def is_available(self) -> bool:
+        return self.fetcher.is_available()
+
+    def estimate_calls(self, date_start: date, date_end: date) -> int:
+        return self.fetcher.estimate_calls(date_start, date_end)
+
+    def searched_dates(self, date_start: date, date_end: date) -> Optional[List[date]]:
+        return self.fetcher.searched_dates(date_start, date_end)
+
+    def is_healthy(self) -> bool:
+        return self.fetcher.is_healthy()
+
+    async def close(self):
+        await self.fetcher.close()
+
+    def unwrap(self) -> BaseFetcher:
+        """Return the innermost, undecorated fetcher."""
+        inner = self.fetcher
+        while isinstance(inner, FetcherWrapper):
+            inner = inner.fetcher
+        return inner
@@ -0,0 +1,292 @@
+# src/fetchers/cache.py
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from datetime import date, timedelta
+from decimal import Decimal
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from src.fetchers.base import BaseFetcher, FetcherWrapper
+from src.models import CompactFlightOffer, FlightOffer
+
+logger = logging.getLogger(__name__)
+
+# Seconds a cached departure date stays fresh, per source
+DEFAULT_TTLS = {
+    'amadeus': 1800,
+    'kiwi': 900,
+    'aviationstack': 3600,
+}
+
+CacheKey = Tuple[str, str, str, date]
+
+
+def offer_to_dict(offer: FlightOffer) -> dict:
+    return {
+        'origin': offer.origin,
+        'destination': offer.destination,
+        'departure_date': offer.departure_date.isoformat(),
+        'price': str(offer.price),
+        'currency': offer.currency,
+        'airline': offer.airline,
+        'flight_number': offer.flight_number,
+        'stops': offer.stops,
+        'source': offer.source,
+    }
+
+
+def offer_from_dict(data: dict) -> FlightOffer:
+    return FlightOffer(
+        origin=data['origin'],
+        destination=data['destination'],
+        departure_date=date.fromisoformat(data['departure_date']),
+        price=Decimal(data['price']),
+        currency=data['currency'],
+        airline=data['airline'],
+        flight_number=data['flight_number'],
+        stops=data['stops'],
+        source=data['source'],
+    )
+
+
+def compact_offers(offers: List[FlightOffer]) -> tuple:
+    """Shrink offers for long-term storage, keeping any that cannot convert."""
+    compact = []
+    for offer in offers:
+        try:
+            compact.append(CompactFlightOffer.from_offer(offer))
+        except ValueError:
+            compact.append(offer)
+    return tuple(compact)
+
+
+def expand_offers(offers: tuple) -> List[FlightOffer]:
+    return [o.to_offer() if isinstance(o, CompactFlightOffer) else o for o in offers]
+
+
+def contiguous_ranges(days: Iterable[date]) -> List[Tuple[date, date]]:
+    """Collapse sorted dates into (start, end) runs of consecutive days."""
+    ranges = []
+    for day in sorted(days):
+        if ranges and day == ranges[-1][1] + timedelta(days=1):
+            ranges[-1] = (ranges[-1][0], day)
+        else:
+            ranges.append((day, day))
+    return ranges
+
+
+class DiskCache:
+    """SQLite tier shared by every process that points at the same file."""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS offer_cache (
+                source TEXT NOT NULL,
+                origin TEXT NOT NULL,
+                destination TEXT NOT NULL,
+                departure_date TEXT NOT NULL,
+                expires_at REAL NOT NULL,
+                offers TEXT NOT NULL,
+                PRIMARY KEY (source, origin, destination, departure_date)
+            )
+        """)
+        self._conn.commit()
+
+    def get_many(self, source: str, origin: str, destination: str, days: List[date], now: float) -> Dict[date, Tuple[float, list]]:
+        placeholders = ",".join("?" * len(days))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT departure_date, expires_at, offers FROM offer_cache "
+                f"WHERE source = ? AND origin = ? AND destination = ? "
+                f"AND departure_date IN ({placeholders}) AND expires_at > ?",
+                [source, origin, destination, *[d.isoformat() for d in days], now]
+            ).fetchall()
+        return {
+            date.fromisoformat(day): (expires_at, [offer_from_dict(o) for o in json.loads(offers)])
+            for day, expires_at, offers in rows
+        }
+
+    def put_many(self, source: str, origin: str, destination: str, entries: Dict[date, List[FlightOffer]], expires_at: float):
+        rows = [
+            (source, origin, destination, day.isoformat(), expires_at,
+             json.dumps([offer_to_dict(o) for o in offers]))
+            for day, offers in entries.items()
+        ]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO offer_cache VALUES (?, ?, ?, ?, ?, ?)", rows
+            )
+            self._conn.execute("DELETE FROM offer_cache WHERE expires_at <= ?", (time.time(),))
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class ResponseCache:
+    """Offers cached per (source, origin, destination, departure date).
+
+    A bounded LRU dict serves hot entries, held as CompactFlightOffer tuples
+    to keep the resident set small; an optional SQLite file keeps them across
+    restarts and lets the `check` command share the daemon's results.
+    """
+
+    def __init__(
+        self,
+        ttls: Optional[Dict[str, float]] = None,
+        default_ttl: float = 900,
+        max_entries: int = 10000,
+        disk_path: Optional[str] = None,
+        clock: Callable[[], float] = time.time
+    ):
+        self.ttls = {**DEFAULT_TTLS, **(ttls or {})}
+        self.default_ttl = default_ttl
+        self.max_entries = max_entries
+        self.clock = clock
+        self.disk = DiskCache(disk_path) if disk_path else None
+        self._memory: "OrderedDict[CacheKey, Tuple[float, tuple]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def ttl_for(self, source: str) -> float:
+        return float(self.ttls.get(source, self.default_ttl))
+
+    def _remember(self, key: CacheKey, expires_at: float, offers: List[FlightOffer]):
+        self._memory[key] = (expires_at, compact_offers(offers))
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    async def get_many(self, source: str, origin: str, destination: str, days: List[date]) -> Dict[date, List[FlightOffer]]:
+        """Return fresh cached offers for whichever of `days` are cached."""
+        now = self.clock()
+        found = {}
+        for day in days:
+            key = (source, origin, destination, day)
+            entry = self._memory.get(key)
+            if entry is None:
+                continue
+            if entry[0] <= now:
+                del self._memory[key]
+                continue
+            self._memory.move_to_end(key)
+            found[day] = expand_offers(entry[1])
+
+        missing = [day for day in days if day not in found]
+        if missing and self.disk is not None:
+            try:
+                rows = await asyncio.to_thread(self.disk.get_many, source, origin, destination, missing, now)
+            except Exception as e:
+                logger.warning(f"Disk cache read failed: {e}")
+                rows = {}
+            for day, (expires_at, offers) in rows.items():
+                self._remember((source, origin, destination, day), expires_at, offers)
+                found[day] = offers
+
+        self.hits += len(found)
+        self.misses += len(days) - len(found)
+        return found
+
+    async def put_many(self, source: str, origin: str, destination: str, entries: Dict[date, List[FlightOffer]]):
+        expires_at = self.clock() + self.ttl_for(source)
+        for day, offers in entries.items():
+            self._remember((source, origin, destination, day), expires_at, offers)
+
+        if self.disk is not None:
+            try:
+                await asyncio.to_thread(self.disk.put_many, source, origin, destination, entries, expires_at)
+            except Exception as e:
+                logger.warning(f"Disk cache write failed: {e}")
+
+    def wrap(self, fetcher: BaseFetcher) -> 'CachedFetcher':
+        return CachedFetcher(fetcher, self)
+
+    def close(self):
+        if self.disk is not None:
+            self.disk.close()
+            self.disk = None
+
+
+class CachedFetcher(FetcherWrapper):
+    """Serves cached departure dates and fetches only the missing ones."""
+
+    def __init__(self, fetcher: BaseFetcher, cache: ResponseCache):
+        super().__init__(fetcher)
+        self.cache = cache
+
+    async def fetch(
+        self,
+        origin: str,
+        destination: str,
+        date_start: date,
+        date_end: date
+    ) -> List[FlightOffer]:
+        source = self.source_name
+        days = self.fetcher.searched_dates(date_start, date_end)
+        if days is None:
+            return await self._fetch_window(origin, destination, date_start, date_end)
+
+        cached = await self.cache.get_many(source, origin, destination, days)
+
+        offers = [offer for day in days if day in cached for offer in cached[day]]
+        missing = contiguous_ranges(day for day in days if day not in cached)
+        if not missing:
+            logger.debug(f"{source} cache hit for {origin}-{destination} {date_start}..{date_end}")
+            return offers
+
+        results = await asyncio.gather(*[
+            self._fetch_range(origin, destination, start, end) for start, end in missing
+        ])
+        for fetched in results:
+            offers.extend(fetched)
+        return offers
+
+    async def _fetch_window(self, origin: str, destination: str, date_start: date, date_end: date) -> List[FlightOffer]:
+        """Fetch for sources whose coverage is only known from their results.
+
+        Only days that returned offers are cached, so the window is served
+        from the cache only when every one of its days is cached, and
+        otherwise fetched whole.
+        """
+        source = self.source_name
+        days = [date_start + timedelta(days=i) for i in range((date_end - date_start).days + 1)]
+        cached = await self.cache.get_many(source, origin, destination, days)
+        if len(cached) == len(days):
+            logger.debug(f"{source} cache hit for {origin}-{destination} {date_start}..{date_end}")
+            return [offer for day in days for offer in cached[day]]
+
+        fetched = await self.fetcher.fetch(origin, destination, date_start, date_end)
+        if fetched:
+            await self.cache.put_many(source, origin, destination, self._by_day(fetched))
+        return fetched
+
+    @staticmethod
+    def _by_day(offers: List[FlightOffer]) -> Dict[date, List[FlightOffer]]:
+        by_day = defaultdict(list)
+        for offer in offers:
+            by_day[offer.departure_date].append(offer)
+        return by_day
+
+    async def _fetch_range(self, origin: str, destination: str, start: date, end: date) -> List[FlightOffer]:
+        fetched = await self.fetcher.fetch(origin, destination, start, end)
+        # Fetchers swallow upstream errors and return nothing, so an empty
+        # result is not trusted enough to be cached.
+        if not fetched:
+            return fetched
+
+        # Days the fetch did not search are left uncached rather than
+        # recorded as having no flights
+        by_day = self._by_day(fetched)
+        entries = {day: by_day.get(day, []) for day in self.fetcher.searched_dates(start, end) or by_day}
+        await self.cache.put_many(self.source_name, origin, destination, entries)
+        return fetched
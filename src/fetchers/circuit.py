@@ -0,0 +1,204 @@
+# src/fetchers/circuit.py
+import asyncio
+import logging
+import time
+from collections import deque
+from datetime import date
+from typing import Callable, List, Optional
+from src.fetchers.base import BaseFetcher, FetcherWrapper
+from src.metrics import Metrics, metrics as default_metrics
+from src.models import FlightOffer
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised when a fetch is refused because the source's circuit is open."""
+
+
+class CircuitBreaker:
+    """Closed/open/half-open breaker over a sliding window of recent calls.
+
+    The circuit opens when, over the last `window` calls (and at least
+    `min_calls`), the error rate reaches `error_rate` or the
+    `latency_percentile` latency reaches `latency_threshold` seconds. After
+    `open_seconds` a single trial call is let through; its outcome closes or
+    reopens the circuit.
+    """
+
+    def __init__(
+        self,
+        window: int = 20,
+        min_calls: int = 5,
+        error_rate: float = 0.5,
+        latency_threshold: Optional[float] = None,
+        latency_percentile: float = 0.95,
+        open_seconds: float = 60.0,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.min_calls = min_calls
+        self.error_rate = error_rate
+        self.latency_threshold = latency_threshold
+        self.latency_percentile = latency_percentile
+        self.open_seconds = open_seconds
+        self.clock = clock
+        self._calls: deque = deque(maxlen=window)
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self._state == OPEN and self.clock() - self._opened_at >= self.open_seconds:
+            self._state = HALF_OPEN
+            self._trial_in_flight = False
+        return self._state
+
+    def is_open(self) -> bool:
+        """True while calls would be refused; does not consume a trial call."""
+        state = self.state
+        return state == OPEN or (state == HALF_OPEN and self._trial_in_flight)
+
+    def allow_request(self) -> bool:
+        state = self.state
+        if state == CLOSED:
+            return True
+        if state == HALF_OPEN and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        return False
+
+    def percentile(self, p: float) -> Optional[float]:
+        if not self._calls:
+            return None
+        latencies = sorted(latency for _, latency in self._calls)
+        return latencies[min(len(latencies) - 1, int(p * len(latencies)))]
+
+    def record_success(self, latency: float):
+        if self._state == HALF_OPEN:
+            self._close()
+            return
+        self._calls.append((True, latency))
+        self._evaluate()
+
+    def record_failure(self, latency: float):
+        if self._state == HALF_OPEN:
+            self._open()
+            return
+        self._calls.append((False, latency))
+        self._evaluate()
+
+    def _evaluate(self):
+        if self._state != CLOSED or len(self._calls) < self.min_calls:
+            return
+        failures = sum(1 for ok, _ in self._calls if not ok)
+        if failures / len(self._calls) >= self.error_rate:
+            self._open()
+        elif self.latency_threshold is not None and self.percentile(self.latency_percentile) >= self.latency_threshold:
+            self._open()
+
+    def _open(self):
+        self._state = OPEN
+        self._opened_at = self.clock()
+        self._trial_in_flight = False
+
+    def _close(self):
+        self._state = CLOSED
+        self._calls.clear()
+        self._trial_in_flight = False
+
+
+class CircuitBreakerFetcher(FetcherWrapper):
+    """Guards a fetcher with a circuit breaker and optional hedged requests.
+
+    A fetch that raises or exceeds `timeout` counts as a failure. With
+    `hedge` enabled, a fetch still running after `hedge_delay` seconds (by
+    default the observed p95 latency) gets a duplicate and whichever finishes
+    first wins.
+    """
+
+    def __init__(
+        self,
+        fetcher: BaseFetcher,
+        breaker: Optional[CircuitBreaker] = None,
+        timeout: Optional[float] = None,
+        hedge: bool = False,
+        hedge_delay: Optional[float] = None,
+        metrics: Optional[Metrics] = None
+    ):
+        super().__init__(fetcher)
+        self.breaker = breaker or CircuitBreaker()
+        self.timeout = timeout
+        self.hedge = hedge
+        self.hedge_delay = hedge_delay
+        self.metrics = metrics or default_metrics
+
+    def is_healthy(self) -> bool:
+        return not self.breaker.is_open() and self.fetcher.is_healthy()
+
+    async def fetch(
+        self,
+        origin: str,
+        destination: str,
+        date_start: date,
+        date_end: date
+    ) -> List[FlightOffer]:
+        if not self.breaker.allow_request():
+            self.metrics.inc(f'circuit.rejected.{self.source_name}')
+            raise CircuitOpenError(f"{self.source_name} circuit is open")
+
+        previous = self.breaker.state
+        started = time.monotonic()
+        try:
+            offers = await self._call(origin, destination, date_start, date_end)
+        except Exception:
+            self.breaker.record_failure(time.monotonic() - started)
+            self._log_transition(previous)
+            raise
+
+        self.breaker.record_success(time.monotonic() - started)
+        self._log_transition(previous)
+        return offers
+
+    def _log_transition(self, previous: str):
+        state = self.breaker.state
+        if state != previous:
+            logger.warning(f"{self.source_name} circuit {previous} -> {state}")
+            self.metrics.inc(f'circuit.{state}.{self.source_name}')
+
+    async def _call(self, origin: str, destination: str, date_start: date, date_end: date) -> List[FlightOffer]:
+        primary = asyncio.ensure_future(self.fetcher.fetch(origin, destination, date_start, date_end))
+        delay = self.hedge_delay if self.hedge_delay is not None else self.breaker.percentile(0.95)
+        if not self.hedge or delay is None or (self.timeout is not None and delay >= self.timeout):
+            return await asyncio.wait_for(primary, self.timeout)
+
+        started = time.monotonic()
+        done, _ = await asyncio.wait({primary}, timeout=delay)
+        if done:
+            return primary.result()
+
+        self.metrics.inc(f'circuit.hedged.{self.source_name}')
+        backup = asyncio.ensure_future(self.fetcher.fetch(origin, destination, date_start, date_end))
+        pending = {primary, backup}
+        error: Optional[BaseException] = None
+        try:
+            while pending:
+                remaining = None if self.timeout is None else self.timeout - (time.monotonic() - started)
+                if remaining is not None and remaining <= 0:
+                    break
+                done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+        finally:
+            for task in pending:
+                task.cancel()
+
+        if error is not None:
+            raise error
+        raise asyncio.TimeoutError(f"{self.source_name} fetch timed out after {self.timeout}s")
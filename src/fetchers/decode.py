@@ -0,0 +1,68 @@
+# src/fetchers/decode.py
+import asyncio
+import json
+import logging
+from concurrent.futures import Executor
+from decimal import Decimal
+from typing import Any, Callable, Optional, TypeVar
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+from src.metrics import Metrics, metrics as default_metrics
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+BACKENDS = ('auto', 'orjson', 'json')
+
+
+class JsonDecoder:
+    """Decodes response bodies and runs the fetcher's parser over them.
+
+    The `orjson` backend is used when installed (`auto`); the stdlib
+    backend reads non-integer numbers as Decimal straight from the JSON
+    text, so prices are exact. Bodies of at least `offload_threshold` bytes
+    are decoded and parsed in `executor` (the default thread pool when None)
+    so that large pages do not stall the event loop.
+    """
+
+    def __init__(
+        self,
+        backend: str = 'auto',
+        offload_threshold: Optional[int] = 256 * 1024,
+        executor: Optional[Executor] = None,
+        metrics: Optional[Metrics] = None
+    ):
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown JSON backend {backend!r}, expected one of {BACKENDS}")
+        if backend == 'orjson' and orjson is None:
+            logger.warning("JSON backend 'orjson' requested but not installed, falling back to json")
+        self.backend = 'orjson' if backend != 'json' and orjson is not None else 'json'
+        self.offload_threshold = offload_threshold
+        self.executor = executor
+        self.metrics = metrics or default_metrics
+
+    def loads(self, content: bytes) -> Any:
+        if self.backend == 'orjson':
+            return orjson.loads(content)
+        return json.loads(content, parse_float=Decimal)
+
+    def _decode(self, content: bytes, parse: Optional[Callable[[Any], T]]) -> T:
+        data = self.loads(content)
+        return parse(data) if parse is not None else data
+
+    async def parse(self, content: bytes, parse: Optional[Callable[[Any], T]] = None) -> T:
+        """Decode `content` and apply `parse`, off the loop for large bodies."""
+        if self.offload_threshold is None or len(content) < self.offload_threshold:
+            return self._decode(content, parse)
+
+        self.metrics.inc('decode.offloaded')
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self._decode, content, parse)
+
+
+default_decoder = JsonDecoder()
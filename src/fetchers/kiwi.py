@@ -1,21 +1,53 @@
 # src/fetchers/kiwi.py
+import asyncio
 import httpx
 import logging
+from collections import defaultdict
 from datetime import date, timedelta
 from decimal import Decimal
-from typing import List
-from src.fetchers.base import BaseFetcher
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+from src.fetchers.base import BaseFetcher, is_upstream_failure
+from src.fetchers.decode import JsonDecoder, default_decoder
+from src.fetchers.quota import acquire_extra_calls
+from src.http_pool import borrow_client
 from src.models import FlightOffer
+from src.offer_batch import OfferBatchBuilder
 
 logger = logging.getLogger(__name__)
 
+# (origin, destination, date_start, date_end)
+RouteQuery = Tuple[str, str, date, date]
+
 class KiwiFetcher(BaseFetcher):
-    """Kiwi.com flight data fetcher."""
+    """Kiwi.com flight data fetcher.
+
+    The search API accepts comma-separated origin and destination lists, so
+    fetches for the same date window that arrive within `batch_window`
+    seconds are sent as one multi-city request and split back per route.
+    Each request shares one origin or one destination, so it asks for no
+    pairs beyond the batched routes. Quota is charged per request rather
+    than per route, so batching happens before the rate limiter.
+    """
 
     BASE_URL = "https://api.tequila.kiwi.com/v2/search"
+    LIMIT_PER_ROUTE = 50
+    MAX_LIMIT = 1000
 
-    def __init__(self, api_key: str):
+    def __init__(
+        self,
+        api_key: str,
+        client: Optional[httpx.AsyncClient] = None,
+        max_batch_size: int = 10,
+        batch_window: float = 0.05,
+        decoder: Optional[JsonDecoder] = None
+    ):
         self.api_key = api_key
+        self.client = client
+        self.decoder = decoder or default_decoder
+        self.max_batch_size = max(1, max_batch_size)
+        self.batch_window = batch_window
+        self._pending: Dict[Tuple[date, date], List[Tuple[RouteQuery, asyncio.Future]]] = {}
+        self._batches: Set[asyncio.Task] = set()
 
     @property
     def source_name(self) -> str:
@@ -24,6 +56,14 @@ class KiwiFetcher(BaseFetcher):
     def is_available(self) -> bool:
         return bool(self.api_key)
 
+    def estimate_calls(self, date_start: date, date_end: date) -> int:
+        # Charged per upstream request in _fetch_chunk, once routes are batched
+        return 0
+
+    def searched_dates(self, date_start: date, date_end: date) -> Optional[List[date]]:
+        # Results are capped, so a day without offers may just be past the cap
+        return None
+
     async def fetch(
         self,
         origin: str,
@@ -34,56 +74,217 @@ class KiwiFetcher(BaseFetcher):
         if not self.is_available():
             return []
 
-        offers = []
+        query = (origin, destination, date_start, date_end)
+        if self.max_batch_size == 1 or self.batch_window <= 0:
+            return (await self.fetch_batch([query]))[query]
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        window = (date_start, date_end)
+        group = self._pending.setdefault(window, [])
+        group.append((query, future))
+
+        if len(group) >= self.max_batch_size:
+            self._flush(window)
+        elif len(group) == 1:
+            loop.call_later(self.batch_window, self._flush, window)
+
+        return await future
+
+    async def close(self):
+        for window in list(self._pending):
+            self._flush(window)
+        if self._batches:
+            await asyncio.gather(*self._batches, return_exceptions=True)
+
+    def _flush(self, window: Tuple[date, date]):
+        group = self._pending.pop(window, None)
+        if not group:
+            return
+        task = asyncio.ensure_future(self._run_batch(group))
+        self._batches.add(task)
+        task.add_done_callback(self._batches.discard)
+
+    async def _run_batch(self, group: List[Tuple[RouteQuery, asyncio.Future]]):
+        try:
+            results = await self.fetch_batch([query for query, _ in group])
+        except Exception as e:
+            for _, future in group:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for query, future in group:
+            if not future.done():
+                future.set_result(results.get(query, []))
+
+    async def fetch_batch(self, queries: List[RouteQuery]) -> Dict[RouteQuery, List[FlightOffer]]:
+        """Fetch many routes, grouping those with the same date window.
+
+        Each group is split into requests of at most `max_batch_size` routes
+        that share an origin or a destination.
+        """
+        results: Dict[RouteQuery, List[FlightOffer]] = {query: [] for query in queries}
+
+        by_window = defaultdict(list)
+        for query in results:
+            by_window[(query[2], query[3])].append(query)
+
+        chunks = []
+        for window_queries in by_window.values():
+            chunks.extend(self._hub_chunks(window_queries))
+
+        async with borrow_client(self.client) as client:
+            chunk_results = await asyncio.gather(*[
+                self._fetch_chunk(client, chunk) for chunk in chunks
+            ], return_exceptions=True)
+
+        for chunk_result in chunk_results:
+            if isinstance(chunk_result, BaseException):
+                raise chunk_result
+            results.update(chunk_result)
+        return results
+
+    def _hub_chunks(self, queries: List[RouteQuery]) -> List[List[RouteQuery]]:
+        """Split routes into chunks that each share one origin or destination.
+
+        Takes the routes of the busiest remaining airport first, so the
+        cross product of a chunk's origins and destinations is exactly its
+        routes.
+        """
+        remaining = sorted(queries)
+        chunks = []
+        while remaining:
+            by_origin = defaultdict(list)
+            by_destination = defaultdict(list)
+            for query in remaining:
+                by_origin[query[0]].append(query)
+                by_destination[query[1]].append(query)
+            hub = max([*by_origin.values(), *by_destination.values()], key=len)
+            chunk = hub[:self.max_batch_size]
+            chunks.append(chunk)
+            taken = set(chunk)
+            remaining = [query for query in remaining if query not in taken]
+        return chunks
+
+    async def _fetch_chunk(
+        self,
+        client: httpx.AsyncClient,
+        queries: List[RouteQuery]
+    ) -> Dict[RouteQuery, List[FlightOffer]]:
+        results: Dict[RouteQuery, List[FlightOffer]] = {query: [] for query in queries}
+        origins = sorted({q[0] for q in queries})
+        destinations = sorted({q[1] for q in queries})
+        date_start, date_end = queries[0][2], queries[0][3]
         headers = {"apikey": self.api_key}
+        limit = min(self.LIMIT_PER_ROUTE * len(queries), self.MAX_LIMIT)
 
-        async with httpx.AsyncClient() as client:
-            try:
-                params = {
-                    "fly_from": origin,
-                    "fly_to": destination,
-                    "date_from": date_start.strftime("%d/%m/%Y"),
-                    "date_to": date_end.strftime("%d/%m/%Y"),
-                    "curr": "CNY",
-                    "limit": 50,
-                    "one_for_city": 0,
-                }
-
-                response = await client.get(
-                    self.BASE_URL,
-                    params=params,
-                    headers=headers,
-                    timeout=30.0
-                )
-                response.raise_for_status()
-                data = response.json()
+        # The batch task runs in the context of its first route's fetch
+        if not await acquire_extra_calls(1):
+            logger.warning(f"Kiwi: quota exhausted, skipped a request for {len(queries)} routes")
+            return results
 
-                offers = self._parse_response(data, date_start)
+        try:
+            params = {
+                "fly_from": ",".join(origins),
+                "fly_to": ",".join(destinations),
+                "date_from": date_start.strftime("%d/%m/%Y"),
+                "date_to": date_end.strftime("%d/%m/%Y"),
+                "curr": "CNY",
+                "limit": limit,
+                "one_for_city": 0,
+            }
 
-            except Exception as e:
-                logger.error(f"Kiwi API error: {e}")
+            response = await client.get(
+                self.BASE_URL,
+                params=params,
+                headers=headers,
+                timeout=30.0
+            )
+            response.raise_for_status()
+            routed = await self.decoder.parse(
+                response.content, lambda data: self._parse_routed(data, date_start)
+            )
+
+        except Exception as e:
+            if is_upstream_failure(e):
+                raise
+            logger.error(f"Kiwi API error: {e}")
+            return results
 
-        return offers
+        if len(queries) > 1:
+            logger.info(f"Kiwi batched {len(queries)} routes into one request ({len(routed)} offers)")
+
+        by_pair = {(q[0], q[1]): q for q in queries}
+        for offer, city_from, city_to in routed:
+            # City codes (e.g. BJS) come back as airport codes (PEK), so an
+            # offer belongs to every route asking for its airport or its city
+            for origin in self._requested(origins, offer.origin, city_from):
+                for destination in self._requested(destinations, offer.destination, city_to):
+                    query = by_pair.get((origin, destination))
+                    if query is not None:
+                        results[query].append(offer)
+
+        starved = [query for query, offers in results.items() if not offers]
+        if len(queries) > 1 and len(routed) >= limit and starved:
+            # The shared limit went to the other routes; ask for these alone
+            logger.info(f"Kiwi batch hit its limit of {limit}, refetching {len(starved)} routes alone")
+            refetched = await asyncio.gather(*[self._fetch_chunk(client, [query]) for query in starved])
+            for query, single in zip(starved, refetched):
+                results[query] = single[query]
+
+        return results
+
+    @staticmethod
+    def _requested(requested: List[str], airport: str, city: Optional[str]) -> List[str]:
+        codes = [code for code in requested if code in (airport, city)]
+        if not codes and len(requested) == 1:
+            # Without a city code, assume the only code asked for
+            return requested
+        return codes
 
     def _parse_response(self, data: dict, departure_date: date) -> List[FlightOffer]:
-        offers = []
+        return [FlightOffer(*row) for row in self._iter_rows(data, departure_date)]
+
+    def _parse_routed(self, data: dict, departure_date: date) -> List[Tuple[FlightOffer, Optional[str], Optional[str]]]:
+        """Offers with the city codes of their departure and arrival airports."""
+        return [
+            (FlightOffer(*row), item.get("cityCodeFrom"), item.get("cityCodeTo"))
+            for item, row in self._iter_items(data, departure_date)
+        ]
+
+    def _parse_batch(self, data: dict, departure_date: date, batch: OfferBatchBuilder) -> OfferBatchBuilder:
+        """Append the response's offers to a columnar batch."""
+        for row in self._iter_rows(data, departure_date):
+            try:
+                batch.append(*row)
+            except ValueError as e:
+                logger.warning(f"Skipping Kiwi offer: {e}")
+        return batch
+
+    def _iter_rows(self, data: dict, departure_date: date) -> Iterator[tuple]:
+        """Yield each offer's fields in FlightOffer order."""
+        for _, row in self._iter_items(data, departure_date):
+            yield row
 
+    def _iter_items(self, data: dict, departure_date: date) -> Iterator[Tuple[dict, tuple]]:
+        """Yield each raw offer with its fields in FlightOffer order."""
         for item in data.get("data", []):
             try:
                 dep_date = item.get("local_departure", "")[:10]
-                offer = FlightOffer(
-                    origin=item.get("flyFrom", ""),
-                    destination=item.get("flyTo", ""),
-                    departure_date=date.fromisoformat(dep_date) if dep_date else departure_date,
-                    price=Decimal(str(item.get("price", 0))),
-                    currency="CNY",
-                    airline=",".join(item.get("airlines", [])),
-                    flight_number=item.get("route", [{}])[0].get("flight_no", ""),
-                    stops=len(item.get("route", [])) - 1,
-                    source=self.source_name
+                row = (
+                    item.get("flyFrom", ""),
+                    item.get("flyTo", ""),
+                    date.fromisoformat(dep_date) if dep_date else departure_date,
+                    Decimal(str(item.get("price", 0))),
+                    "CNY",
+                    ",".join(item.get("airlines", [])),
+                    item.get("route", [{}])[0].get("flight_no", ""),
+                    len(item.get("route", [])) - 1,
+                    self.source_name
                 )
-                offers.append(offer)
             except Exception as e:
                 logger.warning(f"Failed to parse Kiwi offer: {e}")
+                continue
 
-        return offers
+            yield item, row
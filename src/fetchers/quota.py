@@ -0,0 +1,433 @@
+# src/fetchers/quota.py
+import asyncio
+import json
+import logging
+import math
+import os
+from abc import ABC, abstractmethod
+from calendar import monthrange
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import date, datetime, timezone
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from sqlalchemy import case, func, select
+from sqlalchemy.dialects.postgresql import insert
+from src.database import ApiQuotaUsage
+from src.fetchers.base import BaseFetcher, FetcherWrapper
+from src.fetchers.rate_limit import TokenBucket
+from src.models import FlightOffer
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Priority of the fetch running in the current task, set per route check
+fetch_priority: ContextVar[str] = ContextVar('fetch_priority', default='normal')
+
+# Charges calls to the quota of the fetch running in the current task
+_charge_calls: ContextVar[Optional[Callable[[int], Awaitable[bool]]]] = ContextVar('charge_calls', default=None)
+
+PRIORITIES = {'low': 0, 'normal': 1, 'high': 2}
+
+# Free-tier limits of the supported providers; override under sources.<name>.quota
+DEFAULT_QUOTAS = {
+    'amadeus': {'per_second': 10, 'monthly': 2000},
+    'kiwi': {'per_second': 5},
+    'aviationstack': {'per_second': 1, 'monthly': 100},
+}
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+async def acquire_extra_calls(calls: int = 1) -> bool:
+    """Charge upstream calls a fetch makes beyond its estimate_calls.
+
+    Returns False when the source's quota refuses them. Outside a
+    quota-limited fetch every call is allowed.
+    """
+    charge = _charge_calls.get()
+    return True if charge is None else await charge(calls)
+
+
+class SourceQuota:
+    """Per-second rate limit plus daily and monthly call budgets for one source.
+
+    With a monthly limit, the daily allowance rolls: whatever is left of the
+    month is spread evenly over its remaining days, so an early burst cannot
+    starve the end of the month.
+    """
+
+    def __init__(
+        self,
+        source: str,
+        per_second: Optional[float] = None,
+        daily: Optional[int] = None,
+        monthly: Optional[int] = None
+    ):
+        self.source = source
+        self.daily = daily
+        self.monthly = monthly
+        self.bucket = TokenBucket(per_second) if per_second else None
+
+        self.day: Optional[date] = None
+        self.day_used = 0
+        self.month: Optional[str] = None
+        self.month_used = 0
+        # Calls recorded since the last save, keyed by (day, month)
+        self.pending: Counter = Counter()
+
+    def _roll(self, now: datetime):
+        today = now.date()
+        month = today.strftime('%Y-%m')
+        if self.day != today:
+            self.day, self.day_used = today, 0
+        if self.month != month:
+            self.month, self.month_used = month, 0
+
+    def restore(self, day: date, day_used: int, month: str, month_used: int, now: datetime):
+        """Apply persisted usage, ignoring periods that have already ended."""
+        self._roll(now)
+        if day == self.day:
+            self.day_used = max(self.day_used, day_used)
+        if month == self.month:
+            self.month_used = max(self.month_used, month_used)
+
+    def day_limit(self, now: datetime) -> Optional[int]:
+        self._roll(now)
+        limits = []
+        if self.daily is not None:
+            limits.append(self.daily)
+        if self.monthly is not None:
+            days_left = monthrange(now.year, now.month)[1] - now.day + 1
+            used_before_today = self.month_used - self.day_used
+            limits.append(math.ceil(max(0, self.monthly - used_before_today) / days_left))
+        return min(limits) if limits else None
+
+    def remaining(self, now: datetime) -> Optional[int]:
+        """Calls still allowed today, or None when the source is unlimited."""
+        limit = self.day_limit(now)
+        if limit is None:
+            return None
+        remaining = limit - self.day_used
+        if self.monthly is not None:
+            remaining = min(remaining, self.monthly - self.month_used)
+        return max(0, remaining)
+
+    def headroom(self, now: datetime) -> Optional[float]:
+        """Fraction of today's budget left, or None when the source is unlimited."""
+        limit = self.day_limit(now)
+        remaining = self.remaining(now)
+        if limit is None or remaining is None:
+            return None
+        return remaining / limit if limit else 0.0
+
+    def record(self, calls: int, now: datetime):
+        self._roll(now)
+        self.day_used += calls
+        self.month_used += calls
+        self.pending[(self.day.isoformat(), self.month)] += calls
+
+
+class QuotaStore(ABC):
+    """Persists quota usage so budgets survive restarts."""
+
+    @abstractmethod
+    async def load(self) -> Dict[str, dict]:
+        """Return the stored usage per source."""
+        pass
+
+    @abstractmethod
+    async def save(self, deltas: List[Tuple[str, str, str, int]]):
+        """Add (source, day, month, calls) usage deltas to the stored totals."""
+        pass
+
+
+class FileQuotaStore(QuotaStore):
+    """JSON file store, used when Postgres is not reachable.
+
+    Saves hold an exclusive lock on a sibling `.lock` file, so workers
+    sharing the file do not overwrite each other's updates.
+    """
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+
+    def _read(self) -> Dict[str, dict]:
+        if not self.path.exists():
+            return {}
+        with open(self.path) as f:
+            return json.load(f)
+
+    def _write(self, state: Dict[str, dict]):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(self.path.suffix + '.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp, self.path)
+
+    @contextmanager
+    def _locked(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path.with_suffix(self.path.suffix + '.lock'), 'a') as lock:
+            if fcntl is not None:
+                # Released when the file is closed
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            yield
+
+    async def load(self) -> Dict[str, dict]:
+        state = await asyncio.to_thread(self._read)
+        return {
+            source: {**row, 'day': date.fromisoformat(row['day'])}
+            for source, row in state.items()
+        }
+
+    async def save(self, deltas: List[Tuple[str, str, str, int]]):
+        def apply():
+            with self._locked():
+                state = self._read()
+                for source, day, month, calls in deltas:
+                    row = state.get(source, {'day': day, 'day_used': 0, 'month': month, 'month_used': 0})
+                    if row['day'] == day:
+                        row['day_used'] += calls
+                    elif row['day'] < day:
+                        row['day'], row['day_used'] = day, calls
+                    if row['month'] == month:
+                        row['month_used'] += calls
+                    elif row['month'] < month:
+                        row['month'], row['month_used'] = month, calls
+                    state[source] = row
+                self._write(state)
+
+        await asyncio.to_thread(apply)
+
+
+class PostgresQuotaStore(QuotaStore):
+    """Stores usage in the api_quota_usage table."""
+
+    def __init__(self, session_factory):
+        self.session_factory = session_factory
+
+    async def load(self) -> Dict[str, dict]:
+        async with self.session_factory() as session:
+            rows = (await session.execute(select(ApiQuotaUsage))).scalars().all()
+        return {
+            row.source: {
+                'day': row.day, 'day_used': row.day_used,
+                'month': row.month, 'month_used': row.month_used,
+            }
+            for row in rows
+        }
+
+    async def save(self, deltas: List[Tuple[str, str, str, int]]):
+        table = ApiQuotaUsage.__table__
+        async with self.session_factory() as session:
+            for source, day, month, calls in deltas:
+                stmt = insert(table).values(
+                    source=source, day=date.fromisoformat(day), day_used=calls,
+                    month=month, month_used=calls, updated_at=datetime.utcnow()
+                )
+                excluded = stmt.excluded
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=[table.c.source],
+                    set_={
+                        'day_used': case(
+                            (table.c.day == excluded.day, table.c.day_used + excluded.day_used),
+                            (table.c.day > excluded.day, table.c.day_used),
+                            else_=excluded.day_used
+                        ),
+                        'day': func.greatest(table.c.day, excluded.day),
+                        'month_used': case(
+                            (table.c.month == excluded.month, table.c.month_used + excluded.month_used),
+                            (table.c.month > excluded.month, table.c.month_used),
+                            else_=excluded.month_used
+                        ),
+                        'month': func.greatest(table.c.month, excluded.month),
+                        'updated_at': excluded.updated_at,
+                    }
+                )
+                await session.execute(stmt)
+            await session.commit()
+
+
+class QuotaManager:
+    """Shared API budget keeper for every fetcher.
+
+    Low-priority fetches are skipped once a source's remaining headroom drops
+    below `low_watermark`, normal ones below `critical_watermark`; only
+    high-priority fetches may spend the last of the budget. A process that
+    runs next to others gets `share` of every limit, and restored usage is
+    taken to have been spread evenly over the processes.
+    """
+
+    def __init__(
+        self,
+        config: dict,
+        stores: Optional[List[QuotaStore]] = None,
+        low_watermark: float = 0.2,
+        critical_watermark: float = 0.05,
+        clock: Callable[[], datetime] = _utcnow,
+        share: float = 1.0
+    ):
+        self.config = config
+        self.stores = stores or []
+        self.low_watermark = low_watermark
+        self.critical_watermark = critical_watermark
+        self.clock = clock
+        self.share = share
+        self._quotas: Dict[str, SourceQuota] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+
+    def quota_for(self, source: str) -> SourceQuota:
+        quota = self._quotas.get(source)
+        if quota is None:
+            cfg = {**DEFAULT_QUOTAS.get(source, {}), **(self.config.get(source) or {})}
+            quota = SourceQuota(
+                source,
+                per_second=cfg['per_second'] * self.share if cfg.get('per_second') else None,
+                daily=self._scaled(cfg.get('daily')),
+                monthly=self._scaled(cfg.get('monthly')),
+            )
+            self._quotas[source] = quota
+        return quota
+
+    def _scaled(self, calls: Optional[int]) -> Optional[int]:
+        return None if calls is None else int(calls * self.share)
+
+    def headroom(self, source: str) -> dict:
+        """Remaining budget of one source."""
+        now = self.clock()
+        quota = self.quota_for(source)
+        return {
+            'source': source,
+            'remaining_today': quota.remaining(now),
+            'used_today': quota.day_used,
+            'used_month': quota.month_used,
+            'headroom': quota.headroom(now),
+        }
+
+    def snapshot(self) -> List[dict]:
+        return [self.headroom(source) for source in sorted(self._quotas)]
+
+    def admit(self, source: str, calls: int, priority: str = 'normal') -> bool:
+        """Decide whether a fetch costing `calls` may run at this priority."""
+        now = self.clock()
+        quota = self.quota_for(source)
+        remaining = quota.remaining(now)
+        if remaining is None:
+            return True
+        if remaining < calls:
+            return False
+
+        rank = PRIORITIES.get(priority, PRIORITIES['normal'])
+        headroom = quota.headroom(now)
+        if headroom < self.critical_watermark:
+            return rank >= PRIORITIES['high']
+        if headroom < self.low_watermark:
+            return rank >= PRIORITIES['normal']
+        return True
+
+    async def acquire(self, source: str, calls: int = 1, priority: str = 'normal') -> bool:
+        """Reserve budget for a fetch and wait for the per-second limiter."""
+        if not self.admit(source, calls, priority):
+            logger.warning(f"Quota: skipping {priority} priority {source} fetch ({calls} calls)")
+            return False
+
+        if calls <= 0:
+            # Admission only; the fetcher charges its calls as it makes them
+            return True
+        quota = self.quota_for(source)
+        quota.record(calls, self.clock())
+        if quota.bucket is not None:
+            await quota.bucket.acquire(calls)
+        return True
+
+    def wrap(self, fetcher: BaseFetcher) -> 'QuotaLimitedFetcher':
+        return QuotaLimitedFetcher(fetcher, self)
+
+    async def load(self):
+        """Restore usage from every store, keeping the highest count per period."""
+        now = self.clock()
+        for store in self.stores:
+            try:
+                state = await store.load()
+            except Exception as e:
+                logger.warning(f"Quota state unavailable from {type(store).__name__}: {e}")
+                continue
+            for source, row in state.items():
+                self.quota_for(source).restore(
+                    row['day'], self._scaled(row['day_used']), row['month'], self._scaled(row['month_used']), now
+                )
+
+    async def save(self):
+        """Persist recorded usage to the first store that accepts it."""
+        deltas = []
+        for quota in self._quotas.values():
+            deltas.extend((quota.source, day, month, calls) for (day, month), calls in quota.pending.items())
+            quota.pending.clear()
+        if not deltas:
+            return
+
+        for store in self.stores:
+            try:
+                await store.save(deltas)
+                return
+            except Exception as e:
+                logger.warning(f"Failed to save quota state to {type(store).__name__}: {e}")
+
+        # Keep the usage for the next attempt
+        for source, day, month, calls in deltas:
+            self.quota_for(source).pending[(day, month)] += calls
+        if self.stores:
+            logger.error(f"Quota state could not be persisted, {len(deltas)} deltas kept for retry")
+
+    def start(self, flush_interval: float = 60.0):
+        """Persist usage and reload other processes' usage periodically."""
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.ensure_future(self._flush_loop(flush_interval))
+
+    async def _flush_loop(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            await self.save()
+            await self.load()
+
+    async def close(self):
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+        await self.save()
+
+
+class QuotaLimitedFetcher(FetcherWrapper):
+    """Runs a fetch only when the source's quota allows it."""
+
+    def __init__(self, fetcher: BaseFetcher, quota: QuotaManager):
+        super().__init__(fetcher)
+        self.quota = quota
+
+    async def fetch(
+        self,
+        origin: str,
+        destination: str,
+        date_start: date,
+        date_end: date
+    ) -> List[FlightOffer]:
+        calls = self.fetcher.estimate_calls(date_start, date_end)
+        if not await self.quota.acquire(self.source_name, calls, fetch_priority.get()):
+            return []
+        token = _charge_calls.set(lambda extra: self.quota.acquire(self.source_name, extra, fetch_priority.get()))
+        try:
+            return await self.fetcher.fetch(origin, destination, date_start, date_end)
+        finally:
+            _charge_calls.reset(token)
@@ -0,0 +1,81 @@
+# src/http_pool.py
+import logging
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+
+def _h2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+class HttpClientPool:
+    """Long-lived, connection-pooled HTTP clients, one per upstream host.
+
+    Clients are created lazily and kept open so that repeated checks reuse
+    DNS results, TCP connections and TLS sessions instead of paying for a
+    fresh handshake on every request.
+    """
+
+    def __init__(self, config: Optional[dict] = None):
+        cfg = config or {}
+        self.limits = httpx.Limits(
+            max_connections=int(cfg.get('max_connections', 20)),
+            max_keepalive_connections=int(cfg.get('max_keepalive_connections', 10)),
+            keepalive_expiry=float(cfg.get('keepalive_expiry', 30.0)),
+        )
+        self.timeout = float(cfg.get('timeout', 30.0))
+
+        self.http2 = bool(cfg.get('http2', False))
+        if self.http2 and not _h2_available():
+            logger.warning("HTTP/2 requested but 'h2' is not installed, falling back to HTTP/1.1")
+            self.http2 = False
+
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+
+    @staticmethod
+    def _host_key(url: str) -> str:
+        parts = urlsplit(url)
+        return f"{parts.scheme}://{parts.netloc}"
+
+    def client_for(self, url: str) -> httpx.AsyncClient:
+        """Return the shared client for the host of the given URL."""
+        key = self._host_key(url)
+        client = self._clients.get(key)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(
+                limits=self.limits,
+                timeout=self.timeout,
+                http2=self.http2,
+            )
+            self._clients[key] = client
+            logger.debug(f"Created pooled HTTP client for {key}")
+        return client
+
+    async def aclose(self):
+        """Close every pooled client and drop their connections."""
+        clients, self._clients = self._clients, {}
+        for key, client in clients.items():
+            try:
+                await client.aclose()
+            except Exception as e:
+                logger.warning(f"Failed to close HTTP client for {key}: {e}")
+
+
+@asynccontextmanager
+async def borrow_client(client: Optional[httpx.AsyncClient]) -> AsyncIterator[httpx.AsyncClient]:
+    """Yield the injected shared client, or a throwaway one when none was given."""
+    if client is not None:
+        yield client
+        return
+
+    async with httpx.AsyncClient() as own_client:
+        yield own_client
@@ -0,0 +1,255 @@
+# src/leases.py
+import asyncio
+import logging
+import os
+import socket
+import uuid
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+from sqlalchemy import text
+from src.metrics import Metrics, metrics as default_metrics
+from src.planner import PairPlan
+
+logger = logging.getLogger(__name__)
+
+# Kept in step with init.sql
+LEASE_TABLE_SQL = [
+    """CREATE TABLE IF NOT EXISTS route_leases (
+        job_id VARCHAR(100) PRIMARY KEY,
+        due_at TIMESTAMPTZ NOT NULL,
+        lease_owner VARCHAR(100),
+        lease_expires_at TIMESTAMPTZ,
+        last_run_at TIMESTAMPTZ
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_leases_due ON route_leases(due_at)",
+]
+
+INSERT_SQL = """
+INSERT INTO route_leases (job_id, due_at) VALUES (:job_id, :due_at)
+ON CONFLICT (job_id) DO NOTHING
+"""
+
+# Due jobs that are free or whose holder stopped heartbeating; rows locked by
+# another claim in progress are skipped rather than waited on
+CLAIM_SQL = """
+WITH due AS (
+    SELECT job_id, lease_owner AS previous_owner
+    FROM route_leases
+    WHERE job_id = ANY(:job_ids)
+      AND due_at <= now()
+      AND (lease_owner IS NULL OR lease_expires_at < now())
+    ORDER BY due_at
+    LIMIT :limit
+    FOR UPDATE SKIP LOCKED
+)
+UPDATE route_leases r
+SET lease_owner = :owner, lease_expires_at = now() + make_interval(secs => :ttl)
+FROM due
+WHERE r.job_id = due.job_id
+RETURNING r.job_id, r.due_at, due.previous_owner
+"""
+
+HEARTBEAT_SQL = """
+UPDATE route_leases SET lease_expires_at = now() + make_interval(secs => :ttl)
+WHERE lease_owner = :owner AND job_id = ANY(:job_ids)
+"""
+
+COMPLETE_SQL = """
+UPDATE route_leases
+SET due_at = :due_at, lease_owner = NULL, lease_expires_at = NULL, last_run_at = now()
+WHERE job_id = :job_id AND lease_owner = :owner
+"""
+
+RELEASE_SQL = """
+UPDATE route_leases SET lease_owner = NULL, lease_expires_at = NULL
+WHERE lease_owner = :owner
+"""
+
+RELEASE_JOB_SQL = """
+UPDATE route_leases SET lease_owner = NULL, lease_expires_at = NULL
+WHERE lease_owner = :owner AND job_id = :job_id
+"""
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def default_owner() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+
+def next_due(trigger, due_at: datetime, now: datetime) -> Optional[datetime]:
+    """Next run after `due_at`, skipping runs already missed by `now`."""
+    next_at = trigger.get_next_fire_time(due_at, now)
+    while next_at is not None and next_at <= now:
+        next_at = trigger.get_next_fire_time(next_at, now)
+    return next_at
+
+
+class LeaseCoordinator:
+    """Runs route checks claimed from the shared route_leases table.
+
+    Every process registers its jobs and polls for due ones, claiming up to
+    its free check slots with FOR UPDATE SKIP LOCKED, so each due check runs
+    on exactly one process. Claims are leases of `lease_seconds` that are
+    renewed while the check runs; a lease whose holder stops heartbeating
+    expires and the check is claimed again by another process. On
+    completion the job's next due time is taken from its trigger.
+    """
+
+    def __init__(
+        self,
+        engine,
+        run: Callable[[PairPlan], Awaitable[None]],
+        owner: Optional[str] = None,
+        lease_seconds: float = 120,
+        poll_interval: float = 5,
+        max_concurrent: int = 4,
+        metrics: Optional[Metrics] = None,
+        clock: Callable[[], datetime] = _utcnow
+    ):
+        self.engine = engine
+        self.run = run
+        self.owner = owner or default_owner()
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.max_concurrent = max_concurrent
+        self.metrics = metrics or default_metrics
+        self.clock = clock
+        self.jobs: Dict[str, Tuple[PairPlan, object]] = {}
+        self._running: Dict[str, asyncio.Task] = {}
+        self._tasks: List[asyncio.Task] = []
+
+    @property
+    def held(self) -> Set[str]:
+        return set(self._running)
+
+    def add_job(self, plan: PairPlan, trigger):
+        self.jobs[plan.job_id] = (plan, trigger)
+
+    def remove_job(self, job_id: str):
+        """Stop claiming a job; a run in progress finishes and hands it back."""
+        self.jobs.pop(job_id, None)
+
+    async def setup(self):
+        """Create the table if needed and register this process's jobs."""
+        now = self.clock()
+        async with self.engine.begin() as conn:
+            for statement in LEASE_TABLE_SQL:
+                await conn.execute(text(statement))
+            for job_id, (plan, trigger) in self.jobs.items():
+                due_at = trigger.get_next_fire_time(None, now)
+                if due_at is not None:
+                    await conn.execute(text(INSERT_SQL), {'job_id': job_id, 'due_at': due_at})
+
+    async def claim(self, limit: int) -> List[Tuple[str, datetime]]:
+        """Lease up to `limit` due jobs; returns (job id, due time) pairs."""
+        if limit <= 0 or not self.jobs:
+            return []
+        async with self.engine.begin() as conn:
+            rows = (await conn.execute(text(CLAIM_SQL), {
+                'job_ids': list(self.jobs), 'limit': limit,
+                'owner': self.owner, 'ttl': self.lease_seconds
+            })).all()
+
+        claimed = []
+        for job_id, due_at, previous_owner in rows:
+            if previous_owner is not None:
+                logger.warning(f"Reclaimed expired lease on {job_id} from {previous_owner}")
+                self.metrics.inc('leases.reclaimed')
+            claimed.append((job_id, due_at))
+        self.metrics.inc('leases.claimed', len(claimed))
+        return claimed
+
+    async def heartbeat(self):
+        held = list(self._running)
+        if not held:
+            return
+        async with self.engine.begin() as conn:
+            result = await conn.execute(text(HEARTBEAT_SQL), {
+                'owner': self.owner, 'job_ids': held, 'ttl': self.lease_seconds
+            })
+        if result.rowcount < len(held):
+            logger.warning(f"Lost {len(held) - result.rowcount} of {len(held)} leases")
+            self.metrics.inc('leases.lost', len(held) - result.rowcount)
+
+    async def complete(self, job_id: str, due_at: datetime):
+        entry = self.jobs.get(job_id)
+        async with self.engine.begin() as conn:
+            if entry is None:
+                # Removed while running; leave it to workers that still have it
+                await conn.execute(text(RELEASE_JOB_SQL), {'job_id': job_id, 'owner': self.owner})
+                return
+            next_at = next_due(entry[1], due_at, self.clock())
+            await conn.execute(text(COMPLETE_SQL), {
+                'job_id': job_id, 'owner': self.owner, 'due_at': next_at
+            })
+
+    async def _execute(self, job_id: str, due_at: datetime):
+        entry = self.jobs.get(job_id)
+        try:
+            if entry is not None:
+                await self.run(entry[0])
+        except Exception as e:
+            logger.error(f"Check {job_id} failed: {e}")
+            self.metrics.inc('scheduler.errors')
+        try:
+            await self.complete(job_id, due_at)
+        except Exception as e:
+            logger.warning(f"Could not complete lease on {job_id}, it will be reclaimed: {e}")
+        finally:
+            self._running.pop(job_id, None)
+
+    async def poll(self):
+        """Claim due jobs for the free slots and start them."""
+        for job_id, due_at in await self.claim(self.max_concurrent - len(self._running)):
+            lag = (self.clock() - due_at).total_seconds()
+            self.metrics.observe('scheduler.job_lag', max(lag, 0.0))
+            self._running[job_id] = asyncio.ensure_future(self._execute(job_id, due_at))
+
+    def start(self):
+        if not self._tasks:
+            self._tasks = [
+                asyncio.ensure_future(self._poll_loop()),
+                asyncio.ensure_future(self._heartbeat_loop()),
+            ]
+
+    async def _poll_loop(self):
+        while True:
+            try:
+                await self.setup()
+                break
+            except Exception as e:
+                logger.warning(f"Could not register route leases: {e}")
+                await asyncio.sleep(self.poll_interval)
+        logger.info(f"Lease worker {self.owner} polling {len(self.jobs)} jobs")
+
+        while True:
+            try:
+                await self.poll()
+            except Exception as e:
+                logger.warning(f"Lease poll failed: {e}")
+            await asyncio.sleep(self.poll_interval)
+
+    async def _heartbeat_loop(self):
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                await self.heartbeat()
+            except Exception as e:
+                logger.warning(f"Lease heartbeat failed: {e}")
+
+    async def close(self):
+        """Stop polling, cancel running checks and hand their leases back."""
+        tasks = self._tasks + list(self._running.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks = []
+        self._running.clear()
+        try:
+            async with self.engine.begin() as conn:
+                await conn.execute(text(RELEASE_SQL), {'owner': self.owner})
+        except Exception as e:
+            logger.warning(f"Could not release route leases: {e}")
@@ -1,51 +1,67 @@
 # src/main.py
 import asyncio
 import logging
+from datetime import date, datetime, timedelta
+from typing import Callable, Optional
 from src.config import load_config
+from src.reload import ConfigReloader
 from src.scheduler import FlightMonitorScheduler
 
 logger = logging.getLogger(__name__)
 
 async def main(config_path: str = 'config.yaml'):
-    config = load_config(config_path)
+    await monitor(load_config(config_path), config_path)
+
+async def monitor(
+    config: dict,
+    config_path: Optional[str] = None,
+    load: Callable[[str], dict] = load_config
+):
+    """Run the scheduler for `config` until cancelled.
 
+    With `config_path`, routes are reloaded from it on SIGHUP and, unless
+    `reload.watch` is off, whenever the file changes.
+    """
     scheduler = FlightMonitorScheduler(config)
+    await scheduler.initialize()
     scheduler.setup_jobs()
     scheduler.start()
 
+    reloader = None
+    if config_path is not None:
+        reload_cfg = config.get('reload', {})
+        reloader = ConfigReloader(
+            config_path,
+            scheduler.reload,
+            load=load,
+            interval=float(reload_cfg.get('interval', 5)) if reload_cfg.get('watch', True) else None
+        )
+        reloader.start()
+
     logger.info("🛫 Flight monitor started")
 
     try:
         while True:
             await asyncio.sleep(3600)
-    except KeyboardInterrupt:
+    except (KeyboardInterrupt, asyncio.CancelledError):
         scheduler.stop()
         logger.info("Monitor stopped")
+    finally:
+        if reloader is not None:
+            await reloader.close()
+        await scheduler.close()
 
 async def check_route_once(origin: str, destination: str, config_path: str = 'config.yaml'):
-    from datetime import date, timedelta
-    from src.fetchers import PriceAggregator, KiwiFetcher, AviationStackFetcher, AmadeusFetcher
-
     config = load_config(config_path)
-    sources = config.get('sources', {})
-
-    fetchers = []
-    if sources.get('amadeus', {}).get('enabled'):
-        fetchers.append(AmadeusFetcher(
-            client_id=sources['amadeus'].get('client_id', ''),
-            client_secret=sources['amadeus'].get('client_secret', '')
-        ))
-
-    if sources.get('kiwi', {}).get('enabled'):
-        fetchers.append(KiwiFetcher(api_key=sources['kiwi'].get('api_key', '')))
-
-    if sources.get('aviationstack', {}).get('enabled'):
-        fetchers.append(AviationStackFetcher(api_key=sources['aviationstack'].get('api_key', '')))
-
-    aggregator = PriceAggregator(fetchers)
+    scheduler = FlightMonitorScheduler(config)
+    aggregator = scheduler.aggregator
 
-    today = date.today()
-    offers = await aggregator.fetch_all(origin, destination, today, today + timedelta(days=30))
+    try:
+        await scheduler.initialize(daemon=False)
+        today = date.today()
+        offers = await aggregator.fetch_all(origin, destination, today, today + timedelta(days=30))
+    finally:
+        await scheduler.close()
 
     if offers:
         best = aggregator.get_best_price(offers)
@@ -56,5 +72,88 @@ async def check_route_once(origin: str, destination: str, config_path: str = 'co
     else:
         print("No flights found")
 
+async def show_quota(config_path: str = 'config.yaml'):
+    config = load_config(config_path)
+    scheduler = FlightMonitorScheduler(config)
+
+    try:
+        await scheduler.initialize(daemon=False)
+        usage = [scheduler.quota.headroom(f.source_name) for f in scheduler.aggregator.fetchers]
+    finally:
+        await scheduler.close()
+
+    if not usage:
+        print("No sources enabled")
+    for row in usage:
+        remaining = "unlimited" if row['remaining_today'] is None else row['remaining_today']
+        print(f"{row['source']}: {remaining} calls left today "
+              f"(used {row['used_today']} today, {row['used_month']} this month)")
+
+async def show_history(
+    origin: str,
+    destination: str,
+    days: int = 30,
+    config_path: str = 'config.yaml',
+    departure: Optional[date] = None
+):
+    from src.database import init_database
+    from src.storage import daily_lows, price_steps
+
+    config = load_config(config_path)
+    engine, session_factory = await init_database(config)
+    try:
+        if departure is not None:
+            since = datetime.utcnow() - timedelta(days=days)
+            steps = await price_steps(session_factory, origin, destination, departure, since)
+        else:
+            rows = await daily_lows(session_factory, origin, destination, days)
+    finally:
+        await engine.dispose()
+
+    if departure is not None:
+        if not steps:
+            print(f"No price history for {origin} -> {destination} on {departure}")
+            return
+        print(f"\n{origin} -> {destination} departing {departure}:\n")
+        for step in steps:
+            price = "unavailable" if step['price'] is None else step['price']
+            until = step['valid_until'] or "now"
+            print(f"  {step['valid_from']} .. {until}  {step['source']} "
+                  f"{step['flight_number'] or step['airline']}: {price}")
+        return
+
+    if not rows:
+        print(f"No price history for {origin} -> {destination} in the last {days} days")
+        return
+    print(f"\n{origin} -> {destination}, last {days} days:\n")
+    for row in rows:
+        print(f"  {row['day']}  low {row['min']}  high {row['max']}  "
+              f"avg {row['avg']:.2f}  ({row['count']} quotes)")
+
+async def maintain_partitions(migrate: bool = False, config_path: str = 'config.yaml'):
+    from src.database import init_database
+    from src.partitions import PartitionManager
+
+    config = load_config(config_path)
+    storage = config.get('storage', {})
+    retention = storage.get('retention_months', 12)
+    engine, _ = await init_database(config)
+    manager = PartitionManager(
+        engine,
+        months_ahead=int(storage.get('partitions_ahead', 3)),
+        retention_months=int(retention) if retention is not None else None
+    )
+    try:
+        if migrate:
+            converted = await manager.migrate()
+            print("price_records converted to monthly partitions" if converted
+                  else "price_records is already partitioned")
+        created, dropped = await manager.maintain()
+    finally:
+        await engine.dispose()
+
+    print(f"Created partitions: {', '.join(created) or 'none'}")
+    print(f"Dropped partitions: {', '.join(dropped) or 'none'}")
+
 if __name__ == '__main__':
     asyncio.run(main())
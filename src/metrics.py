@@ -0,0 +1,80 @@
+# src/metrics.py
+import threading
+from collections import defaultdict
+from typing import Dict, Iterable
+
+
+class Metrics:
+    """Minimal in-process registry of counters, gauges and timing summaries."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters: Dict[str, float] = defaultdict(float)
+        self.gauges: Dict[str, float] = {}
+        self.summaries: Dict[str, Dict[str, float]] = {}
+
+    def inc(self, name: str, value: float = 1):
+        with self._lock:
+            self.counters[name] += value
+
+    def set_gauge(self, name: str, value: float):
+        with self._lock:
+            self.gauges[name] = value
+
+    def observe(self, name: str, value: float):
+        """Record one sample of a timing or size distribution."""
+        with self._lock:
+            summary = self.summaries.get(name)
+            if summary is None:
+                summary = self.summaries[name] = {'count': 0, 'sum': 0.0, 'max': value}
+            summary['count'] += 1
+            summary['sum'] += value
+            summary['max'] = max(summary['max'], value)
+
+    def ratio(self, numerator: str, denominator: str) -> float:
+        total = self.counters.get(denominator, 0)
+        return self.counters.get(numerator, 0) / total if total else 0.0
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                'counters': dict(self.counters),
+                'gauges': dict(self.gauges),
+                'summaries': {k: dict(v) for k, v in self.summaries.items()},
+            }
+
+    def reset(self):
+        with self._lock:
+            self.counters.clear()
+            self.gauges.clear()
+            self.summaries.clear()
+
+
+def merge_snapshots(snapshots: Iterable[dict]) -> dict:
+    """Combine the snapshots of several processes into one.
+
+    Counters and gauges are summed; summaries add their counts and sums and
+    keep the largest max.
+    """
+    merged = {'counters': defaultdict(float), 'gauges': defaultdict(float), 'summaries': {}}
+    for snapshot in snapshots:
+        for name, value in snapshot.get('counters', {}).items():
+            merged['counters'][name] += value
+        for name, value in snapshot.get('gauges', {}).items():
+            merged['gauges'][name] += value
+        for name, summary in snapshot.get('summaries', {}).items():
+            current = merged['summaries'].get(name)
+            if current is None:
+                merged['summaries'][name] = dict(summary)
+            else:
+                current['count'] += summary['count']
+                current['sum'] += summary['sum']
+                current['max'] = max(current['max'], summary['max'])
+    return {
+        'counters': dict(merged['counters']),
+        'gauges': dict(merged['gauges']),
+        'summaries': merged['summaries'],
+    }
+
+
+metrics = Metrics()
@@ -1,9 +1,16 @@
 # src/models.py
+import sys
 from dataclasses import dataclass
 from datetime import date, datetime
 from decimal import Decimal
 from typing import Optional, List
 
+# ISO 4217 minor-unit exponents that differ from the usual 2
+CURRENCY_EXPONENTS = {
+    'JPY': 0, 'KRW': 0, 'VND': 0, 'IDR': 0, 'CLP': 0, 'ISK': 0,
+    'BHD': 3, 'KWD': 3, 'OMR': 3, 'JOD': 3, 'TND': 3,
+}
+
 @dataclass
 class FlightOffer:
     origin: str
@@ -16,6 +23,82 @@ class FlightOffer:
     stops: int
     source: str
 
+class CompactFlightOffer:
+    """Memory-compact FlightOffer for holding large numbers of offers.
+
+    Uses __slots__ instead of a per-instance dict, interns the short and
+    highly repetitive strings (IATA codes, airlines, currency, source) and
+    stores the price as an integer count of the currency's minor unit.
+    Converts losslessly to and from FlightOffer.
+    """
+
+    __slots__ = (
+        'origin', 'destination', 'departure_date', 'price_minor', 'currency',
+        'airline', 'flight_number', 'stops', 'source',
+    )
+
+    def __init__(
+        self,
+        origin: str,
+        destination: str,
+        departure_date: date,
+        price_minor: int,
+        currency: str,
+        airline: str,
+        flight_number: str,
+        stops: int,
+        source: str
+    ):
+        self.origin = sys.intern(origin)
+        self.destination = sys.intern(destination)
+        self.departure_date = departure_date
+        self.price_minor = price_minor
+        self.currency = sys.intern(currency)
+        self.airline = sys.intern(airline)
+        self.flight_number = sys.intern(flight_number)
+        self.stops = stops
+        self.source = sys.intern(source)
+
+    @staticmethod
+    def exponent(currency: str) -> int:
+        return CURRENCY_EXPONENTS.get(currency, 2)
+
+    @classmethod
+    def from_offer(cls, offer: FlightOffer) -> 'CompactFlightOffer':
+        scaled = Decimal(offer.price).scaleb(cls.exponent(offer.currency))
+        if scaled != scaled.to_integral_value():
+            raise ValueError(f"Price {offer.price} has more precision than {offer.currency} minor units")
+        return cls(
+            offer.origin, offer.destination, offer.departure_date, int(scaled),
+            offer.currency, offer.airline, offer.flight_number, offer.stops, offer.source
+        )
+
+    @property
+    def price(self) -> Decimal:
+        return Decimal(self.price_minor).scaleb(-self.exponent(self.currency))
+
+    def to_offer(self) -> FlightOffer:
+        return FlightOffer(
+            origin=self.origin,
+            destination=self.destination,
+            departure_date=self.departure_date,
+            price=self.price,
+            currency=self.currency,
+            airline=self.airline,
+            flight_number=self.flight_number,
+            stops=self.stops,
+            source=self.source
+        )
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, CompactFlightOffer):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    def __repr__(self) -> str:
+        return (f"CompactFlightOffer({self.origin}->{self.destination} {self.departure_date} "
+                f"{self.price} {self.currency} {self.flight_number} via {self.source})")
+
 @dataclass
 class AlertMessage:
     route_name: str
@@ -36,3 +119,11 @@ class AlertResult:
     message: str
     current_price: Decimal
     threshold_value: Optional[Decimal] = None
+
+@dataclass
+class SourceResult:
+    source: str
+    offers: List[FlightOffer]
+    error: Optional[Exception] = None
+    late: bool = False
+    elapsed: float = 0.0
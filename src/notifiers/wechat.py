@@ -1,7 +1,9 @@
 # src/notifiers/wechat.py
 import logging
 import httpx
+from typing import Optional
 from src.notifiers.base import BaseNotifier
+from src.http_pool import borrow_client
 from src.models import AlertMessage
 
 logger = logging.getLogger(__name__)
@@ -10,8 +12,11 @@ logger = logging.getLogger(__name__)
 class WechatNotifier(BaseNotifier):
     """WeChat push notification channel via Server酱/PushPlus."""
 
-    def __init__(self, push_key: str = ""):
+    PUSH_URL = "https://sctapi.ftqq.com/{push_key}.send"
+
+    def __init__(self, push_key: str = "", client: Optional[httpx.AsyncClient] = None):
         self.push_key = push_key
+        self.client = client
 
     @property
     def name(self) -> str:
@@ -38,11 +43,11 @@ class WechatNotifier(BaseNotifier):
 - **类型**: {msg.rule_type}
 - **详情**: {msg.rule_message}
 """
-        url = f"https://sctapi.ftqq.com/{self.push_key}.send"
+        url = self.PUSH_URL.format(push_key=self.push_key)
         payload = {"title": title, "desp": content}
 
         try:
-            async with httpx.AsyncClient() as client:
+            async with borrow_client(self.client) as client:
                 resp = await client.post(url, data=payload, timeout=10)
                 resp.raise_for_status()
                 logger.info(f"WeChat notification sent: {title}")
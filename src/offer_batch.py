@@ -0,0 +1,286 @@
+# src/offer_batch.py
+from datetime import date
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Sequence
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy is listed in requirements.txt
+    np = None
+
+from src.models import CURRENCY_EXPONENTS, FlightOffer
+
+
+def _require_numpy():
+    if np is None:
+        raise RuntimeError("OfferBatch requires numpy, install it with 'pip install numpy'")
+
+
+class _Vocabulary:
+    """Maps repeated strings to small integer codes."""
+
+    def __init__(self, values: Iterable[str] = ()):
+        self.values: List[str] = []
+        self._codes: Dict[str, int] = {}
+        for value in values:
+            self.code(value)
+
+    def code(self, value: str) -> int:
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def lookup(self, value: str) -> Optional[int]:
+        return self._codes.get(value)
+
+
+class OfferBatchBuilder:
+    """Collects offers row by row into column lists.
+
+    `append` takes the FlightOffer fields in declaration order, so parsers
+    can fill a batch without creating a FlightOffer per row.
+    """
+
+    def __init__(self):
+        _require_numpy()
+        self.currency: Optional[str] = None
+        self.airports = _Vocabulary()
+        self.airlines = _Vocabulary()
+        self.sources = _Vocabulary()
+        self._price: List[int] = []
+        self._day: List[int] = []
+        self._stops: List[int] = []
+        self._origin: List[int] = []
+        self._destination: List[int] = []
+        self._airline: List[int] = []
+        self._source: List[int] = []
+        self._flight_number: List[str] = []
+
+    def __len__(self) -> int:
+        return len(self._price)
+
+    def append(
+        self,
+        origin: str,
+        destination: str,
+        departure_date: date,
+        price: Decimal,
+        currency: str,
+        airline: str,
+        flight_number: str,
+        stops: int,
+        source: str
+    ):
+        if self.currency is None:
+            self.currency = currency
+        elif currency != self.currency:
+            raise ValueError(f"Cannot mix {currency} into a {self.currency} batch")
+
+        scaled = Decimal(price).scaleb(CURRENCY_EXPONENTS.get(currency, 2))
+        if scaled != scaled.to_integral_value():
+            raise ValueError(f"Price {price} has more precision than {currency} minor units")
+
+        self._price.append(int(scaled))
+        self._day.append(departure_date.toordinal())
+        self._stops.append(stops)
+        self._origin.append(self.airports.code(origin))
+        self._destination.append(self.airports.code(destination))
+        self._airline.append(self.airlines.code(airline))
+        self._source.append(self.sources.code(source))
+        self._flight_number.append(flight_number)
+
+    def extend(self, offers: Iterable[FlightOffer]):
+        for o in offers:
+            self.append(o.origin, o.destination, o.departure_date, o.price, o.currency,
+                        o.airline, o.flight_number, o.stops, o.source)
+
+    def build(self) -> 'OfferBatch':
+        return OfferBatch(
+            price=np.array(self._price, dtype=np.int64),
+            day=np.array(self._day, dtype=np.int32),
+            stops=np.array(self._stops, dtype=np.int8),
+            origin=np.array(self._origin, dtype=np.int32),
+            destination=np.array(self._destination, dtype=np.int32),
+            airline=np.array(self._airline, dtype=np.int32),
+            source=np.array(self._source, dtype=np.int32),
+            flight_number=np.array(self._flight_number, dtype=object),
+            currency=self.currency or "CNY",
+            airports=self.airports.values,
+            airlines=self.airlines.values,
+            sources=self.sources.values,
+        )
+
+
+class OfferBatch:
+    """Columnar, NumPy-backed set of offers in a single currency.
+
+    Prices are int64 counts of the currency's minor unit, departure dates are
+    ordinals, and airports, airlines and sources are codes into small lookup
+    tables. Selections return new batches that share those tables.
+    """
+
+    COLUMNS = ('price', 'day', 'stops', 'origin', 'destination', 'airline', 'source', 'flight_number')
+
+    def __init__(
+        self,
+        price, day, stops, origin, destination, airline, source, flight_number,
+        currency: str,
+        airports: Sequence[str],
+        airlines: Sequence[str],
+        sources: Sequence[str]
+    ):
+        _require_numpy()
+        self.price = price
+        self.day = day
+        self.stops = stops
+        self.origin = origin
+        self.destination = destination
+        self.airline = airline
+        self.source = source
+        self.flight_number = flight_number
+        self.currency = currency
+        self.airports = list(airports)
+        self.airlines = list(airlines)
+        self.sources = list(sources)
+
+    @classmethod
+    def from_offers(cls, offers: Iterable[FlightOffer]) -> 'OfferBatch':
+        builder = OfferBatchBuilder()
+        builder.extend(offers)
+        return builder.build()
+
+    @classmethod
+    def concat(cls, batches: List['OfferBatch']) -> 'OfferBatch':
+        """Join batches, merging their lookup tables."""
+        batches = [b for b in batches if len(b)]
+        if not batches:
+            return OfferBatchBuilder().build()
+        currency = batches[0].currency
+        for batch in batches:
+            if batch.currency != currency:
+                raise ValueError(f"Cannot mix {batch.currency} into a {currency} batch")
+
+        airports, airlines, sources = _Vocabulary(), _Vocabulary(), _Vocabulary()
+        columns = {name: [] for name in cls.COLUMNS}
+        for batch in batches:
+            airport_map = np.array([airports.code(v) for v in batch.airports], dtype=np.int32)
+            airline_map = np.array([airlines.code(v) for v in batch.airlines], dtype=np.int32)
+            source_map = np.array([sources.code(v) for v in batch.sources], dtype=np.int32)
+            columns['price'].append(batch.price)
+            columns['day'].append(batch.day)
+            columns['stops'].append(batch.stops)
+            columns['origin'].append(airport_map[batch.origin])
+            columns['destination'].append(airport_map[batch.destination])
+            columns['airline'].append(airline_map[batch.airline])
+            columns['source'].append(source_map[batch.source])
+            columns['flight_number'].append(batch.flight_number)
+
+        return cls(
+            **{name: np.concatenate(parts) for name, parts in columns.items()},
+            currency=currency,
+            airports=airports.values,
+            airlines=airlines.values,
+            sources=sources.values,
+        )
+
+    def __len__(self) -> int:
+        return len(self.price)
+
+    @property
+    def exponent(self) -> int:
+        return CURRENCY_EXPONENTS.get(self.currency, 2)
+
+    def _to_price(self, minor) -> Decimal:
+        return Decimal(int(minor)).scaleb(-self.exponent)
+
+    def take(self, selection) -> 'OfferBatch':
+        """Select rows by index array or boolean mask."""
+        return OfferBatch(
+            **{name: getattr(self, name)[selection] for name in self.COLUMNS},
+            currency=self.currency,
+            airports=self.airports,
+            airlines=self.airlines,
+            sources=self.sources,
+        )
+
+    def offer(self, i: int) -> FlightOffer:
+        return FlightOffer(
+            origin=self.airports[self.origin[i]],
+            destination=self.airports[self.destination[i]],
+            departure_date=date.fromordinal(int(self.day[i])),
+            price=self._to_price(self.price[i]),
+            currency=self.currency,
+            airline=self.airlines[self.airline[i]],
+            flight_number=self.flight_number[i],
+            stops=int(self.stops[i]),
+            source=self.sources[self.source[i]]
+        )
+
+    def to_offers(self) -> List[FlightOffer]:
+        return [self.offer(i) for i in range(len(self))]
+
+    def filter(
+        self,
+        max_stops: Optional[int] = None,
+        sources: Optional[Iterable[str]] = None,
+        airlines: Optional[Iterable[str]] = None
+    ) -> 'OfferBatch':
+        mask = np.ones(len(self), dtype=bool)
+        if max_stops is not None:
+            mask &= self.stops <= max_stops
+        if sources is not None:
+            codes = [self.sources.index(s) for s in sources if s in self.sources]
+            mask &= np.isin(self.source, codes)
+        if airlines is not None:
+            codes = [self.airlines.index(a) for a in airlines if a in self.airlines]
+            mask &= np.isin(self.airline, codes)
+        return self.take(mask)
+
+    def best(self) -> Optional[FlightOffer]:
+        """Cheapest offer; ties go to the earliest row."""
+        if not len(self):
+            return None
+        return self.offer(int(np.argmin(self.price)))
+
+    def top_k(self, k: int) -> 'OfferBatch':
+        """The k cheapest offers, cheapest first."""
+        if k >= len(self):
+            return self.take(np.argsort(self.price, kind='stable'))
+        candidates = np.argpartition(self.price, k)[:k]
+        return self.take(candidates[np.argsort(self.price[candidates], kind='stable')])
+
+    def cheapest_per_date(self) -> 'OfferBatch':
+        """One cheapest offer per departure date, ordered by date."""
+        if not len(self):
+            return self
+        order = np.lexsort((self.price, self.day))
+        _, first = np.unique(self.day[order], return_index=True)
+        return self.take(order[first])
+
+    def min_per_date(self) -> Dict[date, Decimal]:
+        cheapest = self.cheapest_per_date()
+        return {
+            date.fromordinal(int(day)): self._to_price(price)
+            for day, price in zip(cheapest.day, cheapest.price)
+        }
+
+    def group_by_airline(self) -> Dict[str, dict]:
+        """Offer count and min/mean price per airline."""
+        if not len(self):
+            return {}
+        size = len(self.airlines)
+        counts = np.bincount(self.airline, minlength=size)
+        totals = np.bincount(self.airline, weights=self.price, minlength=size)
+        mins = np.full(size, np.iinfo(np.int64).max, dtype=np.int64)
+        np.minimum.at(mins, self.airline, self.price)
+
+        groups = {}
+        for code in np.nonzero(counts)[0]:
+            groups[self.airlines[code]] = {
+                'count': int(counts[code]),
+                'min': self._to_price(mins[code]),
+                'mean': self._to_price(round(totals[code] / counts[code])),
+            }
+        return groups
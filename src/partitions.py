@@ -0,0 +1,260 @@
+# src/partitions.py
+import asyncio
+import logging
+import re
+from datetime import date, datetime
+from typing import List, Optional, Tuple
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+PARENT = 'price_records'
+LEGACY = 'price_records_legacy'
+_PARTITION_NAME = re.compile(rf'^{PARENT}_(\d{{4}})_(\d{{2}})$')
+
+
+def month_start(day: date) -> date:
+    return date(day.year, day.month, 1)
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"{PARENT}_{month.year:04d}_{month.month:02d}"
+
+
+def parse_partition_name(name: str) -> Optional[date]:
+    match = _PARTITION_NAME.match(name)
+    if match is None:
+        return None
+    return date(int(match.group(1)), int(match.group(2)), 1)
+
+
+def create_partition_sql(month: date) -> str:
+    return (
+        f"CREATE TABLE IF NOT EXISTS {partition_name(month)} PARTITION OF {PARENT} "
+        f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+    )
+
+
+def expired_partitions(names: List[str], today: date, retention_months: int) -> List[str]:
+    """Monthly partitions that lie entirely before the retention window."""
+    cutoff = add_months(month_start(today), -retention_months)
+    return sorted(
+        name for name in names
+        if (month := parse_partition_name(name)) is not None and month < cutoff
+    )
+
+
+# Rebuilds price_daily from the legacy table; rows written since the rollup
+# existed are in the legacy table too, so nothing is counted twice.
+BACKFILL_ROLLUP_SQL = f"""
+INSERT INTO price_daily (
+    origin, destination, departure_date, fetch_day,
+    min_price, max_price, sum_price, count, last_price, last_fetched_at
+)
+SELECT DISTINCT ON (origin, destination, departure_date, fetched_at::date)
+    origin, destination, departure_date, fetched_at::date,
+    min(price) OVER w, max(price) OVER w, sum(price) OVER w, count(*) OVER w,
+    price, fetched_at
+FROM {LEGACY}
+WHERE price > 0 AND available
+WINDOW w AS (PARTITION BY origin, destination, departure_date, fetched_at::date)
+ORDER BY origin, destination, departure_date, fetched_at::date, fetched_at DESC, price
+"""
+
+
+class PartitionManager:
+    """Keeps price_records partitioned by month of fetched_at.
+
+    Partitions for the current month and `months_ahead` following months are
+    created in advance; partitions older than `retention_months` are
+    detached and dropped. Their prices survive, downsampled, in price_daily,
+    which is maintained as records are written.
+    """
+
+    def __init__(self, engine, months_ahead: int = 3, retention_months: Optional[int] = 12):
+        self.engine = engine
+        self.months_ahead = months_ahead
+        self.retention_months = retention_months
+        self._task: Optional[asyncio.Task] = None
+
+    async def partitions(self, conn) -> List[str]:
+        rows = await conn.execute(text(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "JOIN pg_class p ON p.oid = i.inhparent "
+            "WHERE p.relname = :parent"
+        ), {'parent': PARENT})
+        return [row[0] for row in rows]
+
+    async def ensure_partitions(self, today: Optional[date] = None) -> List[str]:
+        """Create any missing monthly partitions; returns the ones created."""
+        first = month_start(today or datetime.utcnow().date())
+        months = [add_months(first, i) for i in range(self.months_ahead + 1)]
+        async with self.engine.begin() as conn:
+            existing = set(await self.partitions(conn))
+            created = []
+            for month in months:
+                if partition_name(month) not in existing:
+                    await conn.execute(text(create_partition_sql(month)))
+                    created.append(partition_name(month))
+        if created:
+            logger.info(f"Created price_records partitions: {', '.join(created)}")
+        return created
+
+    async def apply_retention(self, today: Optional[date] = None) -> List[str]:
+        """Drop partitions past the retention window; returns the ones dropped."""
+        if self.retention_months is None:
+            return []
+        today = today or datetime.utcnow().date()
+        async with self.engine.begin() as conn:
+            expired = expired_partitions(await self.partitions(conn), today, self.retention_months)
+            for name in expired:
+                await conn.execute(text(f"ALTER TABLE {PARENT} DETACH PARTITION {name}"))
+                await conn.execute(text(f"DROP TABLE {name}"))
+        if expired:
+            logger.info(f"Dropped expired price_records partitions: {', '.join(expired)}")
+        return expired
+
+    async def upgrade_schema(self):
+        """Add tables and columns introduced after the database was created."""
+        async with self.engine.begin() as conn:
+            for statement in UPGRADE_SQL:
+                await conn.execute(text(statement))
+
+    async def maintain(self) -> Tuple[List[str], List[str]]:
+        await self.upgrade_schema()
+        return await self.ensure_partitions(), await self.apply_retention()
+
+    def start(self, interval: float = 86400):
+        """Run maintenance periodically in the background."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._loop(interval))
+
+    async def _loop(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.maintain()
+            except Exception as e:
+                logger.warning(f"Partition maintenance failed: {e}")
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def migrate(self) -> bool:
+        """Convert an unpartitioned price_records table in place.
+
+        The old table is renamed, a partitioned table with partitions for its
+        whole time span is created, the rows are copied over and price_daily
+        is rebuilt from them. Runs in one transaction; returns False when the
+        table is already partitioned.
+        """
+        async with self.engine.begin() as conn:
+            kind = (await conn.execute(text(
+                "SELECT relkind FROM pg_class WHERE relname = :parent AND relnamespace = 'public'::regnamespace"
+            ), {'parent': PARENT})).scalar()
+            if kind != 'r':
+                return False
+
+            await conn.execute(text(f"ALTER TABLE {PARENT} RENAME TO {LEGACY}"))
+            for index in ('idx_route_date', 'idx_fetched_at'):
+                await conn.execute(text(f"ALTER INDEX IF EXISTS {index} RENAME TO {index}_legacy"))
+            for statement in PARTITIONED_TABLE_SQL:
+                await conn.execute(text(statement))
+
+            span = (await conn.execute(text(f"SELECT min(fetched_at), max(fetched_at) FROM {LEGACY}"))).one()
+            today = datetime.utcnow().date()
+            first = month_start(span[0].date()) if span[0] else month_start(today)
+            last = add_months(month_start(today), self.months_ahead)
+            if span[1] and month_start(span[1].date()) > last:
+                last = month_start(span[1].date())
+            month = first
+            while month <= last:
+                await conn.execute(text(create_partition_sql(month)))
+                month = add_months(month, 1)
+
+            # Tables from before change-only storage have no markers yet
+            await conn.execute(text(
+                f"ALTER TABLE {LEGACY} ADD COLUMN IF NOT EXISTS available BOOLEAN NOT NULL DEFAULT TRUE"
+            ))
+            columns = ('origin, destination, departure_date, source, airline, price, '
+                       'currency, flight_number, stops, fetched_at, available')
+            await conn.execute(text(
+                f"INSERT INTO {PARENT} ({columns}) "
+                f"SELECT {columns} FROM {LEGACY} WHERE fetched_at IS NOT NULL"
+            ))
+            for statement in ROLLUP_TABLE_SQL:
+                await conn.execute(text(statement))
+            await conn.execute(text("DELETE FROM price_daily"))
+            await conn.execute(text(BACKFILL_ROLLUP_SQL))
+            await conn.execute(text(f"DROP TABLE {LEGACY}"))
+        logger.info("price_records converted to a partitioned table")
+        return True
+
+
+# Kept in step with init.sql
+PARTITIONED_TABLE_SQL = [
+    f"""CREATE TABLE IF NOT EXISTS {PARENT} (
+        id BIGINT GENERATED BY DEFAULT AS IDENTITY,
+        origin CHAR(3) NOT NULL,
+        destination CHAR(3) NOT NULL,
+        departure_date DATE NOT NULL,
+        source VARCHAR(20) NOT NULL,
+        airline VARCHAR(50),
+        price DECIMAL(10,2) NOT NULL,
+        currency CHAR(3) DEFAULT 'CNY',
+        flight_number VARCHAR(20),
+        stops INT DEFAULT 0,
+        fetched_at TIMESTAMP NOT NULL DEFAULT NOW(),
+        available BOOLEAN NOT NULL DEFAULT TRUE,
+        PRIMARY KEY (id, fetched_at)
+    ) PARTITION BY RANGE (fetched_at)""",
+    f"CREATE TABLE IF NOT EXISTS {PARENT}_default PARTITION OF {PARENT} DEFAULT",
+    f"CREATE INDEX IF NOT EXISTS idx_route_date ON {PARENT}(origin, destination, departure_date)",
+    f"CREATE INDEX IF NOT EXISTS idx_fetched_at ON {PARENT}(fetched_at)",
+]
+
+# Kept in step with init.sql, which Postgres only runs on a fresh volume
+ROLLUP_TABLE_SQL = [
+    """CREATE TABLE IF NOT EXISTS price_daily (
+        origin CHAR(3) NOT NULL,
+        destination CHAR(3) NOT NULL,
+        departure_date DATE NOT NULL,
+        fetch_day DATE NOT NULL,
+        min_price DECIMAL(10,2) NOT NULL,
+        max_price DECIMAL(10,2) NOT NULL,
+        sum_price DECIMAL(14,2) NOT NULL,
+        count INT NOT NULL,
+        last_price DECIMAL(10,2) NOT NULL,
+        last_fetched_at TIMESTAMP NOT NULL,
+        PRIMARY KEY (origin, destination, departure_date, fetch_day)
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_daily_route_day ON price_daily(origin, destination, fetch_day)",
+]
+
+QUOTA_TABLE_SQL = """CREATE TABLE IF NOT EXISTS api_quota_usage (
+    source VARCHAR(20) PRIMARY KEY,
+    day DATE NOT NULL,
+    day_used INT NOT NULL DEFAULT 0,
+    month CHAR(7) NOT NULL,
+    month_used INT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT NOW()
+)"""
+
+# Idempotent changes for databases created by older versions
+UPGRADE_SQL = [
+    f"ALTER TABLE {PARENT} ADD COLUMN IF NOT EXISTS available BOOLEAN NOT NULL DEFAULT TRUE",
+    *ROLLUP_TABLE_SQL,
+    QUOTA_TABLE_SQL,
+]
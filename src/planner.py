@@ -0,0 +1,81 @@
+# src/planner.py
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from src.fetchers.quota import PRIORITIES
+from src.models import FlightOffer
+
+Window = Tuple[date, date]
+
+
+def route_window(route: dict, today: Optional[date] = None) -> Window:
+    """Departure dates watched by a route, as read from its date_range."""
+    date_range = route.get('date_range', {})
+    start = date.fromisoformat(date_range.get('start', (today or date.today()).isoformat()))
+    end = date.fromisoformat(date_range.get('end', start.isoformat()))
+    return start, end
+
+
+def merge_windows(windows: List[Window]) -> List[Window]:
+    """Union of date windows as sorted, disjoint windows."""
+    merged: List[Window] = []
+    for start, end in sorted(windows):
+        if merged and start <= merged[-1][1] + timedelta(days=1):
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def pair_job_id(origin: str, destination: str) -> str:
+    return f"pair_{origin}_{destination}"
+
+
+class PairPlan:
+    """All watched routes of one city pair, checked by a single job.
+
+    Each tick fetches the union of the routes' date windows once and hands
+    every route the offers inside its own window.
+    """
+
+    def __init__(self, origin: str, destination: str, routes: List[dict]):
+        self.origin = origin
+        self.destination = destination
+        self.routes = routes
+
+    @property
+    def job_id(self) -> str:
+        return pair_job_id(self.origin, self.destination)
+
+    @property
+    def name(self) -> str:
+        return ' + '.join(route['name'] for route in self.routes)
+
+    @property
+    def priority(self) -> str:
+        return max(
+            (route.get('priority', 'normal') for route in self.routes),
+            key=lambda p: PRIORITIES.get(p, PRIORITIES['normal'])
+        )
+
+    @property
+    def deadline(self) -> Optional[float]:
+        deadlines = [route['deadline'] for route in self.routes if route.get('deadline')]
+        return min(deadlines, default=None)
+
+    def windows(self, today: Optional[date] = None) -> List[Window]:
+        return merge_windows([route_window(route, today) for route in self.routes])
+
+    def offers_for(self, route: dict, offers: List[FlightOffer], today: Optional[date] = None) -> List[FlightOffer]:
+        if len(self.routes) == 1:
+            return offers
+        start, end = route_window(route, today)
+        return [offer for offer in offers if start <= offer.departure_date <= end]
+
+
+def plan_routes(routes: List[dict]) -> List[PairPlan]:
+    """Group routes by city pair, in the order the pairs first appear."""
+    pairs: Dict[Tuple[str, str], List[dict]] = {}
+    for route in routes:
+        pairs.setdefault((route['origin'], route['destination']), []).append(route)
+    return [PairPlan(origin, destination, group) for (origin, destination), group in pairs.items()]
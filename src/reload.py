@@ -0,0 +1,91 @@
+# src/reload.py
+import asyncio
+import logging
+import os
+import signal
+from typing import Awaitable, Callable, Optional, Tuple
+from src.config import load_config
+
+logger = logging.getLogger(__name__)
+
+
+class ConfigReloader:
+    """Reloads the config file when it changes or on SIGHUP.
+
+    The file's modification time and size are polled every `interval`
+    seconds (no polling when None). A config that fails to load or to apply
+    is logged and ignored, so a half-saved file never replaces a working
+    config.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        apply: Callable[[dict], Awaitable],
+        load: Callable[[str], dict] = load_config,
+        interval: Optional[float] = 5.0
+    ):
+        self.path = path
+        self.apply = apply
+        self.load = load
+        self.interval = interval
+        self._stamp = self._read_stamp()
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._signal = False
+
+    def _read_stamp(self) -> Optional[Tuple[float, int]]:
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime, stat.st_size
+
+    async def reload(self) -> bool:
+        async with self._lock:
+            self._stamp = self._read_stamp()
+            try:
+                config = self.load(self.path)
+            except Exception as e:
+                logger.error(f"Could not reload {self.path}, keeping the current config: {e}")
+                return False
+            try:
+                await self.apply(config)
+            except Exception as e:
+                logger.error(f"Could not apply {self.path}, keeping the current config: {e}")
+                return False
+            return True
+
+    async def check(self) -> bool:
+        """Reload if the file changed since it was last read."""
+        if self._read_stamp() == self._stamp:
+            return False
+        return await self.reload()
+
+    def start(self):
+        loop = asyncio.get_running_loop()
+        if hasattr(signal, 'SIGHUP'):
+            loop.add_signal_handler(signal.SIGHUP, lambda: asyncio.ensure_future(self.reload()))
+            self._signal = True
+        if self.interval and (self._task is None or self._task.done()):
+            self._task = asyncio.ensure_future(self._loop())
+
+    async def _loop(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.check()
+            except Exception as e:
+                logger.error(f"Config reload failed: {e}")
+
+    async def close(self):
+        if self._signal:
+            asyncio.get_running_loop().remove_signal_handler(signal.SIGHUP)
+            self._signal = False
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
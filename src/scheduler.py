@@ -1,29 +1,184 @@
 # src/scheduler.py
 import re
+import time
+import asyncio
 import logging
-from datetime import date
+from datetime import date, datetime, timedelta, timezone
 from decimal import Decimal
-from typing import List, Optional
+from typing import Dict, List, Optional
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.interval import IntervalTrigger
+from apscheduler.events import (
+    EVENT_JOB_SUBMITTED, EVENT_JOB_MISSED, EVENT_JOB_MAX_INSTANCES, EVENT_JOB_ERROR
+)
 
 from src.config import load_config
-from src.models import FlightOffer, AlertMessage, AlertResult
+from src.models import FlightOffer, AlertMessage, AlertResult, SourceResult
 from src.fetchers import PriceAggregator, KiwiFetcher, AviationStackFetcher, AmadeusFetcher
-from src.analyzers import AlertEngine, ThresholdRule, DropPercentRule, HistoricalLowRule
+from src.analyzers import AlertEngine, ThresholdRule, DropPercentRule, HistoricalLowRule, PriceHistoryCache, RouteHistory
 from src.notifiers import NotifierManager, ConsoleNotifier, WechatNotifier
+from src.http_pool import HttpClientPool
+from src.database import init_database
+from src.fetchers.quota import QuotaManager, FileQuotaStore, PostgresQuotaStore, fetch_priority
+from src.fetchers.cache import ResponseCache
+from src.fetchers.circuit import CircuitBreaker, CircuitBreakerFetcher
+from src.fetchers.decode import JsonDecoder
+from src.storage import ChangeFilter, FetchScope, PriceWriter, RecordingFetcher, check_time
+from src.partitions import PartitionManager
+from src.planner import PairPlan, plan_routes
+from src.leases import LeaseCoordinator
+from src.scheduling import AdaptiveInterval, AdaptiveTrigger, staggered_start
+from src.metrics import metrics
 
 logger = logging.getLogger(__name__)
 
+def _flag(value) -> bool:
+    """Read a boolean option that may come from an environment variable."""
+    if isinstance(value, str):
+        return value.strip().lower() in ('1', 'true', 'yes', 'on')
+    return bool(value)
+
+class RouteCheck:
+    """Alert state of one route check, fed incrementally as sources report."""
+
+    def __init__(self, route: dict, engine: AlertEngine, notifier_manager: NotifierManager):
+        self.route = route
+        self.engine = engine
+        self.notifier_manager = notifier_manager
+        self.best: Optional[FlightOffer] = None
+        self.notified = False
+
+    async def consider(self, offer: Optional[FlightOffer]):
+        """Evaluate the rules if `offer` beats the best price seen so far."""
+        if offer is None or (self.best is not None and offer.price >= self.best.price):
+            return
+        self.best = offer
+        if self.notified:
+            return
+
+        alerts = await self.engine.check(offer, None)
+        if alerts:
+            await self._notify(offer, alerts)
+
+    async def _notify(self, best: FlightOffer, alerts: List[AlertResult]):
+        message = AlertMessage(
+            route_name=self.route['name'],
+            origin=best.origin,
+            destination=best.destination,
+            departure_date=str(best.departure_date),
+            price=best.price,
+            currency=best.currency,
+            airline=best.airline,
+            rule_type=alerts[0].rule_type,
+            rule_message=alerts[0].message,
+            source=best.source
+        )
+        self.notified = True
+        channels = await self.notifier_manager.notify_all(message)
+        logger.info(f"Notified via: {channels}")
+
+
 class FlightMonitorScheduler:
     """Main scheduler for flight monitoring tasks."""
 
     def __init__(self, config: dict):
         self.config = config
         self.scheduler = AsyncIOScheduler()
+        self.scheduler.add_listener(
+            self._on_job_event,
+            EVENT_JOB_SUBMITTED | EVENT_JOB_MISSED | EVENT_JOB_MAX_INSTANCES | EVENT_JOB_ERROR
+        )
+        self.check_slots = self._init_check_slots()
+        self.http_pool = HttpClientPool(config.get('http', {}))
+        self.engine = None
+        self.session_factory = None
+        self.writer: Optional[PriceWriter] = None
+        self.partitions: Optional[PartitionManager] = None
+        self.leases: Optional[LeaseCoordinator] = None
+        self.history = self._init_history()
+        self.quota = self._init_quota()
+        self.cache = self._init_cache()
+        self.decoder = self._init_decoder()
         self.aggregator = self._init_aggregator()
         self.notifier_manager = self._init_notifiers()
 
+    def _init_check_slots(self) -> Optional[asyncio.Semaphore]:
+        limit = self.config.get('scheduler', {}).get('max_concurrent_checks')
+        return asyncio.Semaphore(int(limit)) if limit else None
+
+    def _init_quota(self) -> QuotaManager:
+        cfg = self.config.get('quota', {})
+        sources = self.config.get('sources', {})
+        return QuotaManager(
+            {name: source.get('quota', {}) for name, source in sources.items()},
+            low_watermark=float(cfg.get('low_watermark', 0.2)),
+            critical_watermark=float(cfg.get('critical_watermark', 0.05)),
+            share=float(cfg.get('share', 1.0))
+        )
+
+    def _init_cache(self) -> Optional[ResponseCache]:
+        cfg = self.config.get('cache', {})
+        if not cfg.get('enabled', True):
+            return None
+        return ResponseCache(
+            ttls=cfg.get('ttl', {}),
+            max_entries=int(cfg.get('max_entries', 10000)),
+            disk_path=cfg.get('disk_path')
+        )
+
+    def _history_lookback_days(self, routes: Optional[List[dict]] = None) -> int:
+        lookbacks = [
+            int(alert.get('lookback_days', 7))
+            for route in (self.config.get('routes', []) if routes is None else routes)
+            for alert in route.get('alerts', [])
+            if alert.get('type') == 'historical_low'
+        ]
+        return max(lookbacks, default=7)
+
+    def _init_history(self) -> PriceHistoryCache:
+        return PriceHistoryCache(lookback_days=self._history_lookback_days())
+
+    def _init_decoder(self) -> JsonDecoder:
+        cfg = self.config.get('http', {})
+        offload = cfg.get('parse_offload_bytes', 256 * 1024)
+        return JsonDecoder(
+            backend=cfg.get('json_backend', 'auto'),
+            offload_threshold=int(offload) if offload is not None else None
+        )
+
+    def _wrap_fetcher(self, fetcher):
+        # Cache outermost so that cache hits do not spend quota, and the
+        # breaker outside quota so that open circuits do not spend it either
+        fetcher = self.quota.wrap(fetcher)
+        breaker_cfg = self.config.get('circuit_breaker', {})
+        if breaker_cfg.get('enabled', True):
+            latency = breaker_cfg.get('latency_threshold')
+            timeout = breaker_cfg.get('timeout')
+            hedge_delay = breaker_cfg.get('hedge_delay')
+            fetcher = CircuitBreakerFetcher(
+                fetcher,
+                CircuitBreaker(
+                    window=int(breaker_cfg.get('window', 20)),
+                    min_calls=int(breaker_cfg.get('min_calls', 5)),
+                    error_rate=float(breaker_cfg.get('error_rate', 0.5)),
+                    latency_threshold=float(latency) if latency else None,
+                    latency_percentile=float(breaker_cfg.get('latency_percentile', 0.95)),
+                    open_seconds=float(breaker_cfg.get('open_seconds', 60))
+                ),
+                timeout=float(timeout) if timeout else None,
+                hedge=bool(breaker_cfg.get('hedge', False)),
+                hedge_delay=float(hedge_delay) if hedge_delay else None
+            )
+        # Inside the cache, so that only fresh fetches are persisted
+        fetcher = RecordingFetcher(fetcher, self._record_offers)
+        if self.cache is not None:
+            fetcher = self.cache.wrap(fetcher)
+        return fetcher
+
+    async def _record_offers(self, offers: List[FlightOffer], scope: FetchScope):
+        if self.writer is not None:
+            await self.writer.put(offers, scope=scope)
+
     def _init_aggregator(self) -> PriceAggregator:
         fetchers = []
         sources = self.config.get('sources', {})
@@ -31,20 +186,40 @@ class FlightMonitorScheduler:
         if sources.get('amadeus', {}).get('enabled'):
             fetchers.append(AmadeusFetcher(
                 client_id=sources['amadeus'].get('client_id', ''),
-                client_secret=sources['amadeus'].get('client_secret', '')
+                client_secret=sources['amadeus'].get('client_secret', ''),
+                client=self.http_pool.client_for(AmadeusFetcher.SEARCH_URL),
+                max_concurrency=int(sources['amadeus'].get('max_concurrency', 5)),
+                rate_limit=float(sources['amadeus'].get('rate_limit', 10)),
+                max_retries=int(sources['amadeus'].get('max_retries', 3)),
+                calendar=bool(sources['amadeus'].get('calendar', False)),
+                calendar_top_n=int(sources['amadeus'].get('calendar_top_n', 3)),
+                decoder=self.decoder
             ))
 
         if sources.get('kiwi', {}).get('enabled'):
             fetchers.append(KiwiFetcher(
-                api_key=sources['kiwi'].get('api_key', '')
+                api_key=sources['kiwi'].get('api_key', ''),
+                client=self.http_pool.client_for(KiwiFetcher.BASE_URL),
+                max_batch_size=int(sources['kiwi'].get('max_batch_size', 10)),
+                batch_window=float(sources['kiwi'].get('batch_window', 0.05)),
+                decoder=self.decoder
             ))
 
         if sources.get('aviationstack', {}).get('enabled'):
             fetchers.append(AviationStackFetcher(
-                api_key=sources['aviationstack'].get('api_key', '')
+                api_key=sources['aviationstack'].get('api_key', ''),
+                client=self.http_pool.client_for(AviationStackFetcher.BASE_URL),
+                max_pages=int(sources['aviationstack'].get('max_pages', 10)),
+                max_concurrency=int(sources['aviationstack'].get('max_concurrency', 4)),
+                server_date_filter=bool(sources['aviationstack'].get('server_date_filter', False)),
+                decoder=self.decoder
             ))
 
-        return PriceAggregator(fetchers)
+        deadline = self.config.get('aggregator', {}).get('deadline')
+        return PriceAggregator(
+            [self._wrap_fetcher(f) for f in fetchers],
+            deadline=float(deadline) if deadline else None
+        )
 
     def _init_notifiers(self) -> NotifierManager:
         notifiers = []
@@ -57,7 +232,8 @@ class FlightMonitorScheduler:
 
         if cfg.get('wechat', {}).get('enabled'):
             notifiers.append(WechatNotifier(
-                push_key=cfg['wechat'].get('push_key', '')
+                push_key=cfg['wechat'].get('push_key', ''),
+                client=self.http_pool.client_for(WechatNotifier.PUSH_URL)
             ))
 
         return NotifierManager(notifiers)
@@ -74,7 +250,7 @@ class FlightMonitorScheduler:
             return {'hours': value}
         return {'minutes': value}
 
-    def _build_rules(self, alert_configs: List[dict]) -> List:
+    def _build_rules(self, alert_configs: List[dict], history: Optional[RouteHistory] = None) -> List:
         rules = []
         for cfg in alert_configs:
             alert_type = cfg.get('type')
@@ -84,71 +260,356 @@ class FlightMonitorScheduler:
                 ))
             elif alert_type == 'drop_percent':
                 rules.append(DropPercentRule(
-                    percent=cfg.get('percent', 10)
+                    percent=cfg.get('percent', 10),
+                    history=history
                 ))
             elif alert_type == 'historical_low':
                 rules.append(HistoricalLowRule(
-                    lookback_days=cfg.get('lookback_days', 7)
+                    lookback_days=cfg.get('lookback_days', 7),
+                    history=history
                 ))
         return rules
 
-    def setup_jobs(self):
-        for route in self.config.get('routes', []):
-            interval = self._parse_interval(route.get('check_interval', '1h'))
-
-            self.scheduler.add_job(
-                self._check_route,
-                trigger=IntervalTrigger(**interval),
-                args=[route],
-                id=f"route_{route['origin']}_{route['destination']}",
-                name=route['name'],
-                replace_existing=True
+    def _interval_seconds(self, interval_str: str) -> float:
+        return timedelta(**self._parse_interval(interval_str)).total_seconds()
+
+    def _quota_headroom(self) -> Optional[float]:
+        """Tightest remaining budget across the metered sources."""
+        headrooms = [
+            self.quota.headroom(fetcher.source_name)['headroom']
+            for fetcher in self.aggregator.fetchers
+        ]
+        return min((h for h in headrooms if h is not None), default=None)
+
+    def _trigger(self, job_id: str, route: dict):
+        """Trigger of a route job, with runs spread across the interval by job id."""
+        cfg = self.config.get('scheduler', {})
+        jitter = cfg.get('jitter')
+        jitter = int(jitter) if jitter else None
+        stagger = cfg.get('stagger', True)
+        interval_str = route.get('check_interval', '1h')
+
+        adaptive_cfg = cfg.get('adaptive', {})
+        if route.get('adaptive', adaptive_cfg.get('enabled', False)):
+            base = self._interval_seconds(interval_str)
+            min_interval = route.get('min_interval')
+            max_interval = route.get('max_interval')
+            departure = route.get('date_range', {}).get('start')
+            history = self.history.for_route(route['origin'], route['destination'])
+            interval = AdaptiveInterval(
+                base=base,
+                min_interval=self._interval_seconds(min_interval) if min_interval else base / 4,
+                max_interval=self._interval_seconds(max_interval) if max_interval else base * 4,
+                departure=date.fromisoformat(departure) if departure else date.today(),
+                volatility=history.volatility,
+                headroom=self._quota_headroom,
+                near_days=int(adaptive_cfg.get('near_days', 7)),
+                far_days=int(adaptive_cfg.get('far_days', 60)),
+                volatile=float(adaptive_cfg.get('volatile', 0.05)),
+                flat=float(adaptive_cfg.get('flat', 0.005)),
+                low_watermark=self.quota.low_watermark,
+                critical_watermark=self.quota.critical_watermark
+            )
+            return AdaptiveTrigger(
+                interval, job_id, jitter=jitter, stagger=stagger,
+                on_interval=lambda seconds: metrics.set_gauge(f'scheduler.interval.{job_id}', seconds)
             )
-            logger.info(f"Added job: {route['name']} (every {route.get('check_interval', '1h')})")
 
-    async def _check_route(self, route: dict):
-        logger.info(f"Checking: {route['name']}")
+        interval = self._parse_interval(interval_str)
+        start_date = None
+        if stagger:
+            start_date = staggered_start(job_id, timedelta(**interval).total_seconds())
+        return IntervalTrigger(**interval, start_date=start_date, jitter=jitter)
+
+    def _pair_schedule(self, plan: PairPlan) -> dict:
+        """Scheduling settings of a pair job, as demanding as its strictest route."""
+        routes = plan.routes
+        schedule = {
+            'origin': plan.origin,
+            'destination': plan.destination,
+            'check_interval': min((r.get('check_interval', '1h') for r in routes), key=self._interval_seconds),
+            'date_range': {'start': plan.windows()[0][0].isoformat()},
+        }
+        for key in ('min_interval', 'max_interval'):
+            values = [r[key] for r in routes if r.get(key)]
+            if values:
+                schedule[key] = min(values, key=self._interval_seconds)
+        adaptive = [r['adaptive'] for r in routes if 'adaptive' in r]
+        if adaptive:
+            schedule['adaptive'] = any(adaptive)
+        return schedule
 
-        date_range = route.get('date_range', {})
-        date_start = date.fromisoformat(date_range.get('start', date.today().isoformat()))
-        date_end = date.fromisoformat(date_range.get('end', date_start.isoformat()))
+    def _add_job(self, plan: PairPlan, trigger=None):
+        if trigger is None:
+            trigger = self._trigger(plan.job_id, self._pair_schedule(plan))
+        if self.leases is not None:
+            # Due times live in route_leases, shared with the other workers
+            self.leases.add_job(plan, trigger)
+            logger.info(f"Added leased job: {plan.name} ({trigger})")
+            return
 
-        offers = await self.aggregator.fetch_all(
-            route['origin'],
-            route['destination'],
-            date_start,
-            date_end
+        job = self.scheduler.add_job(
+            self._run_check,
+            trigger=trigger,
+            args=[plan],
+            id=plan.job_id,
+            name=plan.name,
+            replace_existing=True,
+            coalesce=True,
+            misfire_grace_time=int(self.config.get('scheduler', {}).get('misfire_grace_time', 300))
         )
+        logger.info(f"Added job: {plan.name} ({job.trigger})")
 
-        if not offers:
-            logger.warning(f"{route['name']}: No flight data")
+    def _remove_job(self, job_id: str):
+        if self.leases is not None:
+            self.leases.remove_job(job_id)
+        elif self.scheduler.get_job(job_id) is not None:
+            self.scheduler.remove_job(job_id)
+        logger.info(f"Removed job: {job_id}")
+
+    def _update_job(self, plan: PairPlan):
+        """Give a job its new routes without touching its timing."""
+        if self.leases is not None:
+            _, trigger = self.leases.jobs[plan.job_id]
+            self.leases.add_job(plan, trigger)
+        else:
+            self.scheduler.modify_job(plan.job_id, args=[plan], name=plan.name)
+        logger.info(f"Updated job: {plan.name}")
+
+    def setup_jobs(self):
+        for plan in plan_routes(self.config.get('routes', [])):
+            self._add_job(plan)
+
+    async def reload(self, config: dict) -> Dict[str, List[str]]:
+        """Apply the routes of a new config, changing only the affected jobs.
+
+        Jobs of unchanged pairs keep their next run. Pairs whose routes
+        changed keep it too unless their schedule changed, in which case
+        they are rescheduled. Other sections need a restart to take effect.
+        Returns the job ids added, removed, rescheduled and updated.
+
+        Every new route is validated before any job changes, so a config
+        that raises leaves the running one untouched.
+        """
+        old = {plan.job_id: plan for plan in plan_routes(self.config.get('routes', []))}
+        new = {plan.job_id: plan for plan in plan_routes(config.get('routes', []))}
+
+        triggers = {}
+        for job_id, plan in new.items():
+            for route in plan.routes:
+                self._build_rules(route.get('alerts', []))
+            schedule = self._pair_schedule(plan)
+            if job_id not in old or (
+                plan.routes != old[job_id].routes and schedule != self._pair_schedule(old[job_id])
+            ):
+                triggers[job_id] = self._trigger(job_id, schedule)
+        lookback = self._history_lookback_days(config.get('routes', []))
+
+        ignored = sorted(
+            key for key in set(config) | set(self.config)
+            if key != 'routes' and config.get(key) != self.config.get(key)
+        )
+        if ignored:
+            logger.warning(f"Config sections {', '.join(ignored)} changed; restart to apply them")
+
+        self.config = {**self.config, 'routes': config.get('routes', [])}
+        # Never shorten it, so that history already held stays usable
+        self.history.lookback = max(self.history.lookback, timedelta(days=lookback))
+
+        changes = {'added': [], 'removed': [], 'rescheduled': [], 'updated': []}
+        for job_id in old.keys() - new.keys():
+            self._remove_job(job_id)
+            changes['removed'].append(job_id)
+        for job_id, plan in new.items():
+            if job_id not in old:
+                self._add_job(plan, triggers[job_id])
+                changes['added'].append(job_id)
+            elif plan.routes != old[job_id].routes:
+                if job_id in triggers:
+                    self._add_job(plan, triggers[job_id])
+                    changes['rescheduled'].append(job_id)
+                else:
+                    self._update_job(plan)
+                    changes['updated'].append(job_id)
+
+        if self.leases is not None and changes['added']:
+            await self.leases.setup()
+        logger.info(
+            "Config reloaded: " + ', '.join(f"{len(ids)} {kind}" for kind, ids in changes.items())
+        )
+        return changes
+
+    def _on_job_event(self, event):
+        if event.code == EVENT_JOB_SUBMITTED:
+            lag = datetime.now(timezone.utc) - max(event.scheduled_run_times)
+            metrics.observe('scheduler.job_lag', max(lag.total_seconds(), 0.0))
+        elif event.code == EVENT_JOB_MISSED:
+            metrics.inc('scheduler.misfires')
+            logger.warning(f"Job {event.job_id} missed its run at {event.scheduled_run_time}")
+        elif event.code == EVENT_JOB_MAX_INSTANCES:
+            # The previous run of this route is still going
+            metrics.inc('scheduler.overlaps')
+        elif event.code == EVENT_JOB_ERROR:
+            metrics.inc('scheduler.errors')
+
+    async def _run_check(self, plan: PairPlan):
+        """Run a scheduled check once one of the global check slots is free."""
+        if self.check_slots is None:
+            await self._check_pair(plan)
             return
 
-        best = self.aggregator.get_best_price(offers)
-        logger.info(f"{route['name']}: Best price {best.price} from {best.source}")
+        waited = time.monotonic()
+        async with self.check_slots:
+            metrics.observe('scheduler.slot_wait', time.monotonic() - waited)
+            await self._check_pair(plan)
 
-        rules = self._build_rules(route.get('alerts', []))
-        engine = AlertEngine(rules)
-        alerts = await engine.check(best, None)
+    async def _check_route(self, route: dict):
+        await self._check_pair(PairPlan(route['origin'], route['destination'], [route]))
 
-        if alerts:
-            message = AlertMessage(
-                route_name=route['name'],
-                origin=best.origin,
-                destination=best.destination,
-                departure_date=str(best.departure_date),
-                price=best.price,
-                currency=best.currency,
-                airline=best.airline,
-                rule_type=alerts[0].rule_type,
-                rule_message=alerts[0].message,
-                source=best.source
+    async def _check_pair(self, plan: PairPlan):
+        logger.info(f"Checking: {plan.name}")
+        fetch_priority.set(plan.priority)
+        checked_at = datetime.utcnow()
+        check_time.set(checked_at)
+        if self.leases is not None and self.session_factory is not None:
+            # The previous check of this pair may have run on another worker
+            try:
+                await self.history.refresh(self.session_factory, plan.origin, plan.destination)
+            except Exception as e:
+                logger.warning(f"Could not refresh price history of {plan.name}: {e}")
+
+        history = self.history.for_route(plan.origin, plan.destination)
+        checks = [
+            RouteCheck(route, AlertEngine(self._build_rules(route.get('alerts', []), history)), self.notifier_manager)
+            for route in plan.routes
+        ]
+
+        async def on_result(result: SourceResult):
+            if result.late:
+                logger.warning(f"{plan.name}: {result.source} missed the deadline")
+                return
+            # Evaluate as each source arrives so the fastest one sets alert latency
+            for check in checks:
+                await check.consider(self.aggregator.get_best_price(plan.offers_for(check.route, result.offers)))
+
+        # One fetch per disjoint window covers every route of the pair
+        fetched = await asyncio.gather(*(
+            self.aggregator.fetch_all(
+                plan.origin,
+                plan.destination,
+                date_start,
+                date_end,
+                on_result=on_result,
+                deadline=plan.deadline
             )
-            channels = await self.notifier_manager.notify_all(message)
-            logger.info(f"Notified via: {channels}")
+            for date_start, date_end in plan.windows()
+        ))
+        offers = [offer for window_offers in fetched for offer in window_offers]
+
+        if not offers:
+            logger.warning(f"{plan.name}: No flight data")
+            return
+
+        for check in checks:
+            best = self.aggregator.get_best_price(plan.offers_for(check.route, offers))
+            if best is None:
+                logger.warning(f"{check.route['name']}: No flight data")
+                continue
+            logger.info(f"{check.route['name']}: Best price {best.price} from {best.source}")
+            await check.consider(best)
+        # Only after evaluating, so the rules compare against earlier checks
+        self.history.record_offers(plan.origin, plan.destination, offers, at=checked_at)
 
     def start(self):
         self.scheduler.start()
+        if self.leases is not None:
+            self.leases.start()
 
     def stop(self):
         self.scheduler.shutdown()
+
+    async def initialize(self, daemon: bool = True):
+        """Connect persistent state before jobs start running.
+
+        Partition maintenance and distributed scheduling are set up only for
+        the long-running service (`daemon`), not for one-off commands.
+        """
+        if self.config.get('database'):
+            try:
+                self.engine, self.session_factory = await init_database(self.config)
+            except Exception as e:
+                logger.warning(f"Database unavailable, using local state only: {e}")
+
+        if self.session_factory is not None:
+            pairs = {(r['origin'], r['destination']) for r in self.config.get('routes', [])}
+            try:
+                await self.history.warm(self.session_factory, pairs)
+            except Exception as e:
+                logger.warning(f"Could not load price history: {e}")
+
+        storage_cfg = self.config.get('storage', {})
+        if self.engine is not None and daemon:
+            retention = storage_cfg.get('retention_months', 12)
+            self.partitions = PartitionManager(
+                self.engine,
+                months_ahead=int(storage_cfg.get('partitions_ahead', 3)),
+                retention_months=int(retention) if retention is not None else None
+            )
+            try:
+                await self.partitions.maintain()
+            except Exception as e:
+                logger.warning(f"Partition maintenance failed: {e}")
+            self.partitions.start()
+
+        distributed_cfg = self.config.get('distributed', {})
+        if daemon and _flag(distributed_cfg.get('enabled', False)):
+            if self.engine is None:
+                logger.warning("Distributed mode needs the database, scheduling locally")
+            else:
+                self.leases = LeaseCoordinator(
+                    self.engine,
+                    self._run_check,
+                    owner=distributed_cfg.get('worker_id') or None,
+                    lease_seconds=float(distributed_cfg.get('lease_seconds', 120)),
+                    poll_interval=float(distributed_cfg.get('poll_interval', 5)),
+                    max_concurrent=int(self.config.get('scheduler', {}).get('max_concurrent_checks') or 4)
+                )
+
+        if self.engine is not None and storage_cfg.get('enabled', True):
+            self.writer = PriceWriter.for_engine(
+                self.engine,
+                batch_size=int(storage_cfg.get('batch_size', 500)),
+                flush_interval=float(storage_cfg.get('flush_interval', 2)),
+                max_queue=int(storage_cfg.get('max_queue', 20000)),
+                change_filter=(
+                    ChangeFilter(heartbeat=float(storage_cfg.get('heartbeat', 21600)))
+                    if storage_cfg.get('dedup', False) else None
+                )
+            )
+            self.writer.start()
+
+        quota_cfg = self.config.get('quota', {})
+        stores = []
+        if self.session_factory is not None:
+            stores.append(PostgresQuotaStore(self.session_factory))
+        stores.append(FileQuotaStore(quota_cfg.get('state_file', 'state/quota.json')))
+        self.quota.stores = stores
+        await self.quota.load()
+        self.quota.start(float(quota_cfg.get('flush_interval', 60)))
+
+    async def close(self):
+        """Release long-lived resources such as pooled HTTP connections."""
+        if self.leases is not None:
+            await self.leases.close()
+        if self.writer is not None:
+            await self.writer.close()
+        if self.partitions is not None:
+            await self.partitions.close()
+        await self.quota.close()
+        for fetcher in self.aggregator.fetchers:
+            await fetcher.close()
+        await self.http_pool.aclose()
+        if self.cache is not None:
+            self.cache.close()
+        if self.engine is not None:
+            await self.engine.dispose()
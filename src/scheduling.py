@@ -0,0 +1,140 @@
+# src/scheduling.py
+import hashlib
+import logging
+import math
+from datetime import date, datetime, timedelta, timezone
+from typing import Callable, Optional
+from apscheduler.triggers.base import BaseTrigger
+
+logger = logging.getLogger(__name__)
+
+
+def stagger_offset(job_id: str, interval: float) -> float:
+    """Stable offset in [0, interval) seconds derived from the job id.
+
+    Uses a cryptographic hash rather than hash() so that every process and
+    restart spreads the same job to the same slot.
+    """
+    digest = hashlib.sha1(job_id.encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big') / 2 ** 64 * interval
+
+
+def staggered_start(job_id: str, interval: float, now: Optional[datetime] = None) -> datetime:
+    """Start date aligning a job's runs to its slot within each interval.
+
+    Runs happen at epoch + k * interval + offset; the returned start lies in
+    the current interval, so the first run comes within one interval.
+    """
+    now = now or datetime.now(timezone.utc)
+    period_start = math.floor(now.timestamp() / interval) * interval
+    return datetime.fromtimestamp(period_start + stagger_offset(job_id, interval), timezone.utc)
+
+
+class AdaptiveInterval:
+    """Check interval of one route, recomputed before every run.
+
+    The base interval is scaled by three factors: days to departure (halved
+    within `near_days`, doubled beyond `far_days`, linear in between), recent
+    price volatility (halved at `volatile`, doubled at or below `flat`) and
+    the tightest remaining API headroom (doubled below `low_watermark`,
+    quadrupled below `critical_watermark`). The result is clamped to
+    [min_interval, max_interval].
+    """
+
+    def __init__(
+        self,
+        base: float,
+        min_interval: float,
+        max_interval: float,
+        departure: date,
+        volatility: Callable[[], Optional[float]] = lambda: None,
+        headroom: Callable[[], Optional[float]] = lambda: None,
+        near_days: int = 7,
+        far_days: int = 60,
+        volatile: float = 0.05,
+        flat: float = 0.005,
+        low_watermark: float = 0.2,
+        critical_watermark: float = 0.05
+    ):
+        if min_interval > max_interval:
+            raise ValueError(f"min_interval {min_interval}s exceeds max_interval {max_interval}s")
+        self.base = base
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.departure = departure
+        self.volatility = volatility
+        self.headroom = headroom
+        self.near_days = near_days
+        self.far_days = max(far_days, near_days + 1)
+        self.volatile = volatile
+        self.flat = flat
+        self.low_watermark = low_watermark
+        self.critical_watermark = critical_watermark
+
+    def departure_factor(self, today: date) -> float:
+        days = (self.departure - today).days
+        if days <= self.near_days:
+            return 0.5
+        if days >= self.far_days:
+            return 2.0
+        return 0.5 + 1.5 * (days - self.near_days) / (self.far_days - self.near_days)
+
+    def volatility_factor(self) -> float:
+        volatility = self.volatility()
+        if volatility is None:
+            return 1.0
+        if volatility >= self.volatile:
+            return 0.5
+        if volatility <= self.flat:
+            return 2.0
+        return 1.0
+
+    def quota_factor(self) -> float:
+        headroom = self.headroom()
+        if headroom is None or headroom >= self.low_watermark:
+            return 1.0
+        return 4.0 if headroom < self.critical_watermark else 2.0
+
+    def seconds(self, now: datetime) -> float:
+        scaled = (
+            self.base
+            * self.departure_factor(now.date())
+            * self.volatility_factor()
+            * self.quota_factor()
+        )
+        return min(max(scaled, self.min_interval), self.max_interval)
+
+
+class AdaptiveTrigger(BaseTrigger):
+    """APScheduler trigger firing at an AdaptiveInterval after the last run.
+
+    The first run is staggered by job id like the fixed interval jobs.
+    """
+
+    def __init__(
+        self,
+        interval: AdaptiveInterval,
+        job_id: str,
+        jitter: Optional[int] = None,
+        stagger: bool = True,
+        on_interval: Optional[Callable[[float], None]] = None
+    ):
+        self.interval = interval
+        self.job_id = job_id
+        self.jitter = jitter
+        self.stagger = stagger
+        self.on_interval = on_interval
+
+    def get_next_fire_time(self, previous_fire_time, now):
+        seconds = self.interval.seconds(now)
+        if self.on_interval is not None:
+            self.on_interval(seconds)
+        if previous_fire_time is None:
+            delay = stagger_offset(self.job_id, seconds) if self.stagger else seconds
+            next_fire_time = now + timedelta(seconds=delay)
+        else:
+            next_fire_time = previous_fire_time + timedelta(seconds=seconds)
+        return self._apply_jitter(next_fire_time, self.jitter, now)
+
+    def __str__(self):
+        return f"adaptive[{self.interval.min_interval:g}s-{self.interval.max_interval:g}s]"
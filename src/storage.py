@@ -0,0 +1,438 @@
+# src/storage.py
+import asyncio
+import logging
+import time
+from contextvars import ContextVar
+from datetime import date, datetime, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+from sqlalchemy import case, func, insert, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from src.database import PriceDaily, PriceRecord
+from src.fetchers.base import BaseFetcher, FetcherWrapper
+from src.metrics import Metrics, metrics as default_metrics
+from src.models import FlightOffer
+
+logger = logging.getLogger(__name__)
+
+# Queued by flush() to write a partial batch without waiting out the interval
+_FLUSH = object()
+
+# Start of the route check running in the current task. Every source's
+# offers of one check share it as fetched_at, so the rollup's last price is
+# the cheapest of the check rather than of whichever source was written last.
+check_time: ContextVar[Optional[datetime]] = ContextVar('check_time', default=None)
+
+PRICE_COLUMNS = (
+    'origin', 'destination', 'departure_date', 'source', 'airline',
+    'price', 'currency', 'flight_number', 'stops', 'fetched_at', 'available',
+)
+
+# (source, queried origin, queried destination, date_start, date_end)
+FetchScope = Tuple[str, str, str, date, date]
+
+
+def offer_to_record(offer: FlightOffer, fetched_at: datetime) -> tuple:
+    """Row for price_records, in PRICE_COLUMNS order."""
+    return (
+        offer.origin, offer.destination, offer.departure_date, offer.source,
+        offer.airline[:50], offer.price, offer.currency,
+        offer.flight_number[:20], offer.stops, fetched_at, True,
+    )
+
+
+def record_key(record: tuple) -> tuple:
+    """(origin, destination, departure_date, source, airline, flight_number)"""
+    return record[0], record[1], record[2], record[3], record[4], record[7]
+
+
+class ChangeFilter:
+    """Last-seen index that keeps only observations worth storing.
+
+    A flight (route, departure date, source, airline and flight number) is
+    written when its price or stops change, when it reappears, and at least
+    every `heartbeat` seconds. A flight missing from a later fetch of the
+    same source and route window is written once more with available=false,
+    but only when that fetch returned other flights on its departure date;
+    sources that sample or cap their results leave other dates unsearched.
+    Stored rows therefore describe a step function: each
+    value holds until that flight's next row. When a fetch lists a flight
+    more than once, only its cheapest fare is tracked.
+    """
+
+    def __init__(self, heartbeat: float = 21600):
+        self.heartbeat = timedelta(seconds=heartbeat)
+        # key -> (price, stops, available, currency, written_at)
+        self._last: Dict[tuple, tuple] = {}
+        self._scopes: Dict[Tuple[str, str, str], Set[tuple]] = {}
+        self._pruned_on: Optional[date] = None
+
+    def __len__(self) -> int:
+        return len(self._last)
+
+    def filter(self, records: List[tuple], scope: Optional[FetchScope] = None) -> List[tuple]:
+        """Return the records to store, plus availability-loss markers."""
+        if not records:
+            return []
+        now = records[0][9]
+        if self._pruned_on != now.date():
+            self.prune(now.date())
+
+        cheapest: Dict[tuple, tuple] = {}
+        for record in records:
+            key = record_key(record)
+            if key not in cheapest or record[5] < cheapest[key][5]:
+                cheapest[key] = record
+
+        stored = []
+        for key, record in cheapest.items():
+            last = self._last.get(key)
+            if (last is None or not last[2] or last[0] != record[5] or last[1] != record[8]
+                    or now - last[4] >= self.heartbeat):
+                stored.append(record)
+                self._last[key] = (record[5], record[8], True, record[6], now)
+
+        if scope is not None:
+            source, origin, destination, date_start, date_end = scope
+            seen = self._scopes.setdefault((source, origin, destination), set())
+            returned = {key[2] for key in cheapest}
+            for key in seen - cheapest.keys():
+                last = self._last.get(key)
+                if last is None or not last[2] or key[2] not in returned or not date_start <= key[2] <= date_end:
+                    continue
+                price, stops, _, currency, _ = last
+                stored.append((key[0], key[1], key[2], key[3], key[4], price, currency, key[5], stops, now, False))
+                self._last[key] = (price, stops, False, currency, now)
+            seen.update(cheapest.keys())
+        return stored
+
+    def prune(self, today: date):
+        """Forget flights whose departure date has passed."""
+        self._pruned_on = today
+        for key in [k for k in self._last if k[2] < today]:
+            del self._last[key]
+        for keys in self._scopes.values():
+            keys.difference_update([k for k in keys if k[2] < today])
+
+
+def rollup_records(rows: List[tuple]) -> List[dict]:
+    """Aggregate a batch into price_daily rows, skipping unpriced offers."""
+    groups: Dict[tuple, dict] = {}
+    for origin, destination, departure_date, _, _, price, _, _, _, fetched_at, available in rows:
+        if not available or price <= 0:
+            continue
+        key = (origin, destination, departure_date, fetched_at.date())
+        group = groups.get(key)
+        if group is None:
+            groups[key] = {
+                'origin': origin, 'destination': destination,
+                'departure_date': departure_date, 'fetch_day': fetched_at.date(),
+                'min_price': price, 'max_price': price, 'sum_price': price, 'count': 1,
+                'last_price': price, 'last_fetched_at': fetched_at,
+            }
+            continue
+        group['min_price'] = min(group['min_price'], price)
+        group['max_price'] = max(group['max_price'], price)
+        group['sum_price'] += price
+        group['count'] += 1
+        if fetched_at > group['last_fetched_at']:
+            group['last_price'], group['last_fetched_at'] = price, fetched_at
+        elif fetched_at == group['last_fetched_at']:
+            # Offers of one fetch share a timestamp; keep the cheapest as "last"
+            group['last_price'] = min(group['last_price'], price)
+    return list(groups.values())
+
+
+def rollup_upsert():
+    """INSERT .. ON CONFLICT statement merging batch rollups into price_daily."""
+    table = PriceDaily.__table__
+    stmt = pg_insert(table)
+    excluded = stmt.excluded
+    newer = excluded.last_fetched_at > table.c.last_fetched_at
+    same = excluded.last_fetched_at == table.c.last_fetched_at
+    return stmt.on_conflict_do_update(
+        index_elements=[table.c.origin, table.c.destination, table.c.departure_date, table.c.fetch_day],
+        set_={
+            'min_price': func.least(table.c.min_price, excluded.min_price),
+            'max_price': func.greatest(table.c.max_price, excluded.max_price),
+            'sum_price': table.c.sum_price + excluded.sum_price,
+            'count': table.c.count + excluded.count,
+            # Sources of one check share a timestamp; keep their cheapest
+            'last_price': case(
+                (newer, excluded.last_price),
+                (same, func.least(table.c.last_price, excluded.last_price)),
+                else_=table.c.last_price
+            ),
+            'last_fetched_at': func.greatest(table.c.last_fetched_at, excluded.last_fetched_at),
+        }
+    )
+
+
+async def copy_price_records(engine, rows: List[tuple], observed: Optional[List[tuple]] = None):
+    """Bulk-load rows and update the daily rollups in one transaction.
+
+    Rollups are computed from `observed`, every offer seen including those
+    a ChangeFilter kept out of `rows`. Uses COPY, or a multi-row INSERT on
+    drivers other than asyncpg.
+    """
+    async with engine.connect() as conn:
+        rollup = rollup_records(rows if observed is None else observed)
+        # Runs first so that the COPY below joins the transaction it opens
+        if rollup:
+            await conn.execute(rollup_upsert(), rollup)
+        if rows:
+            raw = await conn.get_raw_connection()
+            driver = raw.driver_connection
+            if hasattr(driver, 'copy_records_to_table'):
+                await driver.copy_records_to_table('price_records', records=rows, columns=PRICE_COLUMNS)
+            else:
+                await conn.execute(
+                    insert(PriceRecord.__table__),
+                    [dict(zip(PRICE_COLUMNS, row)) for row in rows]
+                )
+        await conn.commit()
+
+
+async def daily_lows(session_factory, origin: str, destination: str, days: int, today: Optional[date] = None) -> List[dict]:
+    """Price summary per fetch day over the last `days` days, from price_daily."""
+    today = today or datetime.utcnow().date()
+    stmt = (
+        select(
+            PriceDaily.fetch_day,
+            func.min(PriceDaily.min_price),
+            func.max(PriceDaily.max_price),
+            func.sum(PriceDaily.sum_price),
+            func.sum(PriceDaily.count),
+        )
+        .where(
+            PriceDaily.origin == origin,
+            PriceDaily.destination == destination,
+            PriceDaily.fetch_day > today - timedelta(days=days)
+        )
+        .group_by(PriceDaily.fetch_day)
+        .order_by(PriceDaily.fetch_day)
+    )
+    async with session_factory() as session:
+        rows = (await session.execute(stmt)).all()
+    return [
+        {'day': day, 'min': low, 'max': high, 'avg': total / count, 'count': count}
+        for day, low, high, total, count in rows
+    ]
+
+
+async def price_steps(
+    session_factory,
+    origin: str,
+    destination: str,
+    departure_date: date,
+    since: datetime,
+    until: Optional[datetime] = None
+) -> List[dict]:
+    """Per-flight price history of one departure date as a step function.
+
+    Each row of price_records holds until the same flight's next row, so
+    this works the same whether or not change-only storage is enabled.
+    Returns intervals overlapping [since, until], with price None while the
+    flight was unavailable; `valid_until` is None for the current value.
+    """
+    until = until or datetime.utcnow()
+    flight = (PriceRecord.source, PriceRecord.airline, PriceRecord.flight_number)
+    valid_until = func.lead(PriceRecord.fetched_at).over(partition_by=flight, order_by=PriceRecord.fetched_at)
+    steps = (
+        select(*flight, PriceRecord.price, PriceRecord.available,
+               PriceRecord.fetched_at, valid_until.label('valid_until'))
+        .where(
+            PriceRecord.origin == origin,
+            PriceRecord.destination == destination,
+            PriceRecord.departure_date == departure_date,
+            PriceRecord.fetched_at <= until
+        )
+        .subquery()
+    )
+    stmt = (
+        select(steps)
+        .where((steps.c.valid_until.is_(None)) | (steps.c.valid_until > since))
+        .order_by(steps.c.fetched_at)
+    )
+    async with session_factory() as session:
+        rows = (await session.execute(stmt)).all()
+    return [
+        {
+            'source': source, 'airline': airline, 'flight_number': flight_number,
+            'price': price if available else None,
+            'valid_from': fetched_at, 'valid_until': valid_to,
+        }
+        for source, airline, flight_number, price, available, fetched_at, valid_to in rows
+    ]
+
+
+class PriceWriter:
+    """Write-behind pipeline persisting every fetched offer.
+
+    Offers are queued as rows on a bounded queue; `put` waits while the queue
+    is full so that a slow database throttles producers instead of growing
+    memory. A background task writes batches of up to `batch_size` rows,
+    or whatever has queued once `flush_interval` seconds have passed.
+
+    With a `change_filter`, only changed prices are stored, while the sink
+    still receives every observation for the rollups.
+    """
+
+    def __init__(
+        self,
+        sink: Callable[[List[tuple], List[tuple]], Awaitable[None]],
+        batch_size: int = 500,
+        flush_interval: float = 2.0,
+        max_queue: int = 20000,
+        max_retries: int = 3,
+        retry_backoff: float = 1.0,
+        change_filter: Optional[ChangeFilter] = None,
+        metrics: Optional[Metrics] = None
+    ):
+        self.sink = sink
+        self.change_filter = change_filter
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.metrics = metrics or default_metrics
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self._task: Optional[asyncio.Task] = None
+
+    @classmethod
+    def for_engine(cls, engine, **kwargs) -> 'PriceWriter':
+        async def sink(rows: List[tuple], observed: List[tuple]):
+            await copy_price_records(engine, rows, observed)
+        return cls(sink, **kwargs)
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    async def put(
+        self,
+        offers: List[FlightOffer],
+        fetched_at: Optional[datetime] = None,
+        scope: Optional[FetchScope] = None
+    ):
+        """Queue offers for writing, waiting while the queue is full.
+
+        `scope` describes the fetch the offers came from, so that the change
+        filter can tell when a flight is no longer offered.
+        """
+        fetched_at = fetched_at or check_time.get() or datetime.utcnow()
+        records = [offer_to_record(offer, fetched_at) for offer in offers]
+        if self.change_filter is None:
+            items = [(record, True) for record in records]
+        else:
+            stored = self.change_filter.filter(records, scope)
+            kept = {id(record) for record in stored}
+            # Availability-loss markers are extra rows, not observations
+            markers = [record for record in stored if not record[-1]]
+            items = [(record, id(record) in kept) for record in records]
+            items.extend((record, True) for record in markers)
+            self.metrics.inc('writer.skipped', len(records) - (len(stored) - len(markers)))
+
+        for item in items:
+            try:
+                self._queue.put_nowait(item)
+            except asyncio.QueueFull:
+                self.metrics.inc('writer.backpressure')
+                await self._queue.put(item)
+        self.metrics.set_gauge('writer.queue_depth', self._queue.qsize())
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._run())
+
+    async def _next_batch(self) -> List[tuple]:
+        batch = []
+        deadline = None
+        while len(batch) < self.batch_size:
+            try:
+                record = self._queue.get_nowait()
+            except asyncio.QueueEmpty:
+                if not batch:
+                    record = await self._queue.get()
+                else:
+                    if deadline is None:
+                        deadline = time.monotonic() + self.flush_interval
+                    timeout = deadline - time.monotonic()
+                    if timeout <= 0:
+                        break
+                    try:
+                        record = await asyncio.wait_for(self._queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+
+            if record is _FLUSH:
+                self._queue.task_done()
+                if batch:
+                    break
+                continue
+            batch.append(record)
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._next_batch()
+            try:
+                await self._write([record for record, store in batch if store], [record for record, _ in batch])
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _write(self, batch: List[tuple], observed: List[tuple]):
+        for attempt in range(self.max_retries + 1):
+            started = time.monotonic()
+            try:
+                await self.sink(batch, observed)
+            except Exception as e:
+                if attempt == self.max_retries:
+                    logger.error(f"Dropping {len(batch)} price records after {attempt + 1} failed writes: {e}")
+                    self.metrics.inc('writer.dropped', len(batch))
+                    return
+                delay = self.retry_backoff * (2 ** attempt)
+                logger.warning(f"Price record write failed, retrying in {delay:.1f}s: {e}")
+                await asyncio.sleep(delay)
+                continue
+
+            self.metrics.inc('writer.rows', len(batch))
+            self.metrics.observe('writer.batch_seconds', time.monotonic() - started)
+            return
+
+    async def flush(self):
+        """Wait until every queued offer has been written (or dropped)."""
+        if self._task is None or self._task.done():
+            self.start()
+        await self._queue.put(_FLUSH)
+        await self._queue.join()
+
+    async def close(self):
+        await self.flush()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+class RecordingFetcher(FetcherWrapper):
+    """Hands every freshly fetched offer, with its fetch scope, to a recorder."""
+
+    def __init__(self, fetcher: BaseFetcher, record: Callable[[List[FlightOffer], FetchScope], Awaitable[None]]):
+        super().__init__(fetcher)
+        self.record = record
+
+    async def fetch(
+        self,
+        origin: str,
+        destination: str,
+        date_start: date,
+        date_end: date
+    ) -> List[FlightOffer]:
+        offers = await self.fetcher.fetch(origin, destination, date_start, date_end)
+        if offers:
+            await self.record(offers, (self.source_name, origin, destination, date_start, date_end))
+        return offers
@@ -0,0 +1,237 @@
+# src/workers.py
+import asyncio
+import bisect
+import hashlib
+import logging
+import multiprocessing
+import os
+import queue
+import signal
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from src.config import load_config
+from src.metrics import merge_snapshots, metrics
+from src.planner import pair_job_id
+
+logger = logging.getLogger(__name__)
+
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.sha1(key.encode('utf-8')).digest()[:8], 'big')
+
+
+class HashRing:
+    """Consistent hash ring mapping keys to worker indexes.
+
+    Each worker owns `replicas` points on the ring, so growing from N to N+1
+    workers moves only about 1/(N+1) of the keys.
+    """
+
+    def __init__(self, workers: int, replicas: int = 64):
+        if workers < 1:
+            raise ValueError(f"Need at least one worker, got {workers}")
+        points = sorted(
+            (_hash(f"worker-{worker}#{replica}"), worker)
+            for worker in range(workers)
+            for replica in range(replicas)
+        )
+        self._hashes = [point for point, _ in points]
+        self._workers = [worker for _, worker in points]
+
+    def worker_for(self, key: str) -> int:
+        index = bisect.bisect(self._hashes, _hash(key)) % len(self._hashes)
+        return self._workers[index]
+
+
+def shard_routes(routes: List[dict], workers: int) -> List[List[dict]]:
+    """Split routes over workers, keeping each city pair on one worker."""
+    ring = HashRing(workers)
+    shards: List[List[dict]] = [[] for _ in range(workers)]
+    for route in routes:
+        shards[ring.worker_for(pair_job_id(route['origin'], route['destination']))].append(route)
+    return shards
+
+
+def worker_config(config: dict, index: int, workers: int) -> dict:
+    """Config of one worker: its shard of routes, its share of the quota."""
+    config = dict(config)
+    config['routes'] = shard_routes(config.get('routes', []), workers)[index]
+    config['quota'] = {**config.get('quota', {}), 'share': 1 / workers}
+    cache = config.get('cache', {})
+    if cache.get('disk_path'):
+        path = Path(cache['disk_path'])
+        config['cache'] = {**cache, 'disk_path': str(path.with_name(f"{path.stem}.worker{index}{path.suffix}"))}
+    return config
+
+
+def _run_worker(config_path: str, index: int, workers: int, reports, report_interval: float):
+    """Entry point of a worker process."""
+    # Forked children inherit the supervisor's handlers
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.default_int_handler)
+    signal.signal(signal.SIGHUP, signal.SIG_IGN)
+    config = worker_config(load_config(config_path), index, workers)
+    logger.info(f"Worker {index} starting with {len(config['routes'])} routes")
+    asyncio.run(_serve(config, config_path, index, workers, reports, report_interval))
+
+
+async def _serve(config: dict, config_path: str, index: int, workers: int, reports, report_interval: float):
+    from src.main import monitor
+
+    task = asyncio.ensure_future(monitor(
+        config, config_path, load=lambda path: worker_config(load_config(path), index, workers)
+    ))
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(signum, task.cancel)
+
+    while not task.done():
+        await asyncio.wait({task}, timeout=report_interval)
+        reports.put((index, metrics.snapshot()))
+    if not task.cancelled() and task.exception() is not None:
+        raise task.exception()
+
+
+class Supervisor:
+    """Runs the monitor in `workers` forked processes.
+
+    Routes are sharded over the workers by consistent hashing of their city
+    pair; each worker runs its own event loop, HTTP pools and scheduler. A
+    worker that exits is restarted after `restart_delay` seconds, doubling
+    for workers that keep crashing within `restart_window`. Workers report
+    metric snapshots every `report_interval` seconds, which are merged and
+    logged.
+    """
+
+    def __init__(
+        self,
+        config_path: str,
+        workers: int,
+        report_interval: float = 30,
+        restart_delay: float = 1,
+        restart_window: float = 60,
+        max_restart_delay: float = 60
+    ):
+        self.config_path = config_path
+        self.workers = workers
+        self.report_interval = report_interval
+        self.restart_delay = restart_delay
+        self.restart_window = restart_window
+        self.max_restart_delay = max_restart_delay
+        methods = multiprocessing.get_all_start_methods()
+        self.context = multiprocessing.get_context('fork' if 'fork' in methods else 'spawn')
+        self.reports = self.context.Queue()
+        self.processes: Dict[int, multiprocessing.Process] = {}
+        self.snapshots: Dict[int, dict] = {}
+        # Counters and summaries of workers that have since been restarted
+        self._retired: dict = {}
+        self.restarts: Dict[int, int] = {}
+        self._started_at: Dict[int, float] = {}
+        self._restart_at: Dict[int, float] = {}
+        self._stopping = False
+
+    def spawn(self, index: int):
+        process = self.context.Process(
+            target=_run_worker,
+            args=(self.config_path, index, self.workers, self.reports, self.report_interval),
+            name=f"flight-monitor-worker-{index}",
+            daemon=False
+        )
+        process.start()
+        self.processes[index] = process
+        self._started_at[index] = time.monotonic()
+        logger.info(f"Started worker {index} (pid {process.pid})")
+
+    def check_workers(self, now: Optional[float] = None):
+        """Schedule restarts for exited workers and start those that are due."""
+        now = time.monotonic() if now is None else now
+        for index, process in list(self.processes.items()):
+            if process.is_alive() or index in self._restart_at:
+                continue
+            crashes = self.restarts.get(index, 0)
+            if now - self._started_at.get(index, now) > self.restart_window:
+                crashes = 0
+            snapshot = self.snapshots.pop(index, None)
+            if snapshot is not None:
+                self._retired = merge_snapshots([self._retired, {**snapshot, 'gauges': {}}])
+            delay = min(self.restart_delay * 2 ** crashes, self.max_restart_delay)
+            self.restarts[index] = crashes + 1
+            self._restart_at[index] = now + delay
+            metrics.inc('supervisor.restarts')
+            logger.warning(f"Worker {index} exited with code {process.exitcode}, restarting in {delay:g}s")
+
+        for index, due in list(self._restart_at.items()):
+            if due <= now and not self._stopping:
+                del self._restart_at[index]
+                self.spawn(index)
+
+    def collect(self, timeout: float = 0) -> bool:
+        """Read pending metric reports; returns whether any arrived."""
+        received = False
+        while True:
+            try:
+                index, snapshot = self.reports.get(timeout=timeout)
+            except queue.Empty:
+                return received
+            self.snapshots[index] = snapshot
+            received = True
+            timeout = 0
+
+    def aggregate(self) -> dict:
+        return merge_snapshots([self._retired, *self.snapshots.values()])
+
+    def _log_metrics(self):
+        counters = self.aggregate()['counters']
+        if counters:
+            summary = ', '.join(f"{name}={value:g}" for name, value in sorted(counters.items()))
+            logger.info(f"Metrics across {len(self.snapshots)} workers: {summary}")
+
+    def reload(self):
+        """Have every worker reload its share of the config."""
+        for index, process in self.processes.items():
+            if process.is_alive():
+                os.kill(process.pid, signal.SIGHUP)
+
+    def run(self):
+        """Start the workers and supervise them until SIGTERM or SIGINT.
+
+        SIGHUP is passed on to the workers, which reload the config.
+        """
+        def stop(signum, frame):
+            self._stopping = True
+
+        previous = {signum: signal.signal(signum, stop) for signum in (signal.SIGTERM, signal.SIGINT)}
+        previous[signal.SIGHUP] = signal.signal(signal.SIGHUP, lambda signum, frame: self.reload())
+        try:
+            for index in range(self.workers):
+                self.spawn(index)
+            last_report = time.monotonic()
+            while not self._stopping:
+                self.collect(timeout=1)
+                self.check_workers()
+                if time.monotonic() - last_report >= self.report_interval:
+                    self._log_metrics()
+                    last_report = time.monotonic()
+        finally:
+            self.shutdown()
+            for signum, handler in previous.items():
+                signal.signal(signum, handler)
+
+    def shutdown(self, timeout: float = 30):
+        """Ask every worker to stop, killing those that do not within `timeout`."""
+        self._stopping = True
+        for process in self.processes.values():
+            if process.is_alive():
+                process.terminate()
+        deadline = time.monotonic() + timeout
+        for index, process in self.processes.items():
+            process.join(max(0, deadline - time.monotonic()))
+            if process.is_alive():
+                logger.warning(f"Worker {index} did not stop, killing it")
+                process.kill()
+                process.join()
+        self.collect()
+        self._log_metrics()
+        logger.info("All workers stopped")
@@ -1,10 +1,12 @@
 # tests/test_aggregator.py
+import asyncio
 import pytest
-from datetime import date
+from datetime import date, timedelta
 from decimal import Decimal
 from unittest.mock import AsyncMock
-from src.fetchers.aggregator import PriceAggregator
+from src.fetchers.aggregator import PriceAggregator, subtract_ranges
 from src.fetchers.base import BaseFetcher
+from src.metrics import Metrics
 from src.models import FlightOffer
 
 class MockFetcher(BaseFetcher):
@@ -56,3 +58,102 @@ def test_aggregator_get_best_price():
     best = aggregator.get_best_price([offer1, offer2])
 
     assert best.price == Decimal("750")
+
+
+class SlowFetcher(MockFetcher):
+    def __init__(self, name: str):
+        super().__init__(name, [])
+        self.requests = []
+
+    async def fetch(self, origin, destination, date_start, date_end):
+        self.requests.append((date_start, date_end))
+        await asyncio.sleep(0.02)
+        days = (date_end - date_start).days + 1
+        return [
+            FlightOffer(origin, destination, date_start + timedelta(days=i), Decimal("800"), "CNY", "", "", 0, self._name)
+            for i in range(days)
+        ]
+
+
+@pytest.mark.asyncio
+async def test_aggregator_coalesces_identical_inflight_requests():
+    fetcher = SlowFetcher("slow")
+    aggregator = PriceAggregator([fetcher], metrics=Metrics())
+
+    first, second = await asyncio.gather(
+        aggregator.fetch_all("XMN", "SIN", date(2026, 2, 1), date(2026, 2, 10)),
+        aggregator.fetch_all("XMN", "SIN", date(2026, 2, 1), date(2026, 2, 10)),
+    )
+
+    assert len(fetcher.requests) == 1
+    assert len(first) == len(second) == 10
+    assert aggregator.coalescing_hit_rate == 0.5
+
+
+@pytest.mark.asyncio
+async def test_aggregator_fetches_only_uncovered_part_of_overlap():
+    fetcher = SlowFetcher("slow")
+    aggregator = PriceAggregator([fetcher], metrics=Metrics())
+
+    _, second = await asyncio.gather(
+        aggregator.fetch_all("XMN", "SIN", date(2026, 2, 1), date(2026, 2, 10)),
+        aggregator.fetch_all("XMN", "SIN", date(2026, 2, 5), date(2026, 2, 15)),
+    )
+
+    assert fetcher.requests == [
+        (date(2026, 2, 1), date(2026, 2, 10)),
+        (date(2026, 2, 11), date(2026, 2, 15)),
+    ]
+    assert sorted(o.departure_date for o in second) == [date(2026, 2, d) for d in range(5, 16)]
+    assert aggregator._inflight == {}
+
+
+def test_subtract_ranges():
+    window = (date(2026, 2, 1), date(2026, 2, 28))
+    covered = [(date(2026, 2, 5), date(2026, 2, 10)), (date(2026, 2, 20), date(2026, 3, 5))]
+
+    assert subtract_ranges(window, covered) == [
+        (date(2026, 2, 1), date(2026, 2, 4)),
+        (date(2026, 2, 11), date(2026, 2, 19)),
+    ]
+
+
+class DelayedFetcher(MockFetcher):
+    def __init__(self, name: str, offers: list, delay: float):
+        super().__init__(name, offers)
+        self.delay = delay
+
+    async def fetch(self, origin, destination, date_start, date_end):
+        await asyncio.sleep(self.delay)
+        return self._offers
+
+
+@pytest.mark.asyncio
+async def test_fetch_iter_yields_sources_in_completion_order():
+    fast = DelayedFetcher("fast", [FlightOffer("XMN", "SIN", date(2026, 2, 15), Decimal("900"), "CNY", "", "", 0, "fast")], 0)
+    slow = DelayedFetcher("slow", [FlightOffer("XMN", "SIN", date(2026, 2, 15), Decimal("800"), "CNY", "", "", 0, "slow")], 0.03)
+
+    aggregator = PriceAggregator([slow, fast], metrics=Metrics())
+    results = [r async for r in aggregator.fetch_iter("XMN", "SIN", date(2026, 2, 15), date(2026, 2, 15))]
+
+    assert [r.source for r in results] == ["fast", "slow"]
+    assert not any(r.late for r in results)
+
+
+@pytest.mark.asyncio
+async def test_fetch_all_returns_partial_results_after_deadline():
+    fast = DelayedFetcher("fast", [FlightOffer("XMN", "SIN", date(2026, 2, 15), Decimal("900"), "CNY", "", "", 0, "fast")], 0)
+    slow = DelayedFetcher("slow", [], 5)
+    seen = []
+
+    async def on_result(result):
+        seen.append((result.source, result.late))
+
+    aggregator = PriceAggregator([fast, slow], metrics=Metrics())
+    offers = await aggregator.fetch_all(
+        "XMN", "SIN", date(2026, 2, 15), date(2026, 2, 15), on_result=on_result, deadline=0.05
+    )
+
+    assert len(offers) == 1
+    assert seen == [("fast", False), ("slow", True)]
+    assert aggregator.metrics.counters["aggregator.late.slow"] == 1
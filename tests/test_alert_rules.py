@@ -67,3 +67,18 @@ async def test_historical_low_rule_not_triggers():
     result = await rule.evaluate(offer, None)
 
     assert result.triggered is False
+
+@pytest.mark.asyncio
+async def test_rules_read_route_history(sample_offer):
+    from src.analyzers.history import PriceHistoryCache
+    history = PriceHistoryCache(lookback_days=7)
+    history.record("XMN", "SIN", date(2026, 2, 15), Decimal("900"))
+    history.record("XMN", "SIN", date(2026, 2, 15), Decimal("1000"))
+    route = history.for_route("XMN", "SIN")
+
+    drop = await DropPercentRule(percent=15, history=route).evaluate(sample_offer, None)
+    low = await HistoricalLowRule(lookback_days=7, history=route).evaluate(sample_offer, None)
+
+    assert drop.triggered is True  # 1000 -> 750
+    assert low.triggered is True   # 750 < 900
+    assert low.threshold_value == Decimal("900")
@@ -0,0 +1,156 @@
+import pytest
+from datetime import date
+from decimal import Decimal
+from src.fetchers.base import BaseFetcher
+from src.fetchers.cache import ResponseCache, contiguous_ranges
+from src.models import FlightOffer
+
+
+class RecordingFetcher(BaseFetcher):
+    def __init__(self):
+        self.requests = []
+
+    @property
+    def source_name(self) -> str:
+        return "mock"
+
+    async def fetch(self, origin, destination, date_start, date_end):
+        self.requests.append((date_start, date_end))
+        return [
+            FlightOffer(origin, destination, date(2026, 2, day), Decimal("800"), "CNY", "MF", "MF851", 0, "mock")
+            for day in range(date_start.day, date_end.day + 1)
+        ]
+
+    def is_available(self) -> bool:
+        return True
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_contiguous_ranges():
+    days = [date(2026, 2, 5), date(2026, 2, 1), date(2026, 2, 2), date(2026, 2, 4)]
+    assert contiguous_ranges(days) == [
+        (date(2026, 2, 1), date(2026, 2, 2)),
+        (date(2026, 2, 4), date(2026, 2, 5)),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_cached_fetcher_fetches_only_missing_dates():
+    inner = RecordingFetcher()
+    fetcher = ResponseCache().wrap(inner)
+
+    first = await fetcher.fetch("XMN", "SIN", date(2026, 2, 1), date(2026, 2, 10))
+    second = await fetcher.fetch("XMN", "SIN", date(2026, 2, 5), date(2026, 2, 15))
+
+    assert len(first) == 10
+    assert len(second) == 11
+    assert inner.requests == [
+        (date(2026, 2, 1), date(2026, 2, 10)),
+        (date(2026, 2, 11), date(2026, 2, 15)),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_cache_entries_expire_after_source_ttl():
+    clock = Clock()
+    inner = RecordingFetcher()
+    fetcher = ResponseCache(ttls={"mock": 60}, clock=clock).wrap(inner)
+
+    await fetcher.fetch("XMN", "SIN", date(2026, 2, 1), date(2026, 2, 1))
+    clock.now += 59
+    await fetcher.fetch("XMN", "SIN", date(2026, 2, 1), date(2026, 2, 1))
+    clock.now += 2
+    await fetcher.fetch("XMN", "SIN", date(2026, 2, 1), date(2026, 2, 1))
+
+    assert len(inner.requests) == 2
+
+
+@pytest.mark.asyncio
+async def test_memory_tier_is_bounded():
+    cache = ResponseCache(max_entries=3)
+    fetcher = cache.wrap(RecordingFetcher())
+
+    await fetcher.fetch("XMN", "SIN", date(2026, 2, 1), date(2026, 2, 5))
+
+    assert len(cache._memory) == 3
+
+
+@pytest.mark.asyncio
+async def test_disk_tier_survives_restart(tmp_path):
+    path = tmp_path / "cache.sqlite"
+    first = ResponseCache(disk_path=str(path))
+    await first.wrap(RecordingFetcher()).fetch("XMN", "SIN", date(2026, 2, 1), date(2026, 2, 3))
+    first.close()
+
+    inner = RecordingFetcher()
+    second = ResponseCache(disk_path=str(path))
+    offers = await second.wrap(inner).fetch("XMN", "SIN", date(2026, 2, 1), date(2026, 2, 3))
+    second.close()
+
+    assert inner.requests == []
+    assert len(offers) == 3
+    assert offers[0].price == Decimal("800")
+
+
+class SamplingFetcher(RecordingFetcher):
+    """Searches every third day, like Amadeus outside calendar mode."""
+
+    def searched_dates(self, date_start, date_end):
+        return [date(2026, 2, day) for day in range(date_start.day, date_end.day + 1, 3)]
+
+    async def fetch(self, origin, destination, date_start, date_end):
+        self.requests.append((date_start, date_end))
+        return [
+            FlightOffer(origin, destination, day, Decimal("800"), "CNY", "MF", "MF851", 0, "mock")
+            for day in self.searched_dates(date_start, date_end)
+        ]
+
+
+class CappedFetcher(RecordingFetcher):
+    """Returns only the first few days, like a source with a result cap."""
+
+    def searched_dates(self, date_start, date_end):
+        return None
+
+    async def fetch(self, origin, destination, date_start, date_end):
+        self.requests.append((date_start, date_end))
+        return [
+            FlightOffer(origin, destination, date(2026, 2, day), Decimal("800"), "CNY", "MF", "MF851", 0, "mock")
+            for day in range(date_start.day, min(date_end.day, date_start.day + 2) + 1)
+        ]
+
+
+@pytest.mark.asyncio
+async def test_unsearched_days_of_sampling_sources_are_not_cached():
+    inner = SamplingFetcher()
+    fetcher = ResponseCache().wrap(inner)
+
+    await fetcher.fetch("XMN", "SIN", date(2026, 2, 1), date(2026, 2, 28))
+    overlap = await fetcher.fetch("XMN", "SIN", date(2026, 2, 11), date(2026, 2, 20))
+
+    assert len(inner.requests) > 1
+    assert {offer.departure_date.day for offer in overlap} == {11, 14, 17, 20}
+
+
+@pytest.mark.asyncio
+async def test_capped_sources_reuse_the_cache_only_when_every_day_is_cached():
+    inner = CappedFetcher()
+    fetcher = ResponseCache().wrap(inner)
+
+    await fetcher.fetch("XMN", "SIN", date(2026, 2, 1), date(2026, 2, 10))
+    hit = await fetcher.fetch("XMN", "SIN", date(2026, 2, 1), date(2026, 2, 3))
+    wider = await fetcher.fetch("XMN", "SIN", date(2026, 2, 2), date(2026, 2, 5))
+
+    assert len(hit) == 3
+    assert len(wider) == 3
+    assert inner.requests == [
+        (date(2026, 2, 1), date(2026, 2, 10)),
+        (date(2026, 2, 2), date(2026, 2, 5)),
+    ]
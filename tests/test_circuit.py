@@ -0,0 +1,152 @@
+import asyncio
+import pytest
+from datetime import date
+from src.fetchers.aggregator import PriceAggregator
+from src.fetchers.base import BaseFetcher
+from src.fetchers.circuit import (
+    CircuitBreaker, CircuitBreakerFetcher, CircuitOpenError, CLOSED, OPEN, HALF_OPEN
+)
+from src.metrics import Metrics
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FlakyFetcher(BaseFetcher):
+    def __init__(self, fail: bool = True, delays=None):
+        self.fail = fail
+        self.delays = list(delays or [])
+        self.calls = 0
+
+    @property
+    def source_name(self) -> str:
+        return "flaky"
+
+    async def fetch(self, origin, destination, date_start, date_end):
+        self.calls += 1
+        if self.delays:
+            await asyncio.sleep(self.delays.pop(0))
+        if self.fail:
+            raise ConnectionError("upstream down")
+        return []
+
+    def is_available(self) -> bool:
+        return True
+
+
+def test_breaker_opens_on_error_rate_and_recovers():
+    clock = Clock()
+    breaker = CircuitBreaker(min_calls=4, error_rate=0.5, open_seconds=30, clock=clock)
+    for ok in (True, False, True, False):
+        breaker.record_success(0.1) if ok else breaker.record_failure(0.1)
+    assert breaker.state == OPEN
+    assert breaker.allow_request() is False
+
+    clock.now = 31
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow_request() is True
+    assert breaker.allow_request() is False  # Only one trial call
+    breaker.record_success(0.1)
+    assert breaker.state == CLOSED
+
+
+def test_breaker_opens_on_latency_percentile():
+    breaker = CircuitBreaker(min_calls=3, latency_threshold=5.0, latency_percentile=0.9)
+    breaker.record_success(0.2)
+    breaker.record_success(0.3)
+    breaker.record_success(12.0)
+    assert breaker.state == OPEN
+
+
+@pytest.mark.asyncio
+async def test_open_circuit_fails_fast_and_is_skipped_by_aggregator():
+    inner = FlakyFetcher()
+    fetcher = CircuitBreakerFetcher(inner, CircuitBreaker(min_calls=2), metrics=Metrics())
+
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            await fetcher.fetch("XMN", "SIN", date(2026, 2, 1), date(2026, 2, 2))
+    with pytest.raises(CircuitOpenError):
+        await fetcher.fetch("XMN", "SIN", date(2026, 2, 1), date(2026, 2, 2))
+    assert inner.calls == 2
+
+    aggregator = PriceAggregator([fetcher], metrics=Metrics())
+    results = [r async for r in aggregator.fetch_iter("XMN", "SIN", date(2026, 2, 1), date(2026, 2, 2))]
+    assert results == []
+    assert inner.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_timeout_counts_as_failure():
+    inner = FlakyFetcher(fail=False, delays=[1.0])
+    fetcher = CircuitBreakerFetcher(inner, CircuitBreaker(min_calls=1), timeout=0.01, metrics=Metrics())
+
+    with pytest.raises(asyncio.TimeoutError):
+        await fetcher.fetch("XMN", "SIN", date(2026, 2, 1), date(2026, 2, 2))
+    assert fetcher.breaker.state == OPEN
+
+
+@pytest.mark.asyncio
+async def test_hedged_request_wins_over_slow_primary():
+    inner = FlakyFetcher(fail=False, delays=[1.0, 0.0])
+    metrics = Metrics()
+    fetcher = CircuitBreakerFetcher(inner, hedge=True, hedge_delay=0.01, timeout=2, metrics=metrics)
+
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    assert await fetcher.fetch("XMN", "SIN", date(2026, 2, 1), date(2026, 2, 2)) == []
+
+    assert loop.time() - started < 0.5
+    assert inner.calls == 2
+    assert metrics.counters["circuit.hedged.flaky"] == 1
+
+
+@pytest.mark.asyncio
+async def test_upstream_errors_from_real_fetchers_open_the_circuit():
+    import httpx
+    from unittest.mock import AsyncMock, MagicMock
+    from src.fetchers.aviationstack import AviationStackFetcher
+    from src.fetchers.kiwi import KiwiFetcher
+
+    client = MagicMock()
+    client.get = AsyncMock(side_effect=httpx.ConnectError("connection refused"))
+    kiwi = CircuitBreakerFetcher(
+        KiwiFetcher(api_key="key", client=client, batch_window=0), CircuitBreaker(min_calls=2), metrics=Metrics()
+    )
+    for _ in range(2):
+        with pytest.raises(httpx.ConnectError):
+            await kiwi.fetch("XMN", "SIN", date(2026, 2, 1), date(2026, 2, 2))
+    assert kiwi.breaker.state == OPEN
+
+    request = httpx.Request("GET", AviationStackFetcher.BASE_URL)
+    client = MagicMock()
+    client.get = AsyncMock(return_value=httpx.Response(503, request=request))
+    aviationstack = CircuitBreakerFetcher(
+        AviationStackFetcher(api_key="key", client=client), CircuitBreaker(min_calls=2), metrics=Metrics()
+    )
+    for _ in range(2):
+        with pytest.raises(httpx.HTTPStatusError):
+            await aviationstack.fetch("XMN", "SIN", date(2026, 2, 1), date(2026, 2, 2))
+    assert aviationstack.breaker.state == OPEN
+
+
+@pytest.mark.asyncio
+async def test_client_errors_do_not_count_against_the_circuit():
+    import httpx
+    from unittest.mock import AsyncMock, MagicMock
+    from src.fetchers.aviationstack import AviationStackFetcher
+
+    request = httpx.Request("GET", AviationStackFetcher.BASE_URL)
+    client = MagicMock()
+    client.get = AsyncMock(return_value=httpx.Response(401, request=request))
+    fetcher = CircuitBreakerFetcher(
+        AviationStackFetcher(api_key="key", client=client), CircuitBreaker(min_calls=2), metrics=Metrics()
+    )
+    for _ in range(2):
+        assert await fetcher.fetch("XMN", "SIN", date(2026, 2, 1), date(2026, 2, 2)) == []
+    assert fetcher.breaker.state == CLOSED
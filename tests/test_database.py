@@ -31,3 +31,12 @@ def test_alert_log_model():
         notified_via=["console", "wechat"]
     )
     assert log.trigger_type == "threshold"
+
+def test_price_daily_average():
+    from src.database import PriceDaily
+    row = PriceDaily(
+        origin="XMN", destination="SIN", departure_date=date(2026, 2, 15),
+        fetch_day=date(2026, 1, 1), min_price=Decimal("700.00"), max_price=Decimal("900.00"),
+        sum_price=Decimal("2400.00"), count=3, last_price=Decimal("800.00")
+    )
+    assert row.avg_price == Decimal("800")
@@ -0,0 +1,38 @@
+# tests/test_decode.py
+import json
+import threading
+import pytest
+from decimal import Decimal
+from src.fetchers.decode import JsonDecoder
+from src.metrics import Metrics
+
+def test_json_backend_keeps_exact_decimals():
+    decoder = JsonDecoder(backend="json")
+    data = decoder.loads(b'{"price": 799.10, "count": 3}')
+    assert data["price"] == Decimal("799.10")
+    assert str(data["price"]) == "799.10"
+    assert data["count"] == 3
+
+def test_unknown_backend_rejected():
+    with pytest.raises(ValueError):
+        JsonDecoder(backend="simdjson")
+
+@pytest.mark.asyncio
+async def test_small_payload_parsed_inline():
+    decoder = JsonDecoder(offload_threshold=1024)
+    thread = await decoder.parse(b'{"data": []}', lambda data: threading.current_thread())
+    assert thread is threading.current_thread()
+
+@pytest.mark.asyncio
+async def test_large_payload_parsed_off_loop():
+    metrics = Metrics()
+    decoder = JsonDecoder(backend="json", offload_threshold=1024, metrics=metrics)
+    content = json.dumps({"data": [{"price": 100.5}] * 200}).encode()
+
+    thread, total = await decoder.parse(
+        content, lambda data: (threading.current_thread(), sum(item["price"] for item in data["data"]))
+    )
+
+    assert thread is not threading.current_thread()
+    assert total == Decimal("20100.0")
+    assert metrics.counters["decode.offloaded"] == 1
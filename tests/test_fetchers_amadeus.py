@@ -1,6 +1,8 @@
 # tests/test_fetchers_amadeus.py
+import asyncio
+import json
 import pytest
-from datetime import date
+from datetime import date, timedelta
 from decimal import Decimal
 from unittest.mock import AsyncMock, patch, MagicMock
 from src.fetchers.amadeus import AmadeusFetcher
@@ -116,3 +118,215 @@ async def test_amadeus_fetcher_returns_empty_without_credentials():
         date_end=date(2026, 2, 28)
     )
     assert offers == []
+
+
+def _mock_response(status_code: int, payload: dict = None, headers: dict = None):
+    response = MagicMock()
+    response.status_code = status_code
+    response.headers = headers or {}
+    response.content = json.dumps(payload or {}).encode()
+    response.json.return_value = payload or {}
+    return response
+
+
+@pytest.mark.asyncio
+async def test_amadeus_fetcher_searches_dates_concurrently():
+    client = MagicMock()
+    in_flight = 0
+    peak = 0
+
+    async def fake_get(url, params=None, headers=None, timeout=None):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return _mock_response(200, {"data": []})
+
+    client.get = fake_get
+    fetcher = AmadeusFetcher(
+        client_id="test_id", client_secret="test_secret",
+        client=client, max_concurrency=3, rate_limit=100
+    )
+    fetcher._get_access_token = AsyncMock(return_value="token")
+
+    await fetcher.fetch("XMN", "SIN", date(2026, 2, 1), date(2026, 2, 28))
+
+    assert peak == 3
+
+
+@pytest.mark.asyncio
+async def test_amadeus_fetcher_retries_only_rate_limited_date():
+    client = MagicMock()
+    calls = []
+
+    async def fake_get(url, params=None, headers=None, timeout=None):
+        calls.append(params["departureDate"])
+        if params["departureDate"] == "2026-02-04" and calls.count("2026-02-04") == 1:
+            return _mock_response(429, headers={"Retry-After": "0"})
+        return _mock_response(200, {"data": []})
+
+    client.get = fake_get
+    fetcher = AmadeusFetcher(
+        client_id="test_id", client_secret="test_secret",
+        client=client, rate_limit=100
+    )
+    fetcher._get_access_token = AsyncMock(return_value="token")
+
+    await fetcher.fetch("XMN", "SIN", date(2026, 2, 1), date(2026, 2, 7))
+
+    assert calls.count("2026-02-04") == 2
+    assert calls.count("2026-02-01") == 1
+    assert calls.count("2026-02-07") == 1
+
+
+@pytest.mark.asyncio
+async def test_amadeus_token_refresh_is_single_flight():
+    client = MagicMock()
+
+    async def fake_post(url, data=None, headers=None, timeout=None):
+        await asyncio.sleep(0.01)
+        return _mock_response(200, {"access_token": "abc", "expires_in": 1799})
+
+    client.post = AsyncMock(side_effect=fake_post)
+    fetcher = AmadeusFetcher(client_id="test_id", client_secret="test_secret", client=client)
+
+    tokens = await asyncio.gather(*[fetcher._get_access_token(client) for _ in range(20)])
+
+    assert tokens == ["abc"] * 20
+    assert client.post.await_count == 1
+    await fetcher.close()
+
+
+@pytest.mark.asyncio
+async def test_amadeus_token_refreshed_in_background_before_expiry():
+    client = MagicMock()
+    issued = iter(["first", "second", "third", "fourth"])
+
+    async def fake_post(url, data=None, headers=None, timeout=None):
+        return _mock_response(200, {"access_token": next(issued), "expires_in": 0.1})
+
+    client.post = AsyncMock(side_effect=fake_post)
+    fetcher = AmadeusFetcher(client_id="test_id", client_secret="test_secret", client=client)
+
+    assert await fetcher._get_access_token(client) == "first"
+    await asyncio.sleep(0.08)
+
+    # A lifetime below TOKEN_REFRESH_MARGIN refreshes at half-life, not in a loop
+    assert fetcher._access_token == "second"
+    assert client.post.await_count == 2
+    await fetcher.close()
+    assert fetcher._refresh_task is None
+
+
+@pytest.mark.asyncio
+async def test_amadeus_calendar_mode_searches_cheapest_days():
+    client = MagicMock()
+    searched = []
+    calendar = {"data": [
+        {"departureDate": "2026-02-10", "price": {"total": "500.00"}},
+        {"departureDate": "2026-02-03", "price": {"total": "300.00"}},
+        {"departureDate": "2026-02-20", "price": {"total": "400.00"}},
+        {"departureDate": "2026-03-02", "price": {"total": "100.00"}},
+    ]}
+
+    async def fake_get(url, params=None, headers=None, timeout=None):
+        if url == AmadeusFetcher.DATES_URL:
+            return _mock_response(200, calendar)
+        searched.append(params["departureDate"])
+        return _mock_response(200, {"data": []})
+
+    client.get = fake_get
+    fetcher = AmadeusFetcher(
+        client_id="test_id", client_secret="test_secret",
+        client=client, rate_limit=100, calendar=True, calendar_top_n=2
+    )
+    fetcher._get_access_token = AsyncMock(return_value="token")
+
+    await fetcher.fetch("XMN", "SIN", date(2026, 2, 1), date(2026, 2, 28))
+
+    assert sorted(searched) == ["2026-02-03", "2026-02-20"]
+    assert fetcher.estimate_calls(date(2026, 2, 1), date(2026, 2, 28)) == 3
+
+
+@pytest.mark.asyncio
+async def test_amadeus_calendar_mode_falls_back_to_sampling():
+    client = MagicMock()
+    searched = []
+
+    async def fake_get(url, params=None, headers=None, timeout=None):
+        if url == AmadeusFetcher.DATES_URL:
+            return _mock_response(500, {})
+        searched.append(params["departureDate"])
+        return _mock_response(200, {"data": []})
+
+    client.get = fake_get
+    fetcher = AmadeusFetcher(
+        client_id="test_id", client_secret="test_secret",
+        client=client, rate_limit=100, calendar=True
+    )
+    fetcher._get_access_token = AsyncMock(return_value="token")
+
+    await fetcher.fetch("XMN", "SIN", date(2026, 2, 1), date(2026, 2, 7))
+
+    assert searched == ["2026-02-01", "2026-02-04", "2026-02-07"]
+
+
+@pytest.mark.asyncio
+async def test_amadeus_server_error_fails_the_fetch():
+    import httpx
+    client = MagicMock()
+
+    async def fake_get(url, params=None, headers=None, timeout=None):
+        if params["departureDate"] == "2026-02-04":
+            return httpx.Response(502, request=httpx.Request("GET", url))
+        return _mock_response(200, {"data": []})
+
+    client.get = fake_get
+    fetcher = AmadeusFetcher(
+        client_id="test_id", client_secret="test_secret",
+        client=client, rate_limit=100
+    )
+    fetcher._get_access_token = AsyncMock(return_value="token")
+
+    with pytest.raises(httpx.HTTPStatusError):
+        await fetcher.fetch("XMN", "SIN", date(2026, 2, 1), date(2026, 2, 7))
+
+
+@pytest.mark.asyncio
+async def test_amadeus_calendar_fallback_is_charged_to_the_quota():
+    from datetime import datetime, timezone
+    from src.fetchers.quota import QuotaManager
+
+    async def fetch_with_daily_quota(daily: int):
+        client = MagicMock()
+        searched = []
+
+        async def fake_get(url, params=None, headers=None, timeout=None):
+            if url == AmadeusFetcher.DATES_URL:
+                return _mock_response(500, {})
+            searched.append(params["departureDate"])
+            return _mock_response(200, {"data": []})
+
+        client.get = fake_get
+        manager = QuotaManager(
+            {"amadeus": {"daily": daily, "per_second": None}},
+            clock=lambda: datetime(2026, 2, 1, 12, 0, tzinfo=timezone.utc)
+        )
+        fetcher = AmadeusFetcher(
+            client_id="test_id", client_secret="test_secret",
+            client=client, rate_limit=100, calendar=True, calendar_top_n=3
+        )
+        fetcher._get_access_token = AsyncMock(return_value="token")
+        await manager.wrap(fetcher).fetch("XMN", "SIN", date(2026, 2, 1), date(2026, 2, 28))
+        return searched, manager.headroom("amadeus")["used_today"]
+
+    # The calendar lookup and three searches were charged up front; the
+    # fallback samples ten dates
+    searched, used = await fetch_with_daily_quota(100)
+    assert (len(searched), used) == (10, 11)
+
+    # Without budget for the rest, only the charged searches run
+    searched, used = await fetch_with_daily_quota(6)
+    assert searched == ["2026-02-01", "2026-02-04", "2026-02-07"]
+    assert used == 4
@@ -1,8 +1,9 @@
 # tests/test_fetchers_aviationstack.py
+import json
 import pytest
 from datetime import date
 from decimal import Decimal
-from unittest.mock import AsyncMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 from src.fetchers.aviationstack import AviationStackFetcher
 
 
@@ -120,7 +121,7 @@ async def test_aviationstack_fetcher_handles_api_error():
 
         mock_http_response = AsyncMock()
         mock_http_response.raise_for_status = AsyncMock()
-        mock_http_response.json.return_value = mock_response
+        mock_http_response.content = json.dumps(mock_response).encode()
         mock_instance.get.return_value = mock_http_response
 
         offers = await fetcher.fetch(
@@ -131,3 +132,93 @@ async def test_aviationstack_fetcher_handles_api_error():
         )
 
         assert offers == []
+
+
+def _page(offset: int, total: int, day: int = 15):
+    return {
+        "pagination": {"limit": 100, "offset": offset, "count": 1, "total": total},
+        "data": [{
+            "flight": {"number": str(offset)},
+            "airline": {"name": "Airline"},
+            "departure": {"iata": "XMN", "scheduled": f"2026-02-{day:02d}T10:30:00+00:00"},
+            "arrival": {"iata": "SIN", "scheduled": f"2026-02-{day:02d}T14:30:00+00:00"},
+        }],
+    }
+
+
+@pytest.mark.asyncio
+async def test_aviationstack_fetcher_reads_all_pages():
+    client = MagicMock()
+    offsets = []
+
+    async def fake_get(url, params=None, timeout=None):
+        offsets.append(params["offset"])
+        response = MagicMock()
+        response.content = json.dumps(_page(params["offset"], total=350)).encode()
+        return response
+
+    client.get = fake_get
+    fetcher = AviationStackFetcher(api_key="test_key", client=client)
+    offers = await fetcher.fetch("XMN", "SIN", date(2026, 2, 1), date(2026, 2, 28))
+
+    assert sorted(offsets) == [0, 100, 200, 300]
+    assert sorted(o.flight_number for o in offers) == ["0", "100", "200", "300"]
+
+
+@pytest.mark.asyncio
+async def test_aviationstack_fetcher_caps_pages_and_filters_server_side():
+    client = MagicMock()
+    calls = []
+
+    async def fake_get(url, params=None, timeout=None):
+        calls.append(params)
+        response = MagicMock()
+        response.content = json.dumps(_page(params["offset"], total=1000)).encode()
+        return response
+
+    client.get = fake_get
+    fetcher = AviationStackFetcher(api_key="test_key", client=client, max_pages=2, server_date_filter=True)
+    await fetcher.fetch("XMN", "SIN", date(2026, 2, 15), date(2026, 2, 15))
+
+    assert len(calls) == 2
+    assert all(c["flight_date"] == "2026-02-15" for c in calls)
+
+
+@pytest.mark.asyncio
+async def test_aviationstack_extra_pages_are_charged_to_the_quota():
+    from datetime import datetime, timezone
+    from src.fetchers.quota import QuotaManager
+
+    client = MagicMock()
+    offsets = []
+
+    async def fake_get(url, params=None, timeout=None):
+        offsets.append(params["offset"])
+        response = MagicMock()
+        response.content = json.dumps(_page(params["offset"], total=350)).encode()
+        return response
+
+    client.get = fake_get
+    manager = QuotaManager(
+        {"aviationstack": {"daily": 3, "per_second": None}},
+        clock=lambda: datetime(2026, 2, 1, 12, 0, tzinfo=timezone.utc)
+    )
+    fetcher = manager.wrap(AviationStackFetcher(api_key="test_key", client=client, max_concurrency=1))
+    offers = await fetcher.fetch("XMN", "SIN", date(2026, 2, 1), date(2026, 2, 28))
+
+    # One call for the first page plus the two extra pages the budget allows
+    assert len(offsets) == 3
+    assert len(offers) == 3
+    assert manager.headroom("aviationstack")["used_today"] == 3
+
+
+def test_aviationstack_parse_batch_skips_rows_the_batch_rejects():
+    from src.offer_batch import OfferBatchBuilder
+    fetcher = AviationStackFetcher(api_key="test_key")
+    batch = OfferBatchBuilder()
+    batch.append("XMN", "SIN", date(2026, 2, 15), Decimal("120"), "USD", "MF", "MF851", 0, "kiwi")
+
+    # AviationStack rows are CNY, which cannot join a USD batch
+    fetcher._parse_batch(_page(0, total=1), date(2026, 2, 1), date(2026, 2, 28), batch)
+
+    assert len(batch) == 1
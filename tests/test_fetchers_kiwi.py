@@ -1,8 +1,10 @@
 # tests/test_fetchers_kiwi.py
+import asyncio
+import json
 import pytest
 from datetime import date
 from decimal import Decimal
-from unittest.mock import AsyncMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 from src.fetchers.kiwi import KiwiFetcher
 
 def test_kiwi_fetcher_source_name():
@@ -36,3 +38,147 @@ async def test_kiwi_fetcher_parse_response():
     assert len(offers) == 1
     assert offers[0].price == Decimal("799")
     assert offers[0].source == "kiwi"
+
+
+def _kiwi_item(fly_from, fly_to, price):
+    return {
+        "flyFrom": fly_from,
+        "flyTo": fly_to,
+        "local_departure": "2026-02-15T10:00:00.000Z",
+        "price": price,
+        "airlines": ["MF"],
+        "route": [{"flight_no": "MF851"}],
+    }
+
+
+def _kiwi_client(items):
+    """Client answering each search with the items it asked for."""
+    client = MagicMock()
+
+    async def fake_get(url, params=None, headers=None, timeout=None):
+        origins, destinations = params["fly_from"].split(","), params["fly_to"].split(",")
+        response = MagicMock()
+        response.content = json.dumps({"data": [
+            item for item in items
+            if item["flyFrom"] in origins and item["flyTo"] in destinations
+        ][:params["limit"]]}).encode()
+        return response
+
+    client.get = AsyncMock(side_effect=fake_get)
+    return client
+
+
+@pytest.mark.asyncio
+async def test_kiwi_fetch_batch_demultiplexes_routes():
+    client = _kiwi_client([
+        _kiwi_item("XMN", "SIN", 799),
+        _kiwi_item("XMN", "BKK", 500),
+        _kiwi_item("CAN", "BKK", 650),
+        _kiwi_item("CAN", "SIN", 450),  # Not requested
+    ])
+
+    fetcher = KiwiFetcher(api_key="test_key", client=client)
+    window = (date(2026, 2, 1), date(2026, 2, 28))
+    q1 = ("XMN", "SIN", *window)
+    q2 = ("XMN", "BKK", *window)
+    q3 = ("CAN", "BKK", *window)
+
+    results = await fetcher.fetch_batch([q1, q2, q3])
+
+    # Each request shares one hub, so CAN-SIN is never asked for
+    requested = sorted((c.kwargs["params"]["fly_from"], c.kwargs["params"]["fly_to"]) for c in client.get.call_args_list)
+    assert requested == [("CAN", "BKK"), ("XMN", "BKK,SIN")]
+    assert [o.price for o in results[q1]] == [Decimal("799")]
+    assert [o.price for o in results[q2]] == [Decimal("500")]
+    assert [o.price for o in results[q3]] == [Decimal("650")]
+
+
+@pytest.mark.asyncio
+async def test_kiwi_concurrent_fetches_share_one_request():
+    client = _kiwi_client([_kiwi_item("XMN", "SIN", 799), _kiwi_item("XMN", "BKK", 650)])
+
+    fetcher = KiwiFetcher(api_key="test_key", client=client, batch_window=0.01)
+    first, second = await asyncio.gather(
+        fetcher.fetch("XMN", "SIN", date(2026, 2, 1), date(2026, 2, 28)),
+        fetcher.fetch("XMN", "BKK", date(2026, 2, 1), date(2026, 2, 28)),
+    )
+
+    assert client.get.await_count == 1
+    assert first[0].destination == "SIN"
+    assert second[0].destination == "BKK"
+
+
+@pytest.mark.asyncio
+async def test_kiwi_refetches_routes_starved_by_the_shared_limit():
+    cheap = [_kiwi_item("XMN", "SIN", 300 + i) for i in range(KiwiFetcher.LIMIT_PER_ROUTE * 2)]
+    client = _kiwi_client(cheap + [_kiwi_item("XMN", "BKK", 900)])
+
+    fetcher = KiwiFetcher(api_key="test_key", client=client)
+    window = (date(2026, 2, 1), date(2026, 2, 28))
+    singapore = ("XMN", "SIN", *window)
+    bangkok = ("XMN", "BKK", *window)
+
+    results = await fetcher.fetch_batch([singapore, bangkok])
+
+    assert client.get.await_count == 2
+    assert client.get.call_args.kwargs["params"]["fly_to"] == "BKK"
+    assert [o.price for o in results[bangkok]] == [Decimal("900")]
+    assert len(results[singapore]) == KiwiFetcher.LIMIT_PER_ROUTE * 2
+
+
+@pytest.mark.asyncio
+async def test_kiwi_batches_respect_max_size_and_window():
+    client = MagicMock()
+    response = MagicMock()
+    response.content = json.dumps({"data": []}).encode()
+    client.get = AsyncMock(return_value=response)
+
+    fetcher = KiwiFetcher(api_key="test_key", client=client, max_batch_size=2)
+    feb = (date(2026, 2, 1), date(2026, 2, 28))
+    mar = (date(2026, 3, 1), date(2026, 3, 31))
+    await fetcher.fetch_batch([
+        ("XMN", "SIN", *feb), ("CAN", "SIN", *feb), ("PEK", "SIN", *feb), ("XMN", "SIN", *mar),
+    ])
+
+    assert client.get.await_count == 3
+
+def test_kiwi_fetcher_parse_batch():
+    from src.offer_batch import OfferBatchBuilder
+    fetcher = KiwiFetcher(api_key="test_key")
+
+    mock_response = {
+        "data": [
+            {"flyFrom": "XMN", "flyTo": "SIN", "local_departure": "2026-02-15T10:00:00.000Z",
+             "price": 799, "airlines": ["MF"], "route": [{"flight_no": "MF851"}]},
+            {"flyFrom": "XMN", "flyTo": "SIN", "local_departure": "2026-02-16T10:00:00.000Z",
+             "price": 650.5, "airlines": ["TR"], "route": [{"flight_no": "TR1"}, {"flight_no": "TR2"}]},
+        ]
+    }
+
+    batch = fetcher._parse_batch(mock_response, date(2026, 2, 15), OfferBatchBuilder()).build()
+    assert len(batch) == 2
+    assert batch.best().price == Decimal("650.50")
+    assert list(batch.stops) == [0, 1]
+
+
+@pytest.mark.asyncio
+async def test_kiwi_batch_maps_city_code_routes_back_by_city():
+    client = MagicMock()
+    response = MagicMock()
+    response.content = json.dumps({"data": [
+        {**_kiwi_item("PKX", "SIN", 1200), "cityCodeFrom": "BJS", "cityCodeTo": "SIN"},
+        {**_kiwi_item("XMN", "SIN", 650), "cityCodeFrom": "XMN", "cityCodeTo": "SIN"},
+        {**_kiwi_item("PEK", "SIN", 900), "cityCodeFrom": "BJS", "cityCodeTo": "SIN"},
+    ]}).encode()
+    client.get = AsyncMock(return_value=response)
+
+    fetcher = KiwiFetcher(api_key="test_key", client=client)
+    window = (date(2026, 2, 1), date(2026, 2, 28))
+    beijing = ("BJS", "SIN", *window)
+    xiamen = ("XMN", "SIN", *window)
+
+    results = await fetcher.fetch_batch([beijing, xiamen])
+
+    client.get.assert_awaited_once()
+    assert [o.origin for o in results[beijing]] == ["PKX", "PEK"]
+    assert [o.price for o in results[xiamen]] == [Decimal("650")]
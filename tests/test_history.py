@@ -0,0 +1,154 @@
+# tests/test_history.py
+import pytest
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from unittest.mock import AsyncMock, MagicMock
+from src.analyzers.history import PriceHistoryCache
+from src.models import FlightOffer
+
+DEP = date(2026, 2, 15)
+
+class Clock:
+    def __init__(self):
+        self.now = datetime(2026, 1, 1, 8, 0)
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, **kwargs):
+        self.now += timedelta(**kwargs)
+
+def make_offer(price: str, day: date = DEP, source: str = "kiwi") -> FlightOffer:
+    return FlightOffer(
+        origin="XMN", destination="SIN", departure_date=day, price=Decimal(price),
+        currency="CNY", airline="MF", flight_number="MF851", stops=0, source=source
+    )
+
+def test_history_tracks_last_price_and_rolling_low():
+    clock = Clock()
+    history = PriceHistoryCache(lookback_days=7, clock=clock)
+
+    for price in ["900", "700", "800"]:
+        history.record("XMN", "SIN", DEP, Decimal(price))
+        clock.advance(days=1)
+
+    assert history.last_price("XMN", "SIN", DEP) == Decimal("800")
+    assert history.low("XMN", "SIN", DEP) == Decimal("700")
+    # Within the last day only the 800 observation remains
+    assert history.low("XMN", "SIN", DEP, lookback_days=1) == Decimal("800")
+    assert history.low("XMN", "SIN", date(2026, 2, 16)) is None
+
+def test_history_low_expires_after_lookback():
+    clock = Clock()
+    history = PriceHistoryCache(lookback_days=3, clock=clock)
+    history.record("XMN", "SIN", DEP, Decimal("500"))
+    clock.advance(days=2)
+    history.record("XMN", "SIN", DEP, Decimal("900"))
+    assert history.low("XMN", "SIN", DEP) == Decimal("500")
+
+    clock.advance(days=2)
+    assert history.low("XMN", "SIN", DEP) == Decimal("900")
+    # The deque never holds entries dominated by a later, cheaper price
+    history.record("XMN", "SIN", DEP, Decimal("400"))
+    assert len(history._lows[("XMN", "SIN", DEP)]) == 1
+
+def test_history_records_cheapest_priced_offer_per_date():
+    clock = Clock()
+    history = PriceHistoryCache(clock=clock)
+    history.record_offers("XMN", "SIN", [
+        make_offer("799"), make_offer("650", source="amadeus"), make_offer("0", source="aviationstack"),
+        make_offer("900", day=date(2026, 2, 16)),
+    ])
+
+    assert history.last_price("XMN", "SIN", DEP) == Decimal("650")
+    assert history.last_price("XMN", "SIN", date(2026, 2, 16)) == Decimal("900")
+
+def test_history_averages_price_moves_per_route():
+    clock = Clock()
+    history = PriceHistoryCache(clock=clock)
+    history.record_offers("XMN", "SIN", [make_offer("800")])
+    assert history.volatility("XMN", "SIN") is None
+
+    history.record_offers("XMN", "SIN", [make_offer("880")])
+    assert history.volatility("XMN", "SIN") == pytest.approx(0.1)
+    history.record_offers("XMN", "SIN", [make_offer("880")])
+    assert history.volatility("XMN", "SIN") == pytest.approx(0.07)
+    assert history.for_route("XMN", "SIN").volatility() == pytest.approx(0.07)
+
+def test_history_prunes_departed_dates():
+    clock = Clock()
+    history = PriceHistoryCache(clock=clock)
+    history.record("XMN", "SIN", date(2026, 1, 2), Decimal("500"))
+    history.record("XMN", "SIN", DEP, Decimal("700"))
+
+    history.prune(date(2026, 1, 3))
+    assert len(history) == 1
+    assert history.last_price("XMN", "SIN", date(2026, 1, 2)) is None
+
+@pytest.mark.asyncio
+async def test_history_warms_from_daily_rollup():
+    clock = Clock()
+    history = PriceHistoryCache(lookback_days=7, clock=clock)
+    result = MagicMock()
+    two_days_ago = clock.now - timedelta(days=2)
+    yesterday = clock.now - timedelta(days=1)
+    result.all.return_value = [
+        ("XMN", "SIN", DEP, two_days_ago.date(), Decimal("600"), two_days_ago, Decimal("650")),
+        ("XMN", "SIN", DEP, yesterday.date(), Decimal("700"), yesterday, Decimal("750")),
+    ]
+    session = MagicMock()
+    session.execute = AsyncMock(return_value=result)
+    session_factory = MagicMock()
+    session_factory.return_value.__aenter__.return_value = session
+
+    await history.warm(session_factory, [("XMN", "SIN")])
+
+    session.execute.assert_awaited_once()
+    assert history.last_price("XMN", "SIN", DEP) == Decimal("750")
+    assert history.low("XMN", "SIN", DEP) == Decimal("600")
+    assert history.low("XMN", "SIN", DEP, lookback_days=1) == Decimal("750")
+
+@pytest.mark.asyncio
+async def test_history_refresh_replaces_pair_with_rollups():
+    clock = Clock()
+    history = PriceHistoryCache(lookback_days=7, clock=clock)
+    history.record("XMN", "SIN", DEP, Decimal("900"), clock.now - timedelta(days=3))
+    history.record("XMN", "KUL", DEP, Decimal("400"))
+    yesterday = clock.now - timedelta(days=1)
+    result = MagicMock()
+    # Checked on another worker since this one last saw the pair
+    result.all.return_value = [
+        ("XMN", "SIN", DEP, yesterday.date(), Decimal("700"), yesterday, Decimal("720")),
+    ]
+    session = MagicMock()
+    session.execute = AsyncMock(return_value=result)
+    session_factory = MagicMock()
+    session_factory.return_value.__aenter__.return_value = session
+
+    await history.refresh(session_factory, "XMN", "SIN")
+
+    assert history.last_price("XMN", "SIN", DEP) == Decimal("720")
+    assert history.low("XMN", "SIN", DEP) == Decimal("700")
+    assert history.last_price("XMN", "KUL", DEP) == Decimal("400")
+
+@pytest.mark.asyncio
+async def test_history_refresh_keeps_prices_not_yet_flushed():
+    clock = Clock()
+    history = PriceHistoryCache(lookback_days=7, clock=clock)
+    yesterday = clock.now - timedelta(days=1)
+    history.record("XMN", "SIN", DEP, Decimal("720"), yesterday)
+    # Recorded by this worker's last check, still in the write-behind queue
+    history.record("XMN", "SIN", DEP, Decimal("680"), clock.now)
+    result = MagicMock()
+    result.all.return_value = [
+        ("XMN", "SIN", DEP, yesterday.date(), Decimal("700"), yesterday, Decimal("720")),
+    ]
+    session = MagicMock()
+    session.execute = AsyncMock(return_value=result)
+    session_factory = MagicMock()
+    session_factory.return_value.__aenter__.return_value = session
+
+    await history.refresh(session_factory, "XMN", "SIN")
+
+    assert history.last_price("XMN", "SIN", DEP) == Decimal("680")
+    assert history.low("XMN", "SIN", DEP) == Decimal("680")
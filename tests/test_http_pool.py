@@ -0,0 +1,58 @@
+import pytest
+import httpx
+from datetime import date
+from unittest.mock import AsyncMock, MagicMock
+from src.http_pool import HttpClientPool, borrow_client
+from src.fetchers.kiwi import KiwiFetcher
+
+
+def test_pool_reuses_client_per_host():
+    pool = HttpClientPool()
+    a = pool.client_for("https://api.tequila.kiwi.com/v2/search")
+    b = pool.client_for("https://api.tequila.kiwi.com/other")
+    c = pool.client_for("https://test.api.amadeus.com/v2/shopping/flight-offers")
+
+    assert a is b
+    assert a is not c
+
+
+def test_pool_applies_configured_limits():
+    pool = HttpClientPool({'max_connections': 5, 'max_keepalive_connections': 2})
+    assert pool.limits.max_connections == 5
+    assert pool.limits.max_keepalive_connections == 2
+
+
+@pytest.mark.asyncio
+async def test_pool_aclose_closes_clients():
+    pool = HttpClientPool()
+    client = pool.client_for("https://example.com")
+    await pool.aclose()
+
+    assert client.is_closed
+    # A new client is created after shutdown instead of reusing a closed one
+    assert pool.client_for("https://example.com") is not client
+    await pool.aclose()
+
+
+@pytest.mark.asyncio
+async def test_borrow_client_yields_injected_client():
+    shared = httpx.AsyncClient()
+    async with borrow_client(shared) as client:
+        assert client is shared
+    # Borrowing must not close the shared client
+    assert not shared.is_closed
+    await shared.aclose()
+
+
+@pytest.mark.asyncio
+async def test_fetcher_uses_injected_client():
+    shared = MagicMock()
+    response = MagicMock()
+    response.json.return_value = {"data": []}
+    shared.get = AsyncMock(return_value=response)
+
+    fetcher = KiwiFetcher(api_key="test_key", client=shared)
+    offers = await fetcher.fetch("XMN", "SIN", date(2026, 2, 1), date(2026, 2, 28))
+
+    assert offers == []
+    shared.get.assert_awaited_once()
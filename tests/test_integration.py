@@ -1,11 +1,13 @@
 # tests/test_integration.py
+import asyncio
 import pytest
-from datetime import date
+from datetime import date, datetime, timedelta, timezone
 from decimal import Decimal
 from unittest.mock import AsyncMock, patch
 
 from src.scheduler import FlightMonitorScheduler
-from src.models import FlightOffer
+from src.planner import plan_routes
+from src.models import FlightOffer, SourceResult
 
 @pytest.fixture
 def sample_config():
@@ -61,3 +63,249 @@ async def test_full_check_flow(sample_config):
         await scheduler._check_route(route)
 
         mock_fetch.assert_called_once()
+
+@pytest.mark.asyncio
+async def test_check_alerts_on_first_source_and_notifies_once(sample_config):
+    scheduler = FlightMonitorScheduler(sample_config)
+    offer = FlightOffer(
+        origin="XMN", destination="SIN",
+        departure_date=date(2026, 2, 15),
+        price=Decimal("750"), currency="CNY",
+        airline="Test Air", flight_number="TA123",
+        stops=0, source="kiwi"
+    )
+    cheaper = FlightOffer(
+        origin="XMN", destination="SIN",
+        departure_date=date(2026, 2, 16),
+        price=Decimal("700"), currency="CNY",
+        airline="Test Air", flight_number="TA124",
+        stops=0, source="kiwi"
+    )
+
+    async def fake_fetch_all(origin, destination, date_start, date_end, on_result=None, deadline=None):
+        await on_result(SourceResult(source="kiwi", offers=[offer]))
+        assert notify.await_count == 1
+        await on_result(SourceResult(source="amadeus", offers=[cheaper]))
+        return [offer, cheaper]
+
+    with patch.object(scheduler.aggregator, 'fetch_all', side_effect=fake_fetch_all), \
+            patch.object(scheduler.notifier_manager, 'notify_all', new_callable=AsyncMock) as notify:
+        await scheduler._check_route(sample_config['routes'][0])
+
+    assert notify.await_count == 1
+
+@pytest.mark.asyncio
+async def test_drop_rule_fires_from_previous_check(sample_config):
+    route = {**sample_config['routes'][0], 'alerts': [{'type': 'drop_percent', 'percent': 10}]}
+    scheduler = FlightMonitorScheduler(sample_config)
+
+    def offer_at(price: str) -> FlightOffer:
+        return FlightOffer(
+            origin="XMN", destination="SIN", departure_date=date(2026, 2, 15),
+            price=Decimal(price), currency="CNY", airline="Test Air",
+            flight_number="TA123", stops=0, source="kiwi"
+        )
+
+    with patch.object(scheduler.aggregator, 'fetch_all', new_callable=AsyncMock) as mock_fetch, \
+            patch.object(scheduler.notifier_manager, 'notify_all', new_callable=AsyncMock) as notify:
+        mock_fetch.return_value = [offer_at("1000")]
+        await scheduler._check_route(route)
+        assert notify.await_count == 0
+
+        mock_fetch.return_value = [offer_at("850")]
+        await scheduler._check_route(route)
+
+    assert notify.await_count == 1
+    assert notify.await_args.args[0].rule_type == "drop_percent"
+
+def test_jobs_are_staggered_by_job_id(sample_config):
+    sample_config['routes'].append(dict(sample_config['routes'][0], name='第二航线', destination='KUL'))
+    scheduler = FlightMonitorScheduler(sample_config)
+    scheduler.setup_jobs()
+
+    starts = [job.trigger.start_date for job in scheduler.scheduler.get_jobs()]
+    assert starts[0] != starts[1]
+    assert all(job.coalesce for job in scheduler.scheduler.get_jobs())
+
+@pytest.mark.asyncio
+async def test_concurrent_checks_are_capped(sample_config):
+    sample_config['scheduler'] = {'max_concurrent_checks': 2}
+    scheduler = FlightMonitorScheduler(sample_config)
+    running = peak = 0
+
+    async def fake_check(plan):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+
+    plan = plan_routes(sample_config['routes'])[0]
+    with patch.object(scheduler, '_check_pair', side_effect=fake_check):
+        await asyncio.gather(*(scheduler._run_check(plan) for _ in range(6)))
+
+    assert peak == 2
+
+def test_job_events_feed_metrics(sample_config):
+    from apscheduler.events import EVENT_JOB_MISSED, EVENT_JOB_SUBMITTED, JobExecutionEvent, JobSubmissionEvent
+    from src.metrics import metrics
+    metrics.reset()
+    scheduler = FlightMonitorScheduler(sample_config)
+    scheduled = datetime.now(timezone.utc) - timedelta(seconds=5)
+
+    scheduler._on_job_event(JobSubmissionEvent(EVENT_JOB_SUBMITTED, 'route_XMN_SIN', 'default', [scheduled]))
+    scheduler._on_job_event(JobExecutionEvent(EVENT_JOB_MISSED, 'route_XMN_SIN', 'default', scheduled))
+
+    assert metrics.summaries['scheduler.job_lag']['max'] >= 5
+    assert metrics.counters['scheduler.misfires'] == 1
+
+def test_adaptive_routes_use_adaptive_trigger(sample_config):
+    from src.scheduling import AdaptiveTrigger
+    sample_config['routes'][0].update(adaptive=True, min_interval='30m', max_interval='4h')
+    scheduler = FlightMonitorScheduler(sample_config)
+    scheduler.setup_jobs()
+
+    trigger = scheduler.scheduler.get_jobs()[0].trigger
+    assert isinstance(trigger, AdaptiveTrigger)
+    assert (trigger.interval.min_interval, trigger.interval.max_interval) == (1800, 14400)
+    assert trigger.interval.departure == date(2026, 2, 1)
+
+@pytest.mark.asyncio
+async def test_routes_of_one_pair_share_a_job_and_a_fetch(sample_config):
+    first = sample_config['routes'][0]
+    first['date_range'] = {'start': '2026-02-01', 'end': '2026-02-10'}
+    second = dict(first, name='二月下旬', date_range={'start': '2026-02-20', 'end': '2026-02-28'},
+                  alerts=[{'type': 'threshold', 'max_price': 600}])
+    sample_config['routes'].append(second)
+    scheduler = FlightMonitorScheduler(sample_config)
+    scheduler.setup_jobs()
+
+    jobs = scheduler.scheduler.get_jobs()
+    assert [job.id for job in jobs] == ['pair_XMN_SIN']
+
+    offers = [
+        FlightOffer("XMN", "SIN", date(2026, 2, 5), Decimal("750"), "CNY", "MF", "MF851", 0, "kiwi"),
+        FlightOffer("XMN", "SIN", date(2026, 2, 25), Decimal("650"), "CNY", "MF", "MF851", 0, "kiwi"),
+    ]
+    with patch.object(scheduler.aggregator, 'fetch_all', new_callable=AsyncMock) as mock_fetch, \
+         patch.object(scheduler.notifier_manager, 'notify_all', new_callable=AsyncMock) as mock_notify:
+        mock_fetch.return_value = offers
+        mock_notify.return_value = ['console']
+        await scheduler._run_check(jobs[0].args[0])
+
+    # Disjoint windows are fetched separately instead of spanning the gap
+    assert [call.args[2:4] for call in mock_fetch.call_args_list] == [
+        (date(2026, 2, 1), date(2026, 2, 10)), (date(2026, 2, 20), date(2026, 2, 28))
+    ]
+    # 750 on Feb 5 is under the first route's 800; the second route's 650 is over its 600
+    assert mock_notify.await_count == 1
+    assert mock_notify.await_args.args[0].route_name == '测试航线'
+
+def test_distributed_mode_registers_jobs_with_leases(sample_config):
+    from unittest.mock import MagicMock
+    from src.leases import LeaseCoordinator
+    scheduler = FlightMonitorScheduler(sample_config)
+    scheduler.leases = LeaseCoordinator(MagicMock(), scheduler._run_check)
+    scheduler.setup_jobs()
+
+    assert scheduler.scheduler.get_jobs() == []
+    assert list(scheduler.leases.jobs) == ['pair_XMN_SIN']
+
+@pytest.mark.asyncio
+async def test_reload_touches_only_changed_jobs(sample_config):
+    import copy
+    sample_config['routes'].append(dict(sample_config['routes'][0], name='吉隆坡', destination='KUL'))
+    scheduler = FlightMonitorScheduler(sample_config)
+    scheduler.setup_jobs()
+    scheduler.start()
+    try:
+        before = {job.id: job.next_run_time for job in scheduler.scheduler.get_jobs()}
+
+        config = copy.deepcopy(sample_config)
+        config['routes'][0]['alerts'] = [{'type': 'threshold', 'max_price': 700}]
+        config['routes'][1]['check_interval'] = '30m'
+        config['routes'].append(dict(config['routes'][0], name='曼谷', destination='BKK'))
+        changes = await scheduler.reload(config)
+
+        assert changes == {
+            'added': ['pair_XMN_BKK'], 'removed': [],
+            'rescheduled': ['pair_XMN_KUL'], 'updated': ['pair_XMN_SIN'],
+        }
+        job = scheduler.scheduler.get_job('pair_XMN_SIN')
+        assert job.next_run_time == before['pair_XMN_SIN']
+        assert job.args[0].routes[0]['alerts'][0]['max_price'] == 700
+        assert str(scheduler.scheduler.get_job('pair_XMN_KUL').trigger) == 'interval[0:30:00]'
+
+        config['routes'] = config['routes'][:1]
+        changes = await scheduler.reload(config)
+        assert sorted(changes['removed']) == ['pair_XMN_BKK', 'pair_XMN_KUL']
+        assert [job.id for job in scheduler.scheduler.get_jobs()] == ['pair_XMN_SIN']
+        assert scheduler.scheduler.get_job('pair_XMN_SIN').next_run_time == before['pair_XMN_SIN']
+    finally:
+        scheduler.stop()
+
+@pytest.mark.asyncio
+async def test_one_off_initialize_skips_partition_maintenance(sample_config, tmp_path):
+    from unittest.mock import MagicMock
+    sample_config['storage'] = {'enabled': False}
+    sample_config['distributed'] = {'enabled': True}
+    sample_config['quota'] = {'state_file': str(tmp_path / 'quota.json')}
+    scheduler = FlightMonitorScheduler(sample_config)
+
+    with patch('src.scheduler.init_database', new_callable=AsyncMock) as init, \
+            patch('src.scheduler.PartitionManager') as partitions:
+        init.return_value = (MagicMock(dispose=AsyncMock()), None)
+        await scheduler.initialize(daemon=False)
+        try:
+            partitions.assert_not_called()
+            assert scheduler.partitions is None
+            assert scheduler.leases is None
+        finally:
+            await scheduler.close()
+
+@pytest.mark.asyncio
+async def test_invalid_reload_changes_nothing(sample_config):
+    import copy
+    scheduler = FlightMonitorScheduler(sample_config)
+    scheduler.setup_jobs()
+    scheduler.start()
+    try:
+        before = scheduler.scheduler.get_job('pair_XMN_SIN').next_run_time
+
+        config = copy.deepcopy(sample_config)
+        config['routes'][0]['check_interval'] = '1h'
+        config['routes'].append(dict(config['routes'][0], name='曼谷', destination='BKK'))
+        config['routes'].append(dict(config['routes'][0], name='吉隆坡', destination='KUL',
+                                     date_range={'start': 'not a date'}))
+        with pytest.raises(ValueError):
+            await scheduler.reload(config)
+
+        assert [job.id for job in scheduler.scheduler.get_jobs()] == ['pair_XMN_SIN']
+        assert scheduler.scheduler.get_job('pair_XMN_SIN').next_run_time == before
+        assert scheduler.config['routes'] == sample_config['routes']
+    finally:
+        scheduler.stop()
+
+@pytest.mark.asyncio
+async def test_kiwi_routes_are_batched_through_the_wrapped_fetcher(sample_config):
+    import json
+    import math
+    from unittest.mock import MagicMock
+    sample_config['cache'] = {'enabled': False}
+    scheduler = FlightMonitorScheduler(sample_config)
+    kiwi = scheduler.aggregator.fetchers[0].unwrap()
+    response = MagicMock()
+    response.content = json.dumps({"data": []}).encode()
+    kiwi.client = MagicMock()
+    kiwi.client.get = AsyncMock(return_value=response)
+
+    destinations = ["SIN", "BKK", "KUL", "HKG", "TPE", "NRT", "ICN", "MNL", "SGN", "HAN", "DPS", "CGK"]
+    await asyncio.gather(*[
+        scheduler.aggregator.fetch_all("XMN", destination, date(2026, 2, 1), date(2026, 2, 28))
+        for destination in destinations
+    ])
+
+    requests = math.ceil(len(destinations) / kiwi.max_batch_size)
+    assert kiwi.client.get.await_count == requests
+    assert scheduler.quota.headroom("kiwi")["used_today"] == requests
+    await scheduler.close()
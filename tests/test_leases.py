@@ -0,0 +1,119 @@
+# tests/test_leases.py
+import asyncio
+import pytest
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock, MagicMock
+from apscheduler.triggers.interval import IntervalTrigger
+from src.leases import CLAIM_SQL, COMPLETE_SQL, RELEASE_JOB_SQL, LeaseCoordinator, next_due
+from src.metrics import Metrics
+from src.planner import plan_routes
+
+NOW = datetime(2026, 2, 1, 12, 0, tzinfo=timezone.utc)
+
+def _engine_returning(rows=()):
+    conn = MagicMock()
+    result = MagicMock()
+    result.all.return_value = list(rows)
+    result.rowcount = 0
+    conn.execute = AsyncMock(return_value=result)
+    engine = MagicMock()
+    engine.begin.return_value.__aenter__.return_value = conn
+    return engine, conn
+
+def _coordinator(engine, run=None, **kwargs):
+    coordinator = LeaseCoordinator(
+        engine, run or AsyncMock(), owner="node-a", metrics=Metrics(), clock=lambda: NOW, **kwargs
+    )
+    plan = plan_routes([{'name': 'XMN-SIN', 'origin': 'XMN', 'destination': 'SIN'}])[0]
+    coordinator.add_job(plan, IntervalTrigger(hours=1, start_date=NOW - timedelta(hours=5)))
+    return coordinator, plan
+
+def test_next_due_skips_missed_runs():
+    trigger = IntervalTrigger(hours=1, start_date=NOW - timedelta(hours=5))
+    assert next_due(trigger, NOW - timedelta(hours=3), NOW) == NOW + timedelta(hours=1)
+    assert next_due(trigger, NOW - timedelta(minutes=10), NOW) == NOW + timedelta(minutes=50)
+
+@pytest.mark.asyncio
+async def test_claim_skips_locked_rows_and_counts_reclaims():
+    engine, conn = _engine_returning([("pair_XMN_SIN", NOW, "node-b")])
+    coordinator, _ = _coordinator(engine)
+
+    claimed = await coordinator.claim(3)
+
+    assert claimed == [("pair_XMN_SIN", NOW)]
+    statement, params = conn.execute.await_args.args
+    assert str(statement) == CLAIM_SQL
+    assert "FOR UPDATE SKIP LOCKED" in CLAIM_SQL
+    assert params == {'job_ids': ['pair_XMN_SIN'], 'limit': 3, 'owner': 'node-a', 'ttl': 120}
+    assert coordinator.metrics.counters['leases.reclaimed'] == 1
+
+@pytest.mark.asyncio
+async def test_claim_without_free_slots_does_not_query():
+    engine, conn = _engine_returning()
+    coordinator, _ = _coordinator(engine)
+
+    assert await coordinator.claim(0) == []
+    conn.execute.assert_not_awaited()
+
+@pytest.mark.asyncio
+async def test_poll_runs_claimed_check_then_schedules_next_run():
+    engine, conn = _engine_returning([("pair_XMN_SIN", NOW - timedelta(seconds=30), None)])
+    run = AsyncMock()
+    coordinator, plan = _coordinator(engine, run=run, max_concurrent=2)
+
+    await coordinator.poll()
+    assert coordinator.held == {"pair_XMN_SIN"}
+    await asyncio.gather(*coordinator._running.values())
+
+    run.assert_awaited_once_with(plan)
+    statement, params = conn.execute.await_args.args
+    assert str(statement) == COMPLETE_SQL
+    assert params == {'job_id': 'pair_XMN_SIN', 'owner': 'node-a', 'due_at': NOW + timedelta(minutes=59, seconds=30)}
+    assert coordinator.held == set()
+    assert coordinator.metrics.summaries['scheduler.job_lag']['max'] == 30
+
+@pytest.mark.asyncio
+async def test_failed_check_still_completes_its_lease():
+    engine, conn = _engine_returning([("pair_XMN_SIN", NOW, None)])
+    coordinator, _ = _coordinator(engine, run=AsyncMock(side_effect=RuntimeError("boom")))
+
+    await coordinator.poll()
+    await asyncio.gather(*coordinator._running.values())
+
+    assert str(conn.execute.await_args.args[0]) == COMPLETE_SQL
+    assert coordinator.metrics.counters['scheduler.errors'] == 1
+
+@pytest.mark.asyncio
+async def test_close_releases_held_leases():
+    engine, conn = _engine_returning()
+    coordinator, _ = _coordinator(engine)
+    blocked = asyncio.Event()
+
+    async def hang(plan):
+        await blocked.wait()
+
+    coordinator.run = hang
+    coordinator._running["pair_XMN_SIN"] = asyncio.ensure_future(coordinator._execute("pair_XMN_SIN", NOW))
+    await asyncio.sleep(0)
+    await coordinator.close()
+
+    statement, params = conn.execute.await_args.args
+    assert "lease_owner = NULL" in str(statement)
+    assert params == {'owner': 'node-a'}
+    assert coordinator.held == set()
+
+@pytest.mark.asyncio
+async def test_job_removed_while_running_is_handed_back():
+    engine, conn = _engine_returning([("pair_XMN_SIN", NOW, None)])
+    coordinator, plan = _coordinator(engine)
+
+    async def remove_during_run(running_plan):
+        coordinator.remove_job(running_plan.job_id)
+
+    coordinator.run = remove_during_run
+    await coordinator.poll()
+    await asyncio.gather(*coordinator._running.values())
+
+    statement, params = conn.execute.await_args.args
+    assert str(statement) == RELEASE_JOB_SQL
+    assert params == {'job_id': 'pair_XMN_SIN', 'owner': 'node-a'}
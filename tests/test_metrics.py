@@ -0,0 +1,33 @@
+from src.metrics import Metrics, merge_snapshots
+
+
+def test_metrics_counters_and_ratio():
+    m = Metrics()
+    m.inc("requests", 4)
+    m.inc("hits")
+
+    assert m.ratio("hits", "requests") == 0.25
+    assert m.ratio("hits", "unknown") == 0.0
+
+
+def test_metrics_observe_summary():
+    m = Metrics()
+    m.observe("latency", 0.5)
+    m.observe("latency", 1.5)
+
+    summary = m.snapshot()["summaries"]["latency"]
+    assert summary == {"count": 2, "sum": 2.0, "max": 1.5}
+
+
+def test_merge_snapshots_sums_counters_and_combines_summaries():
+    a, b = Metrics(), Metrics()
+    a.inc("requests", 2)
+    b.inc("requests")
+    a.observe("latency", 0.5)
+    b.observe("latency", 2.0)
+    b.set_gauge("queue", 3)
+
+    merged = merge_snapshots([a.snapshot(), b.snapshot()])
+    assert merged["counters"] == {"requests": 3}
+    assert merged["gauges"] == {"queue": 3}
+    assert merged["summaries"]["latency"] == {"count": 2, "sum": 2.5, "max": 2.0}
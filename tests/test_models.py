@@ -2,7 +2,7 @@
 import pytest
 from datetime import date
 from decimal import Decimal
-from src.models import FlightOffer
+from src.models import FlightOffer, CompactFlightOffer
 
 def test_flight_offer_creation():
     offer = FlightOffer(
@@ -29,3 +29,30 @@ def test_flight_offer_comparison():
         price=Decimal("899.00"), currency="CNY", airline="", flight_number="", stops=0, source="kiwi"
     )
     assert min([offer1, offer2], key=lambda x: x.price) == offer1
+
+def test_compact_offer_round_trips_losslessly():
+    offer = FlightOffer(
+        origin="XMN", destination="SIN", departure_date=date(2026, 2, 15),
+        price=Decimal("1299.50"), currency="CNY", airline="MF", flight_number="MF851", stops=1, source="amadeus"
+    )
+    compact = CompactFlightOffer.from_offer(offer)
+
+    assert compact.price_minor == 129950
+    assert not hasattr(compact, "__dict__")
+    assert compact.to_offer() == offer
+
+def test_compact_offer_interns_strings_and_uses_currency_exponent():
+    a = CompactFlightOffer("".join("XMN"), "SIN", date(2026, 2, 15), 12000, "JPY", "NH", "NH1", 0, "kiwi")
+    b = CompactFlightOffer("".join("XMN"), "SIN", date(2026, 2, 15), 12000, "JPY", "NH", "NH1", 0, "kiwi")
+
+    assert a.origin is b.origin
+    assert a.price == Decimal("12000")
+    assert a == b
+
+def test_compact_offer_rejects_sub_minor_unit_prices():
+    offer = FlightOffer(
+        origin="XMN", destination="SIN", departure_date=date(2026, 2, 15),
+        price=Decimal("10.005"), currency="CNY", airline="", flight_number="", stops=0, source="kiwi"
+    )
+    with pytest.raises(ValueError):
+        CompactFlightOffer.from_offer(offer)
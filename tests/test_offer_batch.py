@@ -0,0 +1,71 @@
+# tests/test_offer_batch.py
+import pytest
+from datetime import date
+from decimal import Decimal
+from src.models import FlightOffer
+from src.offer_batch import OfferBatch, OfferBatchBuilder
+
+def make_offer(day: int, price: str, airline: str = "MF", stops: int = 0, source: str = "amadeus") -> FlightOffer:
+    return FlightOffer(
+        origin="XMN", destination="SIN", departure_date=date(2026, 2, day),
+        price=Decimal(price), currency="CNY", airline=airline,
+        flight_number=f"{airline}851", stops=stops, source=source
+    )
+
+@pytest.fixture
+def batch():
+    return OfferBatch.from_offers([
+        make_offer(15, "899.00", airline="MF"),
+        make_offer(15, "799.50", airline="SQ", source="kiwi"),
+        make_offer(16, "650.00", airline="MF", stops=1),
+        make_offer(16, "700.00", airline="TR", source="kiwi"),
+        make_offer(17, "999.00", airline="SQ"),
+    ])
+
+def test_offer_batch_round_trip(batch):
+    offers = batch.to_offers()
+    assert len(batch) == 5
+    assert offers[1] == make_offer(15, "799.50", airline="SQ", source="kiwi")
+    assert batch.price.dtype.name == "int64"
+
+def test_offer_batch_best(batch):
+    best = batch.best()
+    assert best.price == Decimal("650.00")
+    assert best.stops == 1
+    assert OfferBatch.from_offers([]).best() is None
+
+def test_offer_batch_min_per_date(batch):
+    assert batch.min_per_date() == {
+        date(2026, 2, 15): Decimal("799.50"),
+        date(2026, 2, 16): Decimal("650.00"),
+        date(2026, 2, 17): Decimal("999.00"),
+    }
+
+def test_offer_batch_top_k(batch):
+    prices = [o.price for o in batch.top_k(3).to_offers()]
+    assert prices == [Decimal("650.00"), Decimal("700.00"), Decimal("799.50")]
+    assert len(batch.top_k(10)) == 5
+
+def test_offer_batch_filter(batch):
+    direct_kiwi = batch.filter(max_stops=0, sources=["kiwi"])
+    assert [o.airline for o in direct_kiwi.to_offers()] == ["SQ", "TR"]
+    assert len(batch.filter(sources=["unknown"])) == 0
+
+def test_offer_batch_group_by_airline(batch):
+    groups = batch.group_by_airline()
+    assert groups["MF"] == {'count': 2, 'min': Decimal("650.00"), 'mean': Decimal("774.50")}
+    assert groups["SQ"]["count"] == 2
+    assert groups["TR"]["min"] == Decimal("700.00")
+
+def test_offer_batch_concat_merges_codes(batch):
+    other = OfferBatch.from_offers([make_offer(18, "500.00", airline="3K", source="aviationstack")])
+    merged = OfferBatch.concat([batch, other])
+    assert len(merged) == 6
+    assert merged.best().airline == "3K"
+    assert merged.to_offers()[:5] == batch.to_offers()
+
+def test_offer_batch_builder_rejects_mixed_currency():
+    builder = OfferBatchBuilder()
+    builder.extend([make_offer(15, "799.00")])
+    with pytest.raises(ValueError):
+        builder.append("XMN", "SIN", date(2026, 2, 15), Decimal("120.00"), "USD", "MF", "MF851", 0, "amadeus")
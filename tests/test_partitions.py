@@ -0,0 +1,86 @@
+# tests/test_partitions.py
+import pytest
+from datetime import date
+from unittest.mock import AsyncMock, MagicMock
+from src.partitions import (
+    PartitionManager, add_months, create_partition_sql, expired_partitions,
+    parse_partition_name, partition_name
+)
+
+def test_month_arithmetic_wraps_years():
+    assert add_months(date(2026, 11, 1), 3) == date(2027, 2, 1)
+    assert add_months(date(2026, 1, 1), -1) == date(2025, 12, 1)
+
+def test_partition_names_round_trip():
+    assert partition_name(date(2026, 3, 1)) == "price_records_2026_03"
+    assert parse_partition_name("price_records_2026_03") == date(2026, 3, 1)
+    assert parse_partition_name("price_records_default") is None
+
+def test_create_partition_sql_covers_one_month():
+    sql = create_partition_sql(date(2026, 12, 1))
+    assert "price_records_2026_12 PARTITION OF price_records" in sql
+    assert "FROM ('2026-12-01') TO ('2027-01-01')" in sql
+
+def test_expired_partitions_respects_retention():
+    names = ["price_records_2025_01", "price_records_2025_06", "price_records_2025_07",
+             "price_records_2026_01", "price_records_default"]
+    assert expired_partitions(names, date(2026, 7, 15), retention_months=12) == [
+        "price_records_2025_01", "price_records_2025_06"
+    ]
+
+def _engine_with(existing):
+    conn = MagicMock()
+    listing = MagicMock()
+    listing.__iter__.return_value = iter([(name,) for name in existing])
+    conn.execute = AsyncMock(return_value=listing)
+    engine = MagicMock()
+    engine.begin.return_value.__aenter__.return_value = conn
+    return engine, conn
+
+@pytest.mark.asyncio
+async def test_ensure_partitions_creates_missing_months():
+    engine, conn = _engine_with(["price_records_2026_01", "price_records_2026_02"])
+    manager = PartitionManager(engine, months_ahead=2)
+
+    created = await manager.ensure_partitions(date(2026, 1, 20))
+
+    assert created == ["price_records_2026_03"]
+    assert conn.execute.await_count == 2
+
+@pytest.mark.asyncio
+async def test_apply_retention_detaches_and_drops():
+    engine, conn = _engine_with(["price_records_2025_01", "price_records_2026_01"])
+    manager = PartitionManager(engine, retention_months=6)
+
+    dropped = await manager.apply_retention(date(2026, 1, 20))
+
+    assert dropped == ["price_records_2025_01"]
+    statements = [str(call.args[0]) for call in conn.execute.await_args_list[1:]]
+    assert statements == [
+        "ALTER TABLE price_records DETACH PARTITION price_records_2025_01",
+        "DROP TABLE price_records_2025_01",
+    ]
+
+@pytest.mark.asyncio
+async def test_upgrade_schema_creates_tables_missing_from_older_databases():
+    engine, conn = _engine_with([])
+    await PartitionManager(engine).upgrade_schema()
+
+    statements = " ".join(str(call.args[0]) for call in conn.execute.await_args_list)
+    assert "CREATE TABLE IF NOT EXISTS price_daily" in statements
+    assert "idx_daily_route_day" in statements
+    assert "CREATE TABLE IF NOT EXISTS api_quota_usage" in statements
+
+@pytest.mark.asyncio
+async def test_migrate_copies_markers_and_creates_rollup_before_rebuilding():
+    engine, conn = _engine_with([])
+    conn.execute.return_value.scalar.return_value = 'r'
+    conn.execute.return_value.one.return_value = (None, None)
+
+    assert await PartitionManager(engine).migrate() is True
+
+    statements = [str(call.args[0]) for call in conn.execute.await_args_list]
+    copy = next(s for s in statements if s.startswith("INSERT INTO price_records "))
+    assert "available" in copy
+    create = next(i for i, s in enumerate(statements) if "CREATE TABLE IF NOT EXISTS price_daily" in s)
+    assert create < statements.index("DELETE FROM price_daily")
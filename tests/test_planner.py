@@ -0,0 +1,54 @@
+# tests/test_planner.py
+from datetime import date
+from decimal import Decimal
+from src.models import FlightOffer
+from src.planner import merge_windows, plan_routes, route_window
+
+def make_route(name, start, end, origin="XMN", destination="SIN", **kwargs):
+    return {'name': name, 'origin': origin, 'destination': destination,
+            'date_range': {'start': start, 'end': end}, **kwargs}
+
+def make_offer(day: date) -> FlightOffer:
+    return FlightOffer(
+        origin="XMN", destination="SIN", departure_date=day, price=Decimal("700"),
+        currency="CNY", airline="MF", flight_number="MF851", stops=0, source="kiwi"
+    )
+
+def test_route_window_defaults_to_a_single_day():
+    assert route_window({}, today=date(2026, 2, 1)) == (date(2026, 2, 1), date(2026, 2, 1))
+    assert route_window({'date_range': {'start': '2026-02-03'}}) == (date(2026, 2, 3), date(2026, 2, 3))
+
+def test_merge_windows_joins_overlapping_and_adjacent_ranges():
+    windows = [
+        (date(2026, 2, 10), date(2026, 2, 20)),
+        (date(2026, 2, 1), date(2026, 2, 12)),
+        (date(2026, 2, 21), date(2026, 2, 25)),
+        (date(2026, 6, 1), date(2026, 6, 5)),
+    ]
+    assert merge_windows(windows) == [
+        (date(2026, 2, 1), date(2026, 2, 25)),
+        (date(2026, 6, 1), date(2026, 6, 5)),
+    ]
+
+def test_plan_routes_groups_by_city_pair():
+    plans = plan_routes([
+        make_route("early", "2026-02-01", "2026-02-10", priority="low"),
+        make_route("to KUL", "2026-02-01", "2026-02-10", destination="KUL"),
+        make_route("late", "2026-02-05", "2026-02-20", priority="high", deadline=10),
+    ])
+
+    assert [plan.job_id for plan in plans] == ["pair_XMN_SIN", "pair_XMN_KUL"]
+    pair = plans[0]
+    assert pair.name == "early + late"
+    assert pair.priority == "high"
+    assert pair.deadline == 10
+    assert pair.windows() == [(date(2026, 2, 1), date(2026, 2, 20))]
+
+def test_offers_are_fanned_out_by_route_window():
+    early = make_route("early", "2026-02-01", "2026-02-10")
+    late = make_route("late", "2026-02-05", "2026-02-20")
+    plan = plan_routes([early, late])[0]
+    offers = [make_offer(date(2026, 2, 2)), make_offer(date(2026, 2, 7)), make_offer(date(2026, 2, 15))]
+
+    assert [o.departure_date.day for o in plan.offers_for(early, offers)] == [2, 7]
+    assert [o.departure_date.day for o in plan.offers_for(late, offers)] == [7, 15]
@@ -0,0 +1,158 @@
+import pytest
+from datetime import date, datetime, timezone
+from src.fetchers.base import BaseFetcher
+from src.fetchers.quota import QuotaManager, FileQuotaStore, SourceQuota, fetch_priority
+
+
+class CountingFetcher(BaseFetcher):
+    def __init__(self):
+        self.calls = 0
+
+    @property
+    def source_name(self) -> str:
+        return "mock"
+
+    async def fetch(self, origin, destination, date_start, date_end):
+        self.calls += 1
+        return []
+
+    def is_available(self) -> bool:
+        return True
+
+
+def fixed_clock():
+    return datetime(2026, 2, 1, 12, 0, tzinfo=timezone.utc)
+
+
+def test_monthly_budget_spread_over_remaining_days():
+    quota = SourceQuota("mock", monthly=280)
+    now = fixed_clock()
+    # 28 days in February 2026
+    assert quota.day_limit(now) == 10
+    quota.record(4, now)
+    assert quota.remaining(now) == 6
+    assert quota.headroom(now) == pytest.approx(0.6)
+
+
+def test_admit_skips_low_priority_when_headroom_low():
+    manager = QuotaManager({"mock": {"daily": 100}}, clock=fixed_clock)
+    manager.quota_for("mock").record(85, fixed_clock())
+    assert manager.admit("mock", 1, "low") is False
+    assert manager.admit("mock", 1, "normal") is True
+
+    manager.quota_for("mock").record(12, fixed_clock())
+
+    assert manager.admit("mock", 1, "low") is False
+    assert manager.admit("mock", 1, "normal") is False
+    assert manager.admit("mock", 1, "high") is True
+    assert manager.admit("mock", 4, "high") is False
+
+
+@pytest.mark.asyncio
+async def test_quota_limited_fetcher_stops_when_budget_spent():
+    manager = QuotaManager({"mock": {"daily": 2}}, clock=fixed_clock)
+    inner = CountingFetcher()
+    fetcher = manager.wrap(inner)
+
+    fetch_priority.set("high")
+    for _ in range(3):
+        await fetcher.fetch("XMN", "SIN", date(2026, 2, 1), date(2026, 2, 2))
+
+    assert inner.calls == 2
+    assert fetcher.source_name == "mock"
+    assert fetcher.unwrap() is inner
+    assert manager.headroom("mock")["remaining_today"] == 0
+
+
+@pytest.mark.asyncio
+async def test_file_store_persists_usage_across_restarts(tmp_path):
+    path = tmp_path / "quota.json"
+
+    first = QuotaManager({"mock": {"monthly": 1000}}, stores=[FileQuotaStore(path)], clock=fixed_clock)
+    await first.acquire("mock", 3)
+    await first.save()
+    await first.acquire("mock", 2)
+    await first.close()
+
+    second = QuotaManager({"mock": {"monthly": 1000}}, stores=[FileQuotaStore(path)], clock=fixed_clock)
+    await second.load()
+
+    assert second.headroom("mock")["used_month"] == 5
+
+
+@pytest.mark.asyncio
+async def test_share_scales_limits_and_restored_usage(tmp_path):
+    path = tmp_path / "quota.json"
+    first = QuotaManager({"mock": {"daily": 100}}, stores=[FileQuotaStore(path)], clock=fixed_clock)
+    await first.acquire("mock", 40)
+    await first.save()
+
+    worker = QuotaManager({"mock": {"daily": 100, "per_second": 10}}, stores=[FileQuotaStore(path)],
+                          clock=fixed_clock, share=0.25)
+    await worker.load()
+
+    quota = worker.quota_for("mock")
+    assert quota.daily == 25
+    assert quota.bucket.rate == 2.5
+    assert worker.headroom("mock")["remaining_today"] == 15
+
+
+@pytest.mark.asyncio
+async def test_save_falls_back_to_next_store(tmp_path):
+    class BrokenStore(FileQuotaStore):
+        async def save(self, deltas):
+            raise ConnectionError("db down")
+
+    fallback = FileQuotaStore(tmp_path / "quota.json")
+    manager = QuotaManager({}, stores=[BrokenStore(tmp_path / "unused.json"), fallback], clock=fixed_clock)
+    await manager.acquire("mock", 1)
+    await manager.save()
+
+    state = await fallback.load()
+    assert state["mock"]["day_used"] == 1
+
+
+@pytest.mark.asyncio
+async def test_flush_picks_up_usage_of_other_processes(tmp_path):
+    import asyncio
+    path = tmp_path / "quota.json"
+    first = QuotaManager({"mock": {"daily": 100}}, stores=[FileQuotaStore(path)], clock=fixed_clock)
+    second = QuotaManager({"mock": {"daily": 100}}, stores=[FileQuotaStore(path)], clock=fixed_clock)
+    await first.acquire("mock", 30)
+    await second.acquire("mock", 10)
+
+    first.start(flush_interval=0.01)
+    second.start(flush_interval=0.01)
+    await asyncio.sleep(0.1)
+    await first.close()
+    await second.close()
+
+    assert first.headroom("mock")["used_today"] == 40
+    assert second.headroom("mock")["used_today"] == 40
+
+
+def test_quota_store_is_abstract():
+    from src.fetchers.quota import QuotaStore
+    with pytest.raises(TypeError):
+        QuotaStore()
+
+
+def _save_many(path, times):
+    import asyncio
+    store = FileQuotaStore(path)
+    for _ in range(times):
+        asyncio.run(store.save([("mock", "2026-02-01", "2026-02", 1)]))
+
+
+@pytest.mark.asyncio
+async def test_file_store_concurrent_writers_keep_every_update(tmp_path):
+    import multiprocessing
+    path = tmp_path / "quota.json"
+    processes = [multiprocessing.Process(target=_save_many, args=(str(path), 25)) for _ in range(4)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+    state = await FileQuotaStore(path).load()
+    assert state["mock"]["day_used"] == 100
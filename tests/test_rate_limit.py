@@ -0,0 +1,31 @@
+import pytest
+import time
+from src.fetchers.rate_limit import TokenBucket, parse_retry_after
+
+
+def test_token_bucket_try_acquire_respects_capacity():
+    bucket = TokenBucket(rate=1, capacity=2)
+    assert bucket.try_acquire() is True
+    assert bucket.try_acquire() is True
+    assert bucket.try_acquire() is False
+
+
+def test_token_bucket_rejects_non_positive_rate():
+    with pytest.raises(ValueError):
+        TokenBucket(rate=0)
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_acquire_waits_for_refill():
+    bucket = TokenBucket(rate=50, capacity=1)
+    await bucket.acquire()
+
+    start = time.monotonic()
+    await bucket.acquire()
+    assert time.monotonic() - start >= 0.015
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("2") == 2.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("Wed, 21 Oct 2026 07:28:00 GMT") is None
@@ -0,0 +1,46 @@
+# tests/test_reload.py
+import os
+import pytest
+from unittest.mock import AsyncMock
+from src.reload import ConfigReloader
+
+def _write(path, text, mtime):
+    path.write_text(text)
+    os.utime(path, (mtime, mtime))
+
+@pytest.mark.asyncio
+async def test_reloads_only_when_file_changes(tmp_path):
+    path = tmp_path / "config.yaml"
+    _write(path, "routes: []\n", 1000)
+    apply = AsyncMock()
+    reloader = ConfigReloader(str(path), apply, interval=None)
+
+    assert not await reloader.check()
+    _write(path, "routes:\n  - name: a\n", 2000)
+    assert await reloader.check()
+    apply.assert_awaited_once_with({'routes': [{'name': 'a'}]})
+    assert not await reloader.check()
+
+@pytest.mark.asyncio
+async def test_broken_config_keeps_the_current_one(tmp_path):
+    path = tmp_path / "config.yaml"
+    _write(path, "routes: []\n", 1000)
+    apply = AsyncMock()
+    reloader = ConfigReloader(str(path), apply, interval=None)
+
+    _write(path, "routes: [\n", 2000)
+    assert not await reloader.check()
+    apply.assert_not_awaited()
+    # Not retried until the file changes again
+    assert not await reloader.check()
+
+@pytest.mark.asyncio
+async def test_config_that_fails_to_apply_is_logged_and_ignored(tmp_path):
+    path = tmp_path / "config.yaml"
+    _write(path, "routes: []\n", 1000)
+    apply = AsyncMock(side_effect=ValueError("bad interval"))
+    reloader = ConfigReloader(str(path), apply, interval=None)
+
+    _write(path, "routes:\n  - name: a\n", 2000)
+    assert not await reloader.check()
+    apply.assert_awaited_once()
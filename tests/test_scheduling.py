@@ -0,0 +1,53 @@
+# tests/test_scheduling.py
+from datetime import date, datetime, timedelta, timezone
+from src.scheduling import AdaptiveInterval, AdaptiveTrigger, stagger_offset, staggered_start
+
+def test_stagger_offset_is_stable_and_within_interval():
+    offset = stagger_offset("route_XMN_SIN", 3600)
+    assert offset == stagger_offset("route_XMN_SIN", 3600)
+    assert 0 <= offset < 3600
+
+def test_stagger_offsets_spread_jobs():
+    offsets = {int(stagger_offset(f"route_XMN_{i:03d}", 3600)) // 600 for i in range(60)}
+    # 60 jobs over six 10-minute buckets should touch all of them
+    assert len(offsets) == 6
+
+def test_staggered_start_lies_in_current_interval():
+    now = datetime(2026, 2, 1, 10, 20, tzinfo=timezone.utc)
+    start = staggered_start("route_XMN_SIN", 3600, now)
+    assert datetime(2026, 2, 1, 10, tzinfo=timezone.utc) <= start < datetime(2026, 2, 1, 11, tzinfo=timezone.utc)
+    assert staggered_start("route_XMN_SIN", 3600, datetime(2026, 2, 1, 13, 5, tzinfo=timezone.utc)).minute == start.minute
+
+def _interval(**kwargs):
+    return AdaptiveInterval(**{
+        'base': 3600, 'min_interval': 900, 'max_interval': 14400,
+        'departure': date(2026, 3, 1), **kwargs
+    })
+
+def test_adaptive_interval_tightens_towards_departure():
+    interval = _interval()
+    assert interval.seconds(datetime(2025, 10, 1)) == 7200        # Far out: doubled
+    assert interval.seconds(datetime(2026, 2, 25)) == 1800        # Within a week: halved
+    assert 1800 < interval.seconds(datetime(2026, 1, 15)) < 7200
+
+def test_adaptive_interval_follows_volatility_and_quota():
+    now = datetime(2026, 2, 20)  # 9 days out
+    plain = _interval().seconds(now)
+    assert _interval(volatility=lambda: 0.08).seconds(now) == plain / 2
+    assert _interval(volatility=lambda: 0.001).seconds(now) == plain * 2
+    assert _interval(headroom=lambda: 0.1).seconds(now) == plain * 2
+    assert _interval(headroom=lambda: 0.01).seconds(now) == plain * 4
+
+def test_adaptive_interval_is_clamped():
+    assert _interval(volatility=lambda: 0.5).seconds(datetime(2026, 2, 28)) == 900
+    assert _interval(volatility=lambda: 0.0, headroom=lambda: 0.0).seconds(datetime(2025, 1, 1)) == 14400
+
+def test_adaptive_trigger_staggers_first_run_then_follows_interval():
+    now = datetime(2026, 2, 25, 12, tzinfo=timezone.utc)
+    seen = []
+    trigger = AdaptiveTrigger(_interval(), "route_XMN_SIN", on_interval=seen.append)
+
+    first = trigger.get_next_fire_time(None, now)
+    assert now <= first < now + timedelta(seconds=1800)
+    assert trigger.get_next_fire_time(first, first) == first + timedelta(seconds=1800)
+    assert seen == [1800, 1800]
@@ -0,0 +1,241 @@
+# tests/test_storage.py
+import asyncio
+import pytest
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from unittest.mock import AsyncMock, MagicMock
+from sqlalchemy.dialects import postgresql
+from src.metrics import Metrics
+from src.models import FlightOffer
+from src.analyzers.history import PriceHistoryCache
+from src.storage import (
+    ChangeFilter, PriceWriter, RecordingFetcher, check_time, offer_to_record, rollup_records, rollup_upsert
+)
+
+def make_offer(price: str = "799.00", airline: str = "MF") -> FlightOffer:
+    return FlightOffer(
+        origin="XMN", destination="SIN", departure_date=date(2026, 2, 15),
+        price=Decimal(price), currency="CNY", airline=airline,
+        flight_number="MF851", stops=0, source="kiwi"
+    )
+
+def test_offer_to_record_fits_columns():
+    fetched_at = datetime(2026, 1, 1, 8, 0)
+    record = offer_to_record(make_offer(airline="A" * 80), fetched_at)
+    assert record[0:4] == ("XMN", "SIN", date(2026, 2, 15), "kiwi")
+    assert len(record[4]) == 50
+    assert record[5] == Decimal("799.00")
+    assert record[-2] == fetched_at
+    assert record[-1] is True
+
+@pytest.mark.asyncio
+async def test_writer_batches_by_size():
+    batches = []
+
+    async def sink(rows, observed):
+        batches.append(len(rows))
+
+    writer = PriceWriter(sink, batch_size=3, flush_interval=10, metrics=Metrics())
+    writer.start()
+    await writer.put([make_offer() for _ in range(7)])
+    await writer.close()
+
+    assert sum(batches) == 7
+    assert batches[0] == 3
+
+@pytest.mark.asyncio
+async def test_writer_flushes_partial_batch_after_interval():
+    written = asyncio.Event()
+
+    async def sink(rows, observed):
+        written.set()
+
+    writer = PriceWriter(sink, batch_size=100, flush_interval=0.01, metrics=Metrics())
+    writer.start()
+    await writer.put([make_offer()])
+    await asyncio.wait_for(written.wait(), 1)
+    await writer.close()
+
+@pytest.mark.asyncio
+async def test_writer_applies_backpressure_when_full():
+    release = asyncio.Event()
+
+    async def sink(rows, observed):
+        await release.wait()
+
+    metrics = Metrics()
+    writer = PriceWriter(sink, batch_size=1, flush_interval=0, max_queue=2, metrics=metrics)
+    writer.start()
+
+    producer = asyncio.ensure_future(writer.put([make_offer() for _ in range(5)]))
+    await asyncio.sleep(0.05)
+    assert not producer.done()
+    assert metrics.counters["writer.backpressure"] >= 1
+
+    release.set()
+    await asyncio.wait_for(producer, 1)
+    await writer.close()
+    assert metrics.counters["writer.rows"] == 5
+
+@pytest.mark.asyncio
+async def test_writer_drops_batch_after_retries():
+    sink = AsyncMock(side_effect=RuntimeError("db down"))
+    metrics = Metrics()
+    writer = PriceWriter(sink, batch_size=10, flush_interval=0, max_retries=1, retry_backoff=0, metrics=metrics)
+    await writer.put([make_offer(), make_offer()])
+    await writer.close()
+
+    assert sink.await_count == 2
+    assert metrics.counters["writer.dropped"] == 2
+
+@pytest.mark.asyncio
+async def test_recording_fetcher_records_fresh_offers():
+    inner = MagicMock()
+    inner.source_name = "kiwi"
+    inner.fetch = AsyncMock(return_value=[make_offer()])
+    record = AsyncMock()
+
+    fetcher = RecordingFetcher(inner, record)
+    offers = await fetcher.fetch("XMN", "SIN", date(2026, 2, 1), date(2026, 2, 28))
+
+    record.assert_awaited_once_with(offers, ("kiwi", "XMN", "SIN", date(2026, 2, 1), date(2026, 2, 28)))
+
+def test_rollup_records_aggregates_per_fetch_day():
+    morning = datetime(2026, 1, 1, 8, 0)
+    evening = datetime(2026, 1, 1, 20, 0)
+    rows = [
+        offer_to_record(make_offer("900.00"), morning),
+        offer_to_record(make_offer("700.00"), morning),
+        offer_to_record(make_offer("800.00"), evening),
+        offer_to_record(make_offer("0"), evening),
+        offer_to_record(make_offer("650.00"), datetime(2026, 1, 2, 8, 0)),
+    ]
+
+    rollup = {r['fetch_day']: r for r in rollup_records(rows)}
+
+    first = rollup[date(2026, 1, 1)]
+    assert (first['min_price'], first['max_price']) == (Decimal("700.00"), Decimal("900.00"))
+    assert (first['sum_price'], first['count']) == (Decimal("2400.00"), 3)
+    assert (first['last_price'], first['last_fetched_at']) == (Decimal("800.00"), evening)
+    assert rollup[date(2026, 1, 2)]['count'] == 1
+
+@pytest.mark.asyncio
+async def test_rollup_of_one_check_matches_recorded_history():
+    observed = []
+
+    async def sink(rows, batch):
+        observed.extend(batch)
+
+    checked_at = datetime(2026, 1, 1, 8, 0)
+    kiwi = make_offer("700.00")
+    amadeus = FlightOffer(
+        origin="XMN", destination="SIN", departure_date=date(2026, 2, 15),
+        price=Decimal("900.00"), currency="CNY", airline="SQ",
+        flight_number="SQ185", stops=0, source="amadeus"
+    )
+    writer = PriceWriter(sink, batch_size=100)
+    writer.start()
+    token = check_time.set(checked_at)
+    try:
+        # Each source is written on its own, cheapest first
+        await writer.put([kiwi])
+        await asyncio.sleep(0.01)
+        await writer.put([amadeus])
+    finally:
+        check_time.reset(token)
+    await writer.close()
+
+    clock = lambda: checked_at + timedelta(hours=1)
+    recorded = PriceHistoryCache(clock=clock)
+    recorded.record_offers("XMN", "SIN", [kiwi, amadeus], at=checked_at)
+    warmed = PriceHistoryCache(clock=clock)
+    warmed._apply([
+        (r['origin'], r['destination'], r['departure_date'], r['fetch_day'],
+         r['min_price'], r['last_fetched_at'], r['last_price'])
+        for r in rollup_records(observed)
+    ])
+
+    dep = date(2026, 2, 15)
+    assert warmed.last_price("XMN", "SIN", dep) == recorded.last_price("XMN", "SIN", dep) == Decimal("700.00")
+    assert warmed.low("XMN", "SIN", dep) == recorded.low("XMN", "SIN", dep)
+
+def test_rollup_upsert_keeps_cheapest_last_price_for_the_same_fetch_time():
+    sql = str(rollup_upsert().compile(dialect=postgresql.dialect()))
+    assert "least(price_daily.last_price, excluded.last_price)" in sql
+
+SCOPE = ("kiwi", "XMN", "SIN", date(2026, 2, 1), date(2026, 2, 28))
+
+def test_change_filter_stores_only_changes_and_heartbeats():
+    change_filter = ChangeFilter(heartbeat=3600)
+    start = datetime(2026, 1, 1, 8, 0)
+
+    def poll(price, minutes):
+        at = start + timedelta(minutes=minutes)
+        return change_filter.filter([offer_to_record(make_offer(price), at)], SCOPE)
+
+    assert len(poll("799.00", 0)) == 1
+    assert poll("799.00", 10) == []
+    assert poll("799.00", 20) == []
+    assert len(poll("750.00", 30)) == 1
+    assert poll("750.00", 40) == []
+    assert len(poll("750.00", 95)) == 1  # Heartbeat
+
+def test_change_filter_marks_missing_flights_unavailable():
+    change_filter = ChangeFilter()
+    first = datetime(2026, 1, 1, 8, 0)
+    second = datetime(2026, 1, 1, 9, 0)
+    other = FlightOffer(
+        origin="XMN", destination="SIN", departure_date=date(2026, 2, 15), price=Decimal("650.00"),
+        currency="CNY", airline="TR", flight_number="TR1", stops=1, source="kiwi"
+    )
+    change_filter.filter([offer_to_record(make_offer(), first), offer_to_record(other, first)], SCOPE)
+
+    stored = change_filter.filter([offer_to_record(make_offer(), second)], SCOPE)
+
+    assert len(stored) == 1
+    assert stored[0][7] == "TR1" and stored[0][-1] is False
+    assert stored[0][5] == Decimal("650.00")
+    # TR1 reappearing at the same price is stored, and MF851 is now missing
+    assert len(change_filter.filter([offer_to_record(other, second + timedelta(hours=1))], SCOPE)) == 2
+
+def test_change_filter_tracks_cheapest_fare_per_flight():
+    change_filter = ChangeFilter()
+    at = datetime(2026, 1, 1, 8, 0)
+    stored = change_filter.filter([
+        offer_to_record(make_offer("900.00"), at), offer_to_record(make_offer("799.00"), at)
+    ])
+    assert [r[5] for r in stored] == [Decimal("799.00")]
+
+@pytest.mark.asyncio
+async def test_writer_dedup_keeps_all_observations_for_rollups():
+    calls = []
+
+    async def sink(rows, observed):
+        calls.append((len(rows), len(observed)))
+
+    metrics = Metrics()
+    writer = PriceWriter(sink, batch_size=100, change_filter=ChangeFilter(), metrics=metrics)
+    writer.start()
+    fetched_at = datetime(2026, 1, 1, 8, 0)
+    await writer.put([make_offer()], fetched_at, SCOPE)
+    await writer.put([make_offer()], fetched_at + timedelta(minutes=10), SCOPE)
+    await writer.close()
+
+    assert sum(r for r, _ in calls) == 1
+    assert sum(o for _, o in calls) == 2
+    assert metrics.counters["writer.skipped"] == 1
+
+def test_change_filter_marks_only_dates_the_fetch_returned():
+    change_filter = ChangeFilter()
+    first = datetime(2026, 1, 1, 8, 0)
+    second = datetime(2026, 1, 1, 9, 0)
+    later = FlightOffer(
+        origin="XMN", destination="SIN", departure_date=date(2026, 2, 18), price=Decimal("650.00"),
+        currency="CNY", airline="TR", flight_number="TR1", stops=1, source="kiwi"
+    )
+    change_filter.filter([offer_to_record(make_offer(), first), offer_to_record(later, first)], SCOPE)
+
+    # 18 Feb was not among the dates this fetch returned, so TR1 is not marked
+    stored = change_filter.filter([offer_to_record(make_offer(), second)], SCOPE)
+
+    assert stored == []
@@ -0,0 +1,80 @@
+# tests/test_workers.py
+import multiprocessing
+from unittest.mock import MagicMock
+from src.workers import HashRing, Supervisor, shard_routes, worker_config
+
+def make_route(origin, destination, name=None):
+    return {'name': name or f"{origin}-{destination}", 'origin': origin, 'destination': destination}
+
+def test_hash_ring_moves_few_keys_when_growing():
+    keys = [f"pair_XMN_{i:04d}" for i in range(2000)]
+    before, after = HashRing(4), HashRing(5)
+
+    moved = sum(before.worker_for(key) != after.worker_for(key) for key in keys)
+    assert moved < len(keys) * 0.3
+    assert {after.worker_for(key) for key in keys} == set(range(5))
+
+def test_shard_routes_keeps_city_pairs_together():
+    routes = [make_route("XMN", f"D{i:02d}") for i in range(40)] + [make_route("XMN", "D07", "second")]
+    shards = shard_routes(routes, 3)
+
+    assert sum(len(shard) for shard in shards) == len(routes)
+    holders = [i for i, shard in enumerate(shards) if any(r['destination'] == "D07" for r in shard)]
+    assert len(holders) == 1
+    assert len([r for r in shards[holders[0]] if r['destination'] == "D07"]) == 2
+
+def test_worker_config_takes_a_share_of_quota_and_its_own_cache_file():
+    config = {
+        'routes': [make_route("XMN", "SIN")],
+        'quota': {'low_watermark': 0.2},
+        'cache': {'disk_path': 'state/offer_cache.sqlite'},
+    }
+    configs = [worker_config(config, i, 2) for i in range(2)]
+
+    assert sorted(len(c['routes']) for c in configs) == [0, 1]
+    assert configs[0]['quota'] == {'low_watermark': 0.2, 'share': 0.5}
+    assert configs[1]['cache']['disk_path'] == 'state/offer_cache.worker1.sqlite'
+    assert config['quota'] == {'low_watermark': 0.2}
+
+def test_supervisor_restarts_crashed_workers_with_backoff():
+    supervisor = Supervisor('config.yaml', 2, restart_delay=1, restart_window=60)
+    spawned = []
+    supervisor.spawn = spawned.append
+    dead = MagicMock(exitcode=1)
+    dead.is_alive.return_value = False
+    alive = MagicMock()
+    alive.is_alive.return_value = True
+    supervisor.processes = {0: dead, 1: alive}
+    supervisor._started_at = {0: 100.0, 1: 100.0}
+
+    supervisor.check_workers(now=110.0)
+    assert spawned == []
+    supervisor.check_workers(now=111.0)
+    assert spawned == [0]
+
+    # Crashing again soon after doubles the delay
+    supervisor._started_at[0] = 111.0
+    supervisor.check_workers(now=112.0)
+    supervisor.check_workers(now=113.0)
+    assert spawned == [0]
+    supervisor.check_workers(now=114.0)
+    assert spawned == [0, 0]
+
+def test_supervisor_aggregates_reports_across_restarts():
+    supervisor = Supervisor('config.yaml', 2)
+    supervisor.reports = multiprocessing.Queue()
+    supervisor.reports.put((0, {'counters': {'checks': 3}, 'gauges': {'writer.queue_depth': 5}, 'summaries': {}}))
+    supervisor.reports.put((1, {'counters': {'checks': 2}, 'gauges': {'writer.queue_depth': 1}, 'summaries': {}}))
+    assert supervisor.collect(timeout=1)
+    while len(supervisor.snapshots) < 2:
+        supervisor.collect(timeout=1)
+
+    dead = MagicMock(exitcode=1)
+    dead.is_alive.return_value = False
+    supervisor.spawn = MagicMock()
+    supervisor.processes = {0: dead}
+    supervisor.check_workers(now=0.0)
+
+    merged = supervisor.aggregate()
+    assert merged['counters'] == {'checks': 5}
+    assert merged['gauges'] == {'writer.queue_depth': 1}